@@ -0,0 +1,177 @@
+import sys
+import os
+import json
+import tempfile
+import time
+import numpy as np
+
+from roboviz.robot import Robot
+from roboviz.robotUtils import RobotUtils
+from roboviz.layout import layoutRobot
+from roboviz.collision import outOfBounds
+
+"""Benchmarks of swarm-scale operations against the implementations they replaced, invoke with 'python benchmark_method.py [swarm size]'"""
+
+
+def randomRobots(n, seed=0):
+    """
+    Creates robots with random bounding boxes (robot sized, spread over an environment that fits them all)
+    Args:
+        `n`: number of robots (int)  
+        `seed`: random seed (int) **optional**
+    Returns:
+        `robots`: robots with bounds set (Robot[])
+    """
+    rng = np.random.default_rng(seed)
+    side = 400 * np.sqrt(n)                                     # ~1 robot per 400x400 units
+    centres = rng.uniform(-side / 2, side / 2, (n, 2))
+    half = rng.uniform(20, 200, (n, 2))
+    robots = []
+    for i in range(n):
+        robot = Robot(i, [], [], [centres[i][0], centres[i][1], 0])
+        robot.bounds = [centres[i][0] + half[i][0], centres[i][0] - half[i][0], centres[i][1] + half[i][1], centres[i][1] - half[i][1], 40, 0]
+        robots.append(robot)
+    return robots
+
+
+def collisionDetectPairwise(robots):
+    """
+    Previous implementation of RobotUtils **collisionDetect**, comparing every pair of robots
+    Args:
+        `robots`: list of all robots in the scene (Robot[])
+    Returns:
+        `collisions`: possible collisions between robots (int[][])
+    """
+    collisions = []
+    for i, first_robot in enumerate(robots):
+        for second_robot in robots[i + 1:]:
+            if first_robot.bounds[4] >= second_robot.bounds[5] and first_robot.bounds[5] <= second_robot.bounds[4]:
+                if first_robot.bounds[0] >= second_robot.bounds[1] and first_robot.bounds[1] <= second_robot.bounds[0]:
+                    if first_robot.bounds[2] >= second_robot.bounds[3] and first_robot.bounds[3] <= second_robot.bounds[2]:
+                        collisions.append([first_robot.id, second_robot.id])
+    return collisions
+
+
+def timed(function, *args):
+    """
+    Times a function call
+    Args:
+        `function`: function to call (function)  
+        `*args`: arguments of function
+    Returns:
+        `(result, seconds)`: result of call + seconds taken (any, float)
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmarkCollisions(sizes):
+    """
+    Compares grid based collision detection with the pairwise loops it replaced
+    Args:
+        `sizes`: swarm sizes to time (int[])
+    """
+    utils = RobotUtils('', '', '')
+    print('Collision detection (seconds)')
+    print('{:>8} {:>12} {:>12} {:>10}'.format('robots', 'pairwise', 'grid', 'collisions'))
+    for n in sizes:
+        robots = randomRobots(n)
+        found, grid_time = timed(utils.collisionDetect, robots)
+        if n <= 10000:
+            pairwise, pairwise_time = timed(collisionDetectPairwise, robots)
+            assert found == pairwise, 'grid and pairwise results differ'
+            pairwise_time = '{:.3f}'.format(pairwise_time)
+        else:
+            pairwise_time = '-'                                 # too slow to wait for
+        print('{:>8} {:>12} {:>12.3f} {:>10}'.format(n, pairwise_time, grid_time, len(found)))
+
+
+def benchmarkOutOfBounds(sizes):
+    """
+    Compares the swarm-wide out of bounds pass with calling Robot **outOfBoundsDetect** on each robot
+    Args:
+        `sizes`: swarm sizes to time (int[])
+    """
+    utils = RobotUtils('', '', '')
+    print('Out of bounds detection (seconds)')
+    print('{:>8} {:>12} {:>12} {:>10}'.format('robots', 'per robot', 'swarm', 'out'))
+    for n in sizes:
+        robots = randomRobots(n)
+        length = 300 * np.sqrt(n)                               # environment a bit too small for the swarm
+        per_robot, per_robot_time = timed(lambda: [robot.outOfBoundsDetect(length, length) for robot in robots])
+        (indices, units), swarm_time = timed(lambda: outOfBounds(utils.swarmBounds(robots), length, length))
+        expected = [[i, [int(out[0]), int(out[1])]] for i, out in enumerate(per_robot) if out != 'none']
+        assert [[i, out] for i, out in zip(indices.tolist(), units.tolist())] == expected, 'swarm and per robot results differ'
+        print('{:>8} {:>12.3f} {:>12.3f} {:>10}'.format(n, per_robot_time, swarm_time, len(indices)))
+
+
+def benchmarkComponentCollisions(sizes):
+    """
+    Times the component level narrow phase on swarms of the example robot, and counts the possible collisions it rules out
+    Args:
+        `sizes`: swarm sizes to time (int[])
+    """
+    utils = RobotUtils('', '', 'json/robot.json')
+    print('Component collisions (seconds)')
+    print('{:>8} {:>12} {:>12} {:>10} {:>10}'.format('robots', 'broad', 'narrow', 'possible', 'confirmed'))
+    for n in sizes:
+        rng = np.random.default_rng(0)
+        side = 300 * np.sqrt(n)                                 # robots packed closely enough for many bounding boxes to overlap
+        positions = np.zeros((n, 3))
+        positions[:, :2] = rng.uniform(-side / 2, side / 2, (n, 2))
+        robots = list(utils.robotParse(n, positions))
+        for robot in robots:
+            layoutRobot(robot)
+        possible, broad_time = timed(utils.collisionDetect, robots)
+        confirmed, narrow_time = timed(utils.componentCollisions, robots, possible)
+        print('{:>8} {:>12.3f} {:>12.3f} {:>10} {:>10}'.format(n, broad_time, narrow_time, len(possible), len(confirmed)))
+
+
+def parseParallel(path, positions, workers):
+    """
+    Parses a heterogeneous swarm across a pool of processes, even on a single core (where RobotUtils **robotParse** skips the pool)
+    Args:
+        `path`: file path of robot JSON file (String)  
+        `positions`: positions of each robot in swarm (ndarray)  
+        `workers`: number of processes (int)
+    Returns:
+        `robots`: parsed robots (Robot[])
+    """
+    with open(path) as f:
+        swarm = json.load(f)["swarm"]
+    return RobotUtils('', '', path).parallelParse(swarm, positions, workers)
+
+
+def benchmarkParse(sizes):
+    """
+    Times parsing a heterogeneous swarm in one process and across a pool of processes (one per core)
+    Args:
+        `sizes`: swarm sizes to time (int[])
+    """
+    with open('json/multipleRobots.json') as f:
+        bodies = json.load(f)["swarm"]
+    workers = os.cpu_count() or 1
+    print('Heterogeneous parse, {} worker(s) (seconds)'.format(workers))
+    print('{:>8} {:>12} {:>12}'.format('robots', 'serial', 'parallel'))
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'swarm.json')
+        for n in sizes:
+            swarm = [dict(bodies[i % len(bodies)], id=i) for i in range(n)]
+            with open(path, 'w') as f:
+                json.dump({"swarm": swarm}, f)
+            utils = RobotUtils('', '', path)
+            positions = np.zeros((n, 3))
+            serial, serial_time = timed(utils.robotParse, n, positions)
+            parallel, parallel_time = timed(parseParallel, path, positions, max(workers, 2))
+            assert [r.template.poses for r in parallel] == [r.template.poses for r in serial], 'serial and parallel results differ'
+            print('{:>8} {:>12.3f} {:>12.3f}'.format(n, serial_time, parallel_time))
+
+
+if __name__ == '__main__':
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sizes = [n for n in (100, 1000, 10000, 100000) if n <= largest] or [largest]
+    benchmarkCollisions(sizes)
+    benchmarkOutOfBounds(sizes)
+    benchmarkComponentCollisions(sizes)
+    benchmarkParse(sizes)
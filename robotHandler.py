@@ -5,32 +5,82 @@
 """Runs application in either GUI or command line mode"""
 
 from roboviz.robotGUI import RobotGUI
+from roboviz.robotUtils import RobotUtils, BodyError
 import sys
 
 if __name__ == '__main__':
     # CLI mode
     if(len(sys.argv) > 1):
-        config_path = sys.argv[1]
-        pos_path = sys.argv[2]
-        robot_path = sys.argv[3]
+        # options are given as --flags, files positionally
+        args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+        options = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+
+        # compile a robot JSON file into a binary robot file, or rewrite a robot file as (compressed) JSON
+        if '--convert' in options:
+            if len(args) < 2 or not args[1].endswith(('.rvb', '.json', '.json.gz', '.json.zst')):
+                print('[ERROR] Usage: python robotHandler.py --convert <robot.json> <robot.rvb|robot.json[.gz|.zst]>')
+                quit()
+            try:
+                if args[1].endswith('.rvb'):
+                    RobotUtils('', '', args[0]).convertBinary(args[1])
+                else:
+                    RobotUtils('', '', args[0]).convertJSON(args[1])
+            except (BodyError, OSError, ValueError, KeyError) as e:
+                print('[ERROR] Could not convert {}: {}'.format(args[0], e))
+                quit()
+            print('Converted {} to {}'.format(args[0], args[1]))
+            quit()
 
         # not all files given
-        if len(sys.argv) < 4:
-            print('[ERROR] Not all files have been entered: python robotHandler.py <config.txt> <positions.txt> <robot.json>')
+        if len(args) < 3:
+            print('[ERROR] Not all files have been entered: python robotHandler.py <config.txt> <positions.txt> <robot.json> [--stream] [--no-cache] [--workers=<n>] [--instanced] [--progressive] [--headless] [--offscreen=<image.png>] [--page-budget=<n>] [--check]')
             quit()
+        config_path = args[0]
+        pos_path = args[1]
+        robot_path = args[2]
+        stream = '--stream' in options              # parse robots one at a time while rendering
+        cache = '--no-cache' not in options         # reuse parsed + laid out robots from previous runs
+        instanced = '--instanced' in options        # draw robots sharing a body with hardware instancing
+        progressive = '--progressive' in options    # open window straight away and render robots a few each frame
+        window_type = 'none' if '--headless' in options else 'onscreen'   # lay out + check robots without a window or graphics
+        image_path = None                           # image the scene is rendered to offscreen
+        page_budget = None                          # max. components built at once (robots far from the camera are drawn as boxes)
+        workers = 1                                 # processes used to parse heterogeneous swarms
+        for option in options:
+            if option.startswith('--workers='):
+                if not option.split('=')[1].isdigit() or int(option.split('=')[1]) < 1:
+                    print('[ERROR] Number of workers should be a positive whole number: --workers=<n>')
+                    quit()
+                workers = int(option.split('=')[1])
+            if option.startswith('--offscreen='):
+                if not option.split('=', 1)[1].lower().endswith(('.png', '.jpg', '.bmp')):
+                    print('[ERROR] Offscreen image should be a .png, .jpg or .bmp file: --offscreen=<image.png>')
+                    quit()
+                window_type = 'offscreen'
+                image_path = option.split('=', 1)[1]
+            if option.startswith('--page-budget='):
+                if not option.split('=')[1].isdigit() or int(option.split('=')[1]) < 1:
+                    print('[ERROR] Page budget should be a positive whole number of components: --page-budget=<n>')
+                    quit()
+                page_budget = int(option.split('=')[1])
+
         # file type errors
         if not config_path.endswith('.txt'):
             print('[ERROR] Incorrect file type for configuration file, should be .txt')
             quit()
-        if not pos_path.endswith('.txt'):
-            print('[ERROR] Incorrect file type for positions file, should be .txt')
+        if not pos_path.endswith(('.txt', '.csv', '.npy')):
+            print('[ERROR] Incorrect file type for positions file, should be .txt (or .csv/.npy)')
             quit()
-        if not robot_path.endswith('.json'):
-            print('[ERROR] Incorrect file type for robot file, should be .json')
+        if not robot_path.endswith(('.json', '.json.gz', '.json.zst', '.rvb')):
+            print('[ERROR] Incorrect file type for robot file, should be .json (or .json.gz/.json.zst/.rvb)')
             quit()
 
-        window = RobotGUI(config_path=config_path, pos_path=pos_path, robot_path=robot_path, cli=True)
-        window.runSim()
+        window = RobotGUI(config_path=config_path, pos_path=pos_path, robot_path=robot_path, cli=True, stream=stream, cache=cache, workers=workers, instanced=instanced, progressive=progressive,
+                          window_type=window_type, image_path=image_path, page_budget=page_budget)
+        if '--check' in options:
+            window.checkSim()                       # report collisions + out of bounds robots without rendering
+        else:
+            window.runSim()
 
     # GUI mode
     else:
@@ -0,0 +1,83 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+from roboviz.hinge import Hinge
+from roboviz.brick import Brick
+from roboviz.connection import Connection, standardSlot, unStandardSlot
+
+
+class BodyTemplate:
+    """Immutable description of a robot body, shared by every Robot in a homogeneous swarm"""
+
+    __slots__ = ('parts', 'connections', 'slots', 'poses')
+
+    def __init__(self, parts, connections, slots=None, poses=None):
+        """
+        Constructor
+        Args:
+            `parts`: (id, type, root, orientation) of every component in the body ((String, String, boolean, int)[])
+            `connections`: (src index, dst index, src slot, dst slot) of every connection, slots in RoboGen numbering ((int, int, int, int)[])
+            `slots`: standardised (src slot, dst slot) of every connection ((int, int)[]) **optional**, calculated if not given
+            `poses`: laid out pose of every connection's dest. component ((float, float, float, float, float)[]) **optional**
+        """
+        self.parts = tuple(tuple(part) for part in parts)
+        self.connections = tuple(tuple(connection) for connection in connections)
+        if slots is None:
+            # standardised (src slot, dst slot) of every connection
+            slots = [(standardSlot(self.parts[src][1], src_slot), standardSlot(self.parts[dst][1], dst_slot))
+                     for src, dst, src_slot, dst_slot in self.connections]
+        self.slots = tuple(tuple(slot) for slot in slots)
+        # (x, y, z, h, r) of each connection's dest. relative to the core, set once the body is laid out
+        self.poses = None if poses is None else tuple(tuple(pose) for pose in poses)
+
+    @classmethod
+    def fromBody(cls, components, connections):
+        """
+        Creates a template from parsed components and connections
+        Args:
+            `components`: components that make up the body (RobotComp[])
+            `connections`: connections between components (Connection[])
+        Returns:
+            `template`: template of the body (BodyTemplate)
+        """
+        index = {id(component): i for i, component in enumerate(components)}
+        parts = [(c.id, c.type, c.root, c.orientation) for c in components]
+        conns = []
+        for c in connections:
+            # slots are stored in RoboGen numbering (connection may already have been standardised when rendered)
+            if c.standardised:
+                conns.append((index[id(c.src)], index[id(c.dst)], unStandardSlot(c.src.type, c.src_slot), unStandardSlot(c.dst.type, c.dst_slot)))
+            else:
+                conns.append((index[id(c.src)], index[id(c.dst)], c.src_slot, c.dst_slot))
+        return cls(parts, conns)
+
+    def instantiate(self):
+        """
+        Builds a fresh, mutable copy of the body
+        Returns:
+            `(compArr, connArr)`: components and connections of the body (RobotComp[], Connection[])
+        """
+        compArr = []
+        for id, type, root, orientation in self.parts:
+            if 'Hinge' in type:
+                compArr.append(Hinge(id, type, root, orientation))
+            else:
+                compArr.append(Brick(id, type, root, orientation))
+        connArr = [Connection(compArr[src], compArr[dst], src_slot, dst_slot) for src, dst, src_slot, dst_slot in self.connections]
+        return compArr, connArr
+
+    def setPoses(self, poses):
+        """
+        Stores the laid out pose of every connection's dest. component, relative to the core. Can only be set once
+        Args:
+            `poses`: (x, y, z, heading, roll) of each dest. component relative to the robot core ((float, float, float, float, float)[])
+        """
+        if self.poses is None:
+            self.poses = tuple(tuple(pose) for pose in poses)
+
+    def __setattr__(self, name, value):
+        """Prevents a template from being changed once it has been created (other than laying it out once)"""
+        if hasattr(self, name) and not (name == 'poses' and self.poses is None):
+            raise AttributeError('BodyTemplate is immutable')
+        object.__setattr__(self, name, value)
@@ -5,6 +5,8 @@
 
 from roboviz.robotComp import RobotComp
 
+BRICK_COLOUR = (1, 0, 0, 1)    # colour of brick components
+
 
 class Brick(RobotComp):
     """Represents a CoreComponent or FixedBrick component"""
@@ -19,5 +21,5 @@ class Brick(RobotComp):
             `orientation`: orientation (roll) of this component relative to its parent (int)
         """
         super().__init__(id, type, root, orientation)
-        self.colour = (1, 0, 0, 1)                      # colour of component
+        self.colour = BRICK_COLOUR                      # colour of component
         self.mass = 50                                  # made up mass of component
@@ -0,0 +1,237 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+"""
+Finds overlapping robot bounding boxes without comparing every pair of robots (broad phase), then overlapping component boxes (narrow phase),
+and robot bounding boxes that exceed the environment
+"""
+
+import numpy as np
+
+CELL_SCALE = 2                      # width of grid cells, in median box widths
+MAX_CELLS = 64                      # boxes covering more grid cells than this are compared with every box instead
+PAIR_CHUNK = 1 << 20                # max. number of candidate pairs held in memory at once
+INDEX_CELL = 500                    # width of CollisionIndex grid cells (about the size of a robot)
+
+
+def followingPairs(counts):
+    """
+    Generates index pairs (i, j) for j = i+1 ... i+counts[i], in chunks of at most PAIR_CHUNK pairs (or one i if it has more)
+    Args:
+        `counts`: number of pairs for each i ((N,) int ndarray)
+    Returns:
+        `(i, j)`: indices of each chunk of pairs (generator of (int ndarray, int ndarray))
+    """
+    n = len(counts)
+    totals = np.cumsum(counts)
+    first = 0
+    while first < n:
+        done = totals[first - 1] if first > 0 else 0
+        last = max(int(np.searchsorted(totals, done + PAIR_CHUNK, side='right')), first + 1)
+        chunk_counts = counts[first:last]
+        i = np.repeat(np.arange(first, last), chunk_counts)
+        j = i + 1 + np.arange(len(i)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        yield i, j
+        first = last
+
+
+def overlappingPairs(bounds):
+    """
+    Finds every pair of overlapping (or touching) boxes with a uniform grid over the xy plane: boxes are only compared with the
+    boxes that share a grid cell with them, so this runs in O(N + overlaps) for robot sized boxes
+    Args:
+        `bounds`: [x_max, x_min, y_max, y_min, z_max, z_min] of each box, as in Robot **setBounds** ((N, 6) float ndarray)
+    Returns:
+        `pairs`: indices (i, j) of overlapping boxes with i < j, sorted by i then j ((M, 2) int ndarray)
+    """
+    bounds = np.asarray(bounds, dtype=float).reshape(-1, 6)
+    lower, upper = bounds[:, 1::2], bounds[:, 0::2]     # (x, y, z) mins and maxes
+
+    def overlap(a, b):
+        return np.all((upper[a] >= lower[b]) & (lower[a] <= upper[b]), axis=1)
+
+    pairs = [np.zeros((0, 2), dtype=int)]
+    if len(bounds) > 1:
+        cell = np.maximum(np.median(upper[:, :2] - lower[:, :2], axis=0) * CELL_SCALE, 1e-6)
+        first = np.floor(lower[:, :2] / cell).astype(np.int64)         # first + last cell covered by each box
+        last = np.floor(upper[:, :2] / cell).astype(np.int64)
+        span = last - first + 1
+        big = span[:, 0] * span[:, 1] > MAX_CELLS
+
+        # boxes that cover a lot of the grid are compared with every box (pairs of big boxes are found once, by the first)
+        everything = np.arange(len(bounds))
+        for i in np.flatnonzero(big):
+            others = everything[(~big | (everything > i)) & (everything != i)]
+            others = others[overlap(np.full(len(others), i), others)]
+            pairs.append(np.stack([np.full(len(others), i), others], axis=1))
+
+        # every other box is entered into each cell it covers
+        boxes = np.flatnonzero(~big)
+        cells = span[boxes, 0] * span[boxes, 1]
+        entry_box = np.repeat(boxes, cells)
+        k = np.arange(len(entry_box)) - np.repeat(np.cumsum(cells) - cells, cells)      # index of cell within box's cells
+        entry_cell = first[entry_box] + np.stack([k % span[entry_box, 0], k // span[entry_box, 0]], axis=1)
+        order = np.lexsort((entry_cell[:, 1], entry_cell[:, 0]))
+        entry_box, entry_cell = entry_box[order], entry_cell[order]
+
+        # compare each entry with the entries after it in the same cell
+        new_cell = np.ones(len(entry_box), dtype=bool)
+        new_cell[1:] = np.any(entry_cell[1:] != entry_cell[:-1], axis=1)
+        cell_end = np.append(np.flatnonzero(new_cell)[1:], len(entry_box))[np.cumsum(new_cell) - 1]
+        for i, j in followingPairs(cell_end - np.arange(len(entry_box)) - 1):
+            a, b = entry_box[i], entry_box[j]
+            # boxes sharing several cells are only kept in the cell holding the max. of their min. corners (where they first meet)
+            meet = np.floor(np.maximum(lower[a, :2], lower[b, :2]) / cell).astype(np.int64)
+            keep = np.all(meet == entry_cell[i], axis=1) & overlap(a, b)
+            pairs.append(np.stack([a[keep], b[keep]], axis=1))
+
+    pairs = np.sort(np.concatenate(pairs), axis=1)      # lower index first
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def outOfBounds(bounds, x_length, y_length):
+    """
+    Finds the boxes that exceed the environment plane (centred on the origin), as in Robot **outOfBoundsDetect** but for every box at once
+    Args:
+        `bounds`: [x_max, x_min, y_max, y_min, z_max, z_min] of each box, as in Robot **setBounds** ((N, 6) float ndarray)  
+        `x_length`: x size of the environment (float)  
+        `y_length`: y size of the environment (float)
+    Returns:
+        `(indices, units)`: indices of out of bounds boxes, in order ((M,) int ndarray) + x and y units each is out of bounds by,
+        negative past the min. edges ((M, 2) int ndarray)
+    """
+    bounds = np.asarray(bounds, dtype=float).reshape(-1, 6)
+    half = np.array([x_length, y_length], dtype=float) / 2
+    over, under = bounds[:, [0, 2]] - half, bounds[:, [1, 3]] + half   # past + edges, past - edges
+    units = np.where(over > 0, np.trunc(over), np.where(under < 0, np.trunc(under), 0)).astype(int)
+    indices = np.flatnonzero(np.any(units != 0, axis=1))
+    return indices, units[indices]
+
+
+class BoxTree:
+    """Bounding volume hierarchy over a set of boxes (e.g. the components of a robot), for finding which boxes of two sets overlap"""
+
+    def __init__(self, lower, upper):
+        """
+        Builds the hierarchy top down, splitting boxes at the median of their centres along the longest axis of each node
+        Args:
+            `lower`: min. corner of each box ((N, 3) float ndarray)  
+            `upper`: max. corner of each box ((N, 3) float ndarray)
+        """
+        lower, upper = np.asarray(lower, dtype=float).reshape(-1, 3), np.asarray(upper, dtype=float).reshape(-1, 3)
+        n = len(lower)
+        nodes = max(2 * n - 1, 0)                           # binary tree with a leaf per box
+        self.lower = np.zeros((nodes, 3))                   # min. corner of each node
+        self.upper = np.zeros((nodes, 3))                   # max. corner of each node
+        self.children = np.full((nodes, 2), -1)             # (left, right) node indices of each node, -1 for leaves
+        self.box = np.full(nodes, -1)                       # index of each leaf's box, -1 for internal nodes
+        if n == 0:
+            return
+        centres = (lower + upper) / 2
+        stack = [(0, np.arange(n))]
+        added = 1
+        while stack:
+            node, boxes = stack.pop()
+            self.lower[node] = lower[boxes].min(axis=0)
+            self.upper[node] = upper[boxes].max(axis=0)
+            if len(boxes) == 1:
+                self.box[node] = boxes[0]
+                continue
+            axis = np.argmax(self.upper[node] - self.lower[node])
+            boxes = boxes[np.argsort(centres[boxes, axis], kind='stable')]
+            self.children[node] = added, added + 1
+            stack.append((added, boxes[:len(boxes) // 2]))
+            stack.append((added + 1, boxes[len(boxes) // 2:]))
+            added += 2
+
+    def overlaps(self, other, offsets):
+        """
+        Finds the boxes that overlap (or touch) boxes of another hierarchy, for many placements of the other hierarchy at once.
+        Both hierarchies are descended together, only into pairs of nodes that overlap
+        Args:
+            `other`: other hierarchy (BoxTree)  
+            `offsets`: positions of the other hierarchy's boxes relative to this one's ((P, 3) float ndarray)
+        Returns:
+            `(placements, boxes, other_boxes)`: placement, box in this hierarchy and box in other of every overlapping pair of boxes,
+            sorted ((M,) int ndarray, (M,) int ndarray, (M,) int ndarray)
+        """
+        offsets = np.asarray(offsets, dtype=float).reshape(-1, 3)
+        found = [np.zeros((0, 3), dtype=int)]
+        if len(self.box) and len(other.box):
+            p = np.arange(len(offsets))                     # frontier of (placement, node, other node) still to test
+            a = np.zeros(len(offsets), dtype=int)
+            b = np.zeros(len(offsets), dtype=int)
+            while len(p):
+                overlap = np.all((self.upper[a] >= other.lower[b] + offsets[p]) & (self.lower[a] <= other.upper[b] + offsets[p]), axis=1)
+                p, a, b = p[overlap], a[overlap], b[overlap]
+                a_leaf, b_leaf = self.box[a] >= 0, other.box[b] >= 0
+                leaves = a_leaf & b_leaf
+                found.append(np.stack([p[leaves], self.box[a[leaves]], other.box[b[leaves]]], axis=1))
+                # descend into the larger node of each pair (or the only one that isn't a leaf)
+                a_size = (self.upper[a] - self.lower[a])[:, :2].sum(axis=1)
+                b_size = (other.upper[b] - other.lower[b])[:, :2].sum(axis=1)
+                split_a = ~a_leaf & (b_leaf | (a_size >= b_size))
+                split_b = ~leaves & ~split_a
+                p = np.concatenate([p[split_a], p[split_a], p[split_b], p[split_b]])
+                a = np.concatenate([self.children[a[split_a], 0], self.children[a[split_a], 1], a[split_b], a[split_b]])
+                b = np.concatenate([b[split_a], b[split_a], other.children[b[split_b], 0], other.children[b[split_b], 1]])
+        found = np.concatenate(found)
+        found = found[np.lexsort((found[:, 2], found[:, 1], found[:, 0]))]
+        return found[:, 0], found[:, 1], found[:, 2]
+
+
+class CollisionIndex:
+    """Uniform grid of robot bounding boxes that is updated one robot at a time, so a moved robot is only checked against its neighbours"""
+
+    def __init__(self, cell_size=INDEX_CELL):
+        """
+        Constructor
+        Args:
+            `cell_size`: width of grid cells (float) **optional**
+        """
+        self.cell_size = cell_size
+        self.cells = {}                 # (x index, y index) -> IDs of robots whose boxes cover cell
+        self.bounds = {}                # robot ID -> (min, max) corners of robot's box ((3,) float ndarray, (3,) float ndarray)
+        self.robot_cells = {}           # robot ID -> cells robot's box covers
+
+    def update(self, id, lower, upper):
+        """
+        Adds a robot's box to the grid, or moves it if the robot is already in the grid
+        Args:
+            `id`: ID of robot (int)  
+            `lower`: min. corner of robot's box (float[])  
+            `upper`: max. corner of robot's box (float[])
+        """
+        self.remove(id)
+        lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+        first = np.floor(lower[:2] / self.cell_size).astype(int)
+        last = np.floor(upper[:2] / self.cell_size).astype(int)
+        cells = [(x, y) for x in range(first[0], last[0] + 1) for y in range(first[1], last[1] + 1)]
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(id)
+        self.bounds[id] = (lower, upper)
+        self.robot_cells[id] = cells
+
+    def remove(self, id):
+        """
+        Removes a robot's box from the grid (if it is in the grid)
+        Args:
+            `id`: ID of robot (int)
+        """
+        for cell in self.robot_cells.pop(id, []):
+            self.cells[cell].discard(id)
+            if not self.cells[cell]:
+                del self.cells[cell]
+        self.bounds.pop(id, None)
+
+    def neighbours(self, id):
+        """
+        Finds the robots whose boxes overlap (or touch) a robot's box, only checking robots that share a grid cell with it
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `ids`: IDs of overlapping robots, sorted (int[])
+        """
+        lower, upper = self.bounds[id]
+        nearby = set().union(*(self.cells[cell] for cell in self.robot_cells[id])) - {id}
+        return sorted(other for other in nearby if np.all((upper >= self.bounds[other][0]) & (lower <= self.bounds[other][1])))
@@ -31,6 +31,38 @@ def slotSwap(slot, dir):
         return slot
 
 
+def standardSlot(type, slot):
+    """
+    Converts a RoboGen slot number of a component to the RoboViz system
+    Args:
+        `type`: type of the component the slot belongs to (String)
+        `slot`: RoboGen slot number (int)
+    Returns:
+        `slot`: standardised slot number (int)
+    """
+    if 'Hinge' in type and slot == 1:                   # standardise hinge slots (1=2)
+        return 2
+    if type == 'FixedBrick' or type == 'CoreComponent':  # standardise brick slots (1=2, 3=1, 2=3)
+        return slotSwap(slot, 0)
+    return slot
+
+
+def unStandardSlot(type, slot):
+    """
+    Converts a RoboViz slot number of a component back to the RoboGen system
+    Args:
+        `type`: type of the component the slot belongs to (String)
+        `slot`: standardised slot number (int)
+    Returns:
+        `slot`: RoboGen slot number (int)
+    """
+    if 'Hinge' in type and slot == 2:                   # unstandardise hinge slots
+        return 1
+    if type == 'FixedBrick' or type == 'CoreComponent':  # unstandardise brick slots
+        return slotSwap(slot, 1)
+    return slot
+
+
 class Connection:
     """Represents a connection between 2 robot components"""
 
@@ -52,43 +84,32 @@ class Connection:
 
     def standardiseSlots(self):
         """Converts RoboGen's funky slot system to a more reasonable one (sides numbered clockwise 0->3 starting from side closest to viewer)"""
-        # standardise hinge slots (1=2)
-        if 'Hinge' in self.src.type and self.src_slot == 1:                     # source hinge slots
-            self.src_slot = 2
-        if 'Hinge' in self.dst.type and self.dst_slot == 1:                     # dest. hinge slots
-            self.dst_slot = 2
-        # standardise brick slots (1=2, 3=1, 2=3)
-        if self.src.type == 'FixedBrick' or self.src.type == 'CoreComponent':   # source brick slots
-            self.src_slot = slotSwap(self.src_slot, 0)
-        if self.dst.type == 'FixedBrick' or self.dst.type == 'CoreComponent':   # dest. brick slots
-            self.dst_slot = slotSwap(self.dst_slot, 0)
+        self.src_slot = standardSlot(self.src.type, self.src_slot)
+        self.dst_slot = standardSlot(self.dst.type, self.dst_slot)
         self.standardised = True
 
     def unStandardiseSlots(self):
         """Converts back to RoboGen system for writing to file"""
-        # unstandardise hinge slots
-        if 'Hinge' in self.src.type and self.src_slot == 2:                     # source hinge slots
-            self.src_slot = 1
-        if 'Hinge' in self.dst.type and self.dst_slot == 2:                     # dest. hinge slots
-            self.dst_slot = 1
-        # unstandardise brick slots
-        if self.src.type == 'FixedBrick' or self.src.type == 'CoreComponent':   # source brick slots
-            self.src_slot = slotSwap(self.src_slot, 1)
-        if self.dst.type == 'FixedBrick' or self.dst.type == 'CoreComponent':   # dest. brick slots
-            self.dst_slot = slotSwap(self.dst_slot, 1)
+        self.src_slot = unStandardSlot(self.src.type, self.src_slot)
+        self.dst_slot = unStandardSlot(self.dst.type, self.dst_slot)
         self.standardised = False
 
     def as_dict(self):
         """
-        Represents a Connection object as a dictionary, for use in the RobotUtils **writeRobot** method
+        Represents a Connection object as a dictionary (in RoboGen's slot system, without changing the Connection),
+        for use in the RobotUtils **writeRobot** method
         Returns:
             `dict`: contains all Connection fields as a dict
         """
         dict = {}
         dict["src"] = self.src.id
         dict["dest"] = self.dst.id
-        dict["srcSlot"] = self.src_slot
-        dict["destSlot"] = self.dst_slot
+        if self.standardised:
+            dict["srcSlot"] = unStandardSlot(self.src.type, self.src_slot)
+            dict["destSlot"] = unStandardSlot(self.dst.type, self.dst_slot)
+        else:
+            dict["srcSlot"] = self.src_slot
+            dict["destSlot"] = self.dst_slot
         return dict
 
     def __str__(self):
@@ -4,54 +4,162 @@
 # ---------------------------------------------------------------------------
 
 from numpy import deg2rad
+import numpy as np
 import math
+import os
 import sys
 import time
 from panda3d.core import CollisionTraverser
 from panda3d.core import CollisionHandlerQueue
 from panda3d.core import CollisionRay
 from panda3d.core import CollisionNode
+from panda3d.core import CollisionBox
+from panda3d.core import BitMask32
 from panda3d.core import AmbientLight
 from panda3d.core import LVector3f
+from panda3d.core import LPoint3f
 from panda3d.core import Mat4
 from panda3d.core import GeomNode
+from panda3d.core import BoundingBox
+from panda3d.core import LineSegs
+from panda3d.core import Geom
+from panda3d.core import GeomTriangles
+from panda3d.core import GeomVertexData
+from panda3d.core import GeomVertexFormat
+from panda3d.core import GeomVertexWriter
+from panda3d.core import MaterialAttrib
+from panda3d.core import TextureAttrib
 from panda3d.core import TextNode
 from panda3d.core import NodePath
 from panda3d.core import WindowProperties
+from panda3d.core import Filename
 from direct.showbase.ShowBase import ShowBase
 from direct.gui.OnscreenText import OnscreenText
 from direct.gui.DirectGui import *
+from roboviz.hinge import HINGE_COLOUR
+from roboviz.brick import BRICK_COLOUR
+from roboviz.robotComp import ORIENTATION
+from roboviz.modelRegistry import ModelRegistry
+from roboviz.instancedSwarm import InstancedSwarm, instancingSupported
+from roboviz.layout import BodyLayout, layoutRobot, placedBox, hprMatrix
+from roboviz.modelBounds import modelBounds, MODEL_DIR
+from roboviz.bodyTemplate import BodyTemplate
+from roboviz.quadTree import QuadTree
+from roboviz.collision import CollisionIndex, outOfBounds
 from panda3d.core import loadPrcFileData
 loadPrcFileData("", "window-type none")
+loadPrcFileData("", "audio-library-name null")     # no sound is played, and batch machines often have no audio device
+# models are found from any working directory (e.g. when run headless from a script or test runner)
+loadPrcFileData("", "model-path " + Filename.fromOsSpecific(os.path.dirname(os.path.dirname(MODEL_DIR))).getFullpath())
 
 
 KEY_ERR = True                                  # suppress KeyboardInterrupt error when Panda exits
+WINDOW_TYPES = ('onscreen', 'offscreen', 'none') # where the scene is rendered to
 SHIFT_VALUE = 5                                 # number of units robots will be moved by
-ORIENTATION = {0: 0, 1: 90, 2: 180, 3: 270}     # roll in degrees relating to orientation values
 # vector shifts related to directions of robot movement
 SHIFT_DIRECTION = {0: LVector3f(0, SHIFT_VALUE, 0), 2: LVector3f(0, -SHIFT_VALUE, 0), 3: LVector3f(-SHIFT_VALUE, 0, 0),
                    1: LVector3f(SHIFT_VALUE, 0, 0), 4: LVector3f(0, 0, SHIFT_VALUE), 5: LVector3f(0, 0, -SHIFT_VALUE), }
+LABEL_DISTANCE = 1500                           # max. distance from the camera of robots that are labelled
+LABEL_ROBOTS = 10                               # max. number of robots labelled at once (those nearest the camera)
+LABEL_INTERVAL = 0.2                            # seconds between updates of which robots are labelled
+LABEL_HEIGHT = LVector3f(0, 0, 20)              # offset of labels above their components
+LOD_HIGH = 400                                  # robots nearer the camera than this are drawn with high poly models
+LOD_BOX = 3000                                  # robots further from the camera than this are drawn as boxes
+LOD_HYSTERESIS = 0.1                            # fraction a switching distance must be passed by to switch (stops flickering)
+LOD_INTERVAL = 0.2                              # seconds between updates of the level of detail of robots
+HIGH_POLY_MODEL = 'high_poly/_{}_HIGHPOLY'      # high poly model of each component type
+HIGH_POLY_HPR = {'ActiveHinge': (0, 0, 90)}     # rotation that lines up high poly models exported differently to the standard ones
+PICK_MASK = BitMask32.bit(1)                    # collide mask of picking boxes (models' own geometry is never ray tested)
+LINE_THICKNESS = 1                              # thickness of selection box lines
+TILE_SETTLE = 2                                 # seconds a tile must be unchanged for before its robots are batched
+TILE_INTERVAL = 0.5                             # seconds between checks for tiles to batch
+TILE_BATCHES = 8                                # max. number of tiles batched per check (spreads out the cost of flattening)
+PAGE_DISTANCE = LOD_BOX * (1 + LOD_HYSTERESIS)  # robots further from the camera than this are never built (they'd be drawn as boxes)
+PAGE_INTERVAL = 0.25                            # seconds between updates of which robots are built
+PAGE_TIME = 1 / 120                             # max. seconds spent building robots per update (rest are built in later updates)
+
+
+def impostorBox():
+    """
+    Builds a box from (-1, -1, -1) to (1, 1, 1), shaded per face so it reads as a solid without lighting
+    Returns:
+        `box`: box node, to be instanced and scaled for each robot (NodePath)
+    """
+    format = GeomVertexFormat.getV3c4()
+    data = GeomVertexData('impostor', format, Geom.UHStatic)
+    vertex = GeomVertexWriter(data, 'vertex')
+    colour = GeomVertexWriter(data, 'color')
+    triangles = GeomTriangles(Geom.UHStatic)
+    # (axis, side, shade) of each face: brightest on top, darkest underneath
+    for axis, side, shade in ((2, 1, 1.0), (2, -1, 0.4), (0, 1, 0.8), (0, -1, 0.6), (1, 1, 0.7), (1, -1, 0.9)):
+        start = data.getNumRows()
+        for u, v in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+            point = [0, 0, 0]
+            point[axis] = side
+            point[(axis + 1) % 3], point[(axis + 2) % 3] = u * side, v
+            vertex.addData3(*point)
+            colour.addData4(shade, shade, shade, 1)
+        triangles.addVertices(start, start + 1, start + 2)
+        triangles.addVertices(start, start + 2, start + 3)
+    geom = Geom(data)
+    geom.addPrimitive(triangles)
+    node = GeomNode('impostor')
+    node.addGeom(geom)
+    return NodePath(node)
+
+
+def wireframeBox():
+    """
+    Builds the outline of a box from (-1, -1, -1) to (1, 1, 1)
+    Returns:
+        `box`: box outline, to be scaled onto the selected robot (NodePath)
+    """
+    ls = LineSegs()
+    ls.setThickness(LINE_THICKNESS)
+    ls.setColor(1, 1, 1, 1)
+    vertices = BoundingBox(LPoint3f(-1, -1, -1), LPoint3f(1, 1, 1)).getPoints()     # 8 corners of box
+    # draw 'side' parts of box
+    for z in range(0, len(vertices), 4):
+        ls.moveTo(vertices[z])
+        ls.drawTo(vertices[z + 1])
+        ls.drawTo(vertices[z + 3])
+        ls.drawTo(vertices[z + 2])
+        ls.drawTo(vertices[z])
+    # draw 'top and bottom' parts of box
+    for xy in range(0, len(vertices)//2):
+        ls.moveTo(vertices[xy])
+        ls.drawTo(vertices[xy + len(vertices)//2])
+    return NodePath(ls.create())
 
 
 class Environment(ShowBase):
     """Renders environment terrain and robot components"""
 
-    def __init__(self, x_length, y_length, swarm_size):
+    def __init__(self, x_length, y_length, swarm_size, window_type='onscreen', page_budget=None):
         """
         Constructor   
         Args:  
             `x_length`: the x size of the environment plane (int)  
             `y_length`: the y size of the environment plane (int)  
-            `swarm_size`: the number of Robots in the swarm (int)
+            `swarm_size`: the number of Robots in the swarm (int)  
+            `window_type`: 'onscreen' for a window, 'offscreen' to render to an image buffer, or 'none' for no graphics at all
+            (robots are still laid out, bounded, collision checked and packed) (String) **optional**  
+            `page_budget`: max. number of components built at once, robots further from the camera are drawn as boxes until they
+            are near enough to be built (int) **optional**, defaults to building every robot
         """
         ShowBase.__init__(self)
+        if window_type not in WINDOW_TYPES:
+            raise ValueError("Unknown window type '{}', should be one of {}".format(window_type, ', '.join(WINDOW_TYPES)))
+        self.window_type = window_type
 
         # open window without outputs
-        self.makeDefaultPipe(printPipeTypes=False)
-        self.openDefaultWindow()
+        if window_type != 'none':
+            self.makeDefaultPipe(printPipeTypes=False)
+            self.openDefaultWindow(type=window_type)
 
         # DEBUG/PROTOTYPE OPTIONS
-        self.setFrameRateMeter(True)
+        if window_type == 'onscreen':
+            self.setFrameRateMeter(True)
         #self.stderr_orig = sys.stderr
 
         # CLASS ATTRIBUTES
@@ -59,17 +167,31 @@ class Environment(ShowBase):
         self.y_length = y_length
         self.swarm_size = swarm_size
 
-        self.labels = []                                                # labels in scene
+        self.labels = {}                                                # robot id -> labels built for robot's components
+        self.bodies = {}                                                # robot id -> (core node, laid out template, origin, bounding box)
+        self.lod = {}                                                   # robot id -> level of detail robot is drawn at (0: high, 1: standard, 2: box)
+        self.high_bodies = {}                                           # body template -> high poly body, shared by robots with that body
+        self.pick_boxes = {}                                            # body template -> picking boxes, shared by robots with that body
+        self.label_geoms = {}                                           # label text -> text geometry, shared between labels
         self.label_toggle = False                                       # whether labels are enabled or not
 
         self.robot_pos = {}                                             # positions of robot cores
+        self.page_budget = page_budget
+        self.pageable = {}                                              # robot ID -> (robot, num. of components, box relative to core, heading)
+        self.paged = {}                                                 # robot ID -> box drawn while robot isn't built
+        self.layouts = {}                                               # body template -> layout, shared by robots with that body
+        self.instances = []                                             # (robot ID, InstancedSwarm, index) of each robot when rendered instanced
+        self.collision_index = CollisionIndex()                         # bounding boxes of robots, updated as each robot moves
+        self.robot_bounds = {}                                          # robot ID -> bounds, the same list as the robot's bounds
+        self.part_boxes = {}                                            # (component type, heading, roll) -> box of placed model
         self.focus_switch_counter = 0
 
         # WINDOW PROPERTIES
-        props = WindowProperties()
-        props.setTitle('RoboViz')
-        props.setIconFilename('resources/r_icon.ico')
-        self.win.requestProperties(props)
+        if window_type == 'onscreen':
+            props = WindowProperties()
+            props.setTitle('RoboViz')
+            props.setIconFilename('resources/r_icon.ico')
+            self.win.requestProperties(props)
 
         # ROBOT SELECTION
         self.myHandler = CollisionHandlerQueue()
@@ -77,8 +199,9 @@ class Environment(ShowBase):
 
         # attach collision ray to mouse
         pickerNode = CollisionNode('mouseRay')
-        pickerNP = self.camera.attachNewNode(pickerNode)
-        pickerNode.setFromCollideMask(GeomNode.getDefaultCollideMask())
+        pickerNP = (self.render if self.camera is None else self.camera).attachNewNode(pickerNode)    # no camera without graphics
+        pickerNode.setFromCollideMask(PICK_MASK)                        # only test picking boxes
+        pickerNode.setIntoCollideMask(BitMask32.allOff())
         self.pickerRay = CollisionRay()
         pickerNode.addSolid(self.pickerRay)
         self.myTraverser.addCollider(pickerNP, self.myHandler)
@@ -86,10 +209,16 @@ class Environment(ShowBase):
         # NODES
         self.robotNode = NodePath('robotNode')                          # parent node to all robots in scene to
         self.robotNode.reparentTo(self.render)                          # allow for zooming out to view all robots
+        self.tiles = QuadTree(self.robotNode)                           # robots are placed in tiles, so culling can skip whole regions
+        self.models = ModelRegistry(self.loader)                        # each component model is loaded once
+        self.impostor = impostorBox()                                   # box drawn in place of far away robots
+        self.selection_box = wireframeBox()                             # outline of selected robot, moved between robots
+        self.selection_box.setLightOff()
 
         self.focus = NodePath('focus')                                  # create focus point (origin) of camera
         self.focus.reparentTo(self.render)                              # for the switching of robot focus
-        self.camera.reparentTo(self.focus)
+        if self.camera is not None:
+            self.camera.reparentTo(self.focus)
 
         # PLANE
         self.set_background_color(0.6, 0.6, 0.6, 1)                     # set background colour to a lighter grey
@@ -111,6 +240,12 @@ class Environment(ShowBase):
         sel_text = 'Selected Robot: none\nSelected Component: none'                                             # add selected text
         self.sel_textNode = OnscreenText(text=sel_text, pos=(1, 0.8), scale=0.04,
                                          fg=(1, 1, 1, 1), bg=(0.3, 0.3, 0.3, 0.6), align=TextNode.ACenter, mayChange=1)
+        self.progress_textNode = OnscreenText(text='', pos=(1, 0.9), scale=0.04,                               # add progress text
+                                              fg=(1, 1, 1, 1), bg=(0.3, 0.3, 0.3, 0.6), align=TextNode.ACenter, mayChange=1)
+        self.progress_textNode.hide()                                                                           # shown while robots render
+        self.warning_textNode = OnscreenText(text='', pos=(self.a2dLeft + 0.05, 0.9), scale=0.04,               # add warning text
+                                             fg=(1, 1, 1, 1), bg=(0.6, 0.1, 0.1, 0.6), align=TextNode.ALeft, mayChange=1)
+        self.warning_textNode.hide()                                                                            # shown while selected robot collides/is out of bounds
 
         # KEYPRESS EVENTS
         # misc.
@@ -120,6 +255,13 @@ class Environment(ShowBase):
         self.accept('mouse1', self.select)
         self.accept('k', self.initialView)
 
+        # level of detail
+        if self.camera is not None:
+            self.taskMgr.doMethodLater(LOD_INTERVAL, self.updateLOD, 'updateLOD')
+        self.taskMgr.doMethodLater(TILE_INTERVAL, self.flattenTiles, 'flattenTiles')
+        if page_budget is not None:
+            self.taskMgr.doMethodLater(PAGE_INTERVAL, self.updatePages, 'updatePages')
+
         # moving robots
         self.accept('arrow_up-repeat', self.moveRobot, [0])
         self.accept('arrow_up', self.moveRobot, [0])
@@ -135,8 +277,8 @@ class Environment(ShowBase):
         self.accept('control-arrow_down', self.moveRobot, [5])
 
         # rotating robots
-        self.accept('control-arrow_left', lambda: self.selected_robot.setHpr(self.render, self.selected_robot.getHpr(self.render) + LVector3f(90, 0, 0)))
-        self.accept('control-arrow_right', lambda: self.selected_robot.setHpr(self.render, self.selected_robot.getHpr(self.render) + LVector3f(-90, 0, 0)))
+        self.accept('control-arrow_left', self.rotateRobot, [90])
+        self.accept('control-arrow_right', self.rotateRobot, [-90])
 
     def finalizeExit(self):
         """Overrides Panda's base finalizeExit method to prevent it from closing Python"""
@@ -147,44 +289,212 @@ class Environment(ShowBase):
             sys.stderr = object
         raise KeyboardInterrupt                                         # to exit Panda window
 
-    def toggleLabels(self, first=False):
-        """
-        Toggles visibility of component labels
-        Args:
-            `first`: first display of labels or not (Boolean) **optional**  
-        """
-        if first:
-            for label in self.labels:
-                label.node().setTextColor(1, 1, 1, 1)                   # set label colours after node flattening
-                label.node().setCardColor(1, 1, 1, 0.3)
-                label.setLightOff()                                     # remove lighting on labels
-                label.hide()                                            # hide labels
+    def toggleLabels(self):
+        """Toggles visibility of component labels, which are only built for robots near the camera (and the selected robot)"""
         # if labels are 'on'
-        elif self.label_toggle == True:
-            for label in self.labels:
-                label.hide()                                            # hide labels
+        if self.label_toggle == True:
+            self.taskMgr.remove('updateLabels')
+            for labels in self.labels.values():
+                for label in labels:
+                    label.removeNode()                                  # remove labels
+            self.labels = {}
             self.label_toggle = False                                   # set to 'off'
         # if labels are 'off'
         else:
-            for label in self.labels:
-                label.show()                                            # show labels
             self.label_toggle = True                                    # set to 'on'
+            self.updateLabels()
+            self.taskMgr.doMethodLater(LABEL_INTERVAL, self.updateLabels, 'updateLabels')
 
-    def toggleBounding(self):
-        """Toggles visibility of robot bounding box (selection box)"""
-        children = self.selected_robot.getChildren()
-        for child in children:
-            if child.getName().split('/')[-1] == 'lines':               # find line node in children of root
-                if child.isHidden():                                    # if bounding box is hidden
-                    child.show()
-                else:                                                   # if bounding box is visible
-                    child.hide()
-                break
+    def labelledRobots(self):
+        """
+        Determines which robots should be labelled
+        Returns:
+            `ids`: IDs of the robots nearest the camera (within LABEL_DISTANCE) and of the selected robot (set)
+        """
+        ids, distances = self.cameraDistances()
+        labelled = {ids[i] for i in np.argsort(distances)[:LABEL_ROBOTS] if distances[i] <= LABEL_DISTANCE}
+        if hasattr(self, 'selected_id'):
+            labelled.add(self.selected_id)
+        return labelled
+
+    def updateLabels(self, task=None):
+        """
+        Builds labels for robots that have come near the camera, and removes labels of robots that are no longer near
+        Args:
+            `task`: Panda3D task, when called every LABEL_INTERVAL (Task) **optional**
+        Returns:
+            `task.again` if called as a task
+        """
+        labelled = self.labelledRobots()
+        for id in list(self.labels):
+            if id not in labelled:
+                for label in self.labels.pop(id):
+                    label.removeNode()
+        for id in labelled:
+            if id not in self.labels:
+                self.labels[id] = self.buildLabels(id)
+        if task is not None:
+            return task.again
+
+    def buildLabels(self, id):
+        """
+        Builds the labels of a robot's components
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `labels`: labels of robot (NodePath[])
+        """
+        core, template, origin, _ = self.bodies[id]
+        nodes = {node.getName(): node for node in core.findAllMatches('**/=robot')}     # components, by component ID
+        labels = [self.displayLabel(pos=origin, text='Robot ' + str(id), parent=core, core=core)]
+        for (_, dst, _, _), pose in zip(template.connections, template.poses):
+            comp_id = template.parts[dst][0]
+            labels.append(self.displayLabel(pos=origin + LVector3f(pose[0], pose[1], pose[2]), text=comp_id, parent=nodes[comp_id], core=core))
+        return labels
+
+    def cameraDistances(self, ids=None):
+        """
+        Calculates the distance of robots from the camera
+        Args:
+            `ids`: IDs of robots (int[]) **optional**, defaults to every rendered robot
+        Returns:
+            `(ids, distances)`: IDs of robots (int[]) and their distances from the camera (float ndarray)
+        """
+        ids = list(self.bodies) if ids is None else ids
+        if not ids or self.camera is None:
+            return [], np.zeros(0)                                      # no camera without graphics
+        positions = np.array([tuple(self.robot_pos[id]) for id in ids])
+        return ids, np.linalg.norm(positions - tuple(self.camera.getPos(self.render)), axis=1)
+
+    def updateLOD(self, task=None):
+        """
+        Switches robots between high poly models (near the camera), standard models and box impostors (far from the camera).
+        A robot only switches once it is LOD_HYSTERESIS past a switching distance, so robots at that distance don't flicker
+        Args:
+            `task`: Panda3D task, when called every LOD_INTERVAL (Task) **optional**
+        Returns:
+            `task.again` if called as a task
+        """
+        ids, distances = self.cameraDistances()
+        if ids:
+            current = np.array([self.lod[id] for id in ids])
+            switches = np.array([LOD_HIGH, LOD_BOX])
+            coarsest = np.searchsorted(switches * (1 - LOD_HYSTERESIS), distances)    # least detailed level robot may stay at
+            finest = np.searchsorted(switches * (1 + LOD_HYSTERESIS), distances)      # most detailed level robot may stay at
+            levels = np.clip(current, finest, coarsest)
+            for i in np.flatnonzero(levels != current):
+                self.setLOD(ids[i], int(levels[i]))
+        if task is not None:
+            return task.again
+
+    def setLOD(self, id, level):
+        """
+        Draws a robot at a level of detail, building its high poly body or box impostor the first time they are needed
+        Args:
+            `id`: ID of robot (int)  
+            `level`: level of detail (0: high poly, 1: standard, 2: box) (int)
+        """
+        self.showLevels([other for other in self.tiles.touch(id) if other != id])     # robot's tile is drawn robot by robot again
+        core, template, origin, (box_min, box_max) = self.bodies[id]
+        high = core.find('high_poly')
+        impostor = core.find('impostor')
+        if level == 0 and high.isEmpty():
+            body = self.high_bodies.get(template)
+            if body is None:
+                body = self.buildBody(template, high_poly=True)
+                self.high_bodies[template] = body
+            high = core.attachNewNode('high_poly')
+            high.setPos(origin)
+            body.instanceTo(high)                                       # geometry shared by robots with this body
+        if level == 2 and impostor.isEmpty():
+            impostor = self.impostorNode(origin + box_min, origin + box_max)
+            impostor.reparentTo(core)
+
+        # standard models are children of the core, so hide the core and show the chosen level through it
+        if level == 1:
+            core.show()
+        else:
+            core.hide()
+        for node, node_level in ((high, 0), (impostor, 2)):
+            if node.isEmpty():
+                continue
+            if level == node_level:
+                node.showThrough()
+            else:
+                node.hide()
+        self.lod[id] = level
+
+    def impostorNode(self, box_min, box_max):
+        """
+        Creates a box drawn in place of a robot
+        Args:
+            `box_min`: min. corner of robot's bounding box (LPoint3f)  
+            `box_max`: max. corner of robot's bounding box (LPoint3f)
+        Returns:
+            `impostor`: box, not yet parented to anything (NodePath)
+        """
+        impostor = NodePath('impostor')
+        self.impostor.instanceTo(impostor)
+        impostor.setPos((box_min + box_max) / 2)
+        impostor.setScale((box_max - box_min) / 2)                      # unit box scaled to robot's bounding box
+        impostor.setColorScale(BRICK_COLOUR)
+        impostor.setLightOff()
+        return impostor
+
+    def showLevels(self, ids):
+        """
+        Draws robots at their levels of detail again (or as boxes if they aren't built), once the batch of the tile they're in is removed
+        Args:
+            `ids`: IDs of robots (int[])
+        """
+        for id in ids:
+            if id in self.paged:
+                self.paged[id].show()
+            else:
+                self.setLOD(id, self.lod[id])
+
+    def flattenTiles(self, task=None):
+        """
+        Batches the robots in tiles that haven't changed for TILE_SETTLE seconds: the robots' geometry is merged into one flattened node
+        per tile, which is drawn instead of the robots. Only tiles whose robots are all drawn with standard models or all drawn as boxes
+        are batched, as the level of detail of each robot is otherwise drawn robot by robot
+        Args:
+            `task`: Panda3D task, when called every TILE_INTERVAL (Task) **optional**
+        Returns:
+            `task.again` if called as a task
+        """
+        for key in self.tiles.settled(TILE_SETTLE, limit=TILE_BATCHES):
+            ids = list(self.tiles.members.get(key, ()))
+            levels = {self.lod.get(id, 2) for id in ids}               # robots that aren't built are drawn as boxes
+            if len(ids) < 2 or levels not in ({1}, {2}):
+                continue                                                # nothing to merge, or levels of detail are mixed
+            if levels == {1}:
+                self.tiles.batch(key, [node for id in ids for node in self.tiles.geometry[id]])
+                for id in ids:
+                    self.bodies[id][0].hide()                           # labels, selection box etc. are still shown through
+            else:
+                impostors = [self.paged[id] if id in self.paged else self.bodies[id][0].find('impostor') for id in ids]
+                self.tiles.batch(key, [node for impostor in impostors for node in impostor.findAllMatches('**/+GeomNode')])
+                for impostor in impostors:
+                    impostor.hide()
+        if task is not None:
+            return task.again
+
+    def moveSelectionBox(self):
+        """Moves the selection box onto the selected robot, scaled to the robot's bounding box"""
+        core, _, origin, (box_min, box_max) = self.bodies[self.selected_id]
+        self.selection_box.reparentTo(core)                             # moves with robot
+        self.selection_box.setPos(origin + (box_min + box_max) / 2)
+        self.selection_box.setScale((box_max - box_min) / 2)
+        self.selection_box.showThrough()                                # core is hidden at other levels of detail
 
     def switchFocus(self):
         """Switches camera focus (origin) between robots in scene"""
-        while self.focus_switch_counter > self.swarm_size - 1:          # loop around to start of list
-            self.focus_switch_counter -= self.swarm_size
+        rendered = len(self.robot_pos)                                  # robots may still be rendering
+        if rendered == 0:
+            return
+        while self.focus_switch_counter > rendered - 1:                 # loop around to start of list
+            self.focus_switch_counter -= rendered
         # print(f'Moving camera to robot {self.focus_switch_counter} at {list(self.robot_pos.values())[self.focus_switch_counter]}')
         self.moveCamera(pos=list(self.robot_pos.values())[self.focus_switch_counter], z_dist=800)      # move camera to next robot
         self.focus_switch_counter += 1
@@ -197,15 +507,18 @@ class Environment(ShowBase):
             `z_dist`: distance above pos that camera is placed at (int)
         """
         self.focus.setPos(pos)                                          # move focus of camera
+        if self.camera is None:
+            return
         self.disableMouse()
         self.camera.setPos(LVector3f(0, 0, z_dist))                     # move camera relative to focus
         self.camera.setHpr(0, -90, 0)                                   # make camera look down
 
-        # make sure camera stays after mouse is enabled
-        mat = Mat4(self.camera.getMat())
-        mat.invertInPlace()
-        self.mouseInterfaceNode.setMat(mat)
-        self.enableMouse()
+        # make sure camera stays after mouse is enabled (no mouse if rendering offscreen)
+        if self.mouseWatcherNode is not None:
+            mat = Mat4(self.camera.getMat())
+            mat.invertInPlace()
+            self.mouseInterfaceNode.setMat(mat)
+            self.enableMouse()
 
     def enlargeLabel(self, pickedObj):
         """
@@ -225,63 +538,127 @@ class Environment(ShowBase):
                     child.setScale(3, 3, 3)                             # return to original size
                     break
 
-    def displayLabel(self, pos, text, parent):
+    def displayLabel(self, pos, text, parent, core):
         """
-        Displays a text label in the scene
+        Displays a text label in the scene, sharing text geometry with other labels with the same text
         Args:
-            `pos`: position of label (LVector3f)  
+            `pos`: position of labelled component relative to robot's core node (LVector3f)  
             `text`: text of label (String)  
-            `parent`: parent of label (NodePath)
+            `parent`: parent of label (NodePath)  
+            `core`: core component of robot (NodePath)
+        Returns:
+            `label`: label node (NodePath)
         """
-        # add text node
-        label = TextNode('id_label')
-        label.setText(text)
-        label.setAlign(TextNode.ACenter)
-        label.setCardAsMargin(0, 0, 0, 0)
-        label.setCardDecal(True)
+        geom = self.label_geoms.get(text)
+        if geom is None:
+            # add text node
+            label = TextNode('id_label')
+            label.setText(text)
+            label.setAlign(TextNode.ACenter)
+            label.setCardAsMargin(0, 0, 0, 0)
+            label.setCardDecal(True)
+            label.setTextColor(1, 1, 1, 1)
+            label.setCardColor(1, 1, 1, 0.3)
+            geom = NodePath(label.generate())                       # text geometry, generated once per text
+            self.label_geoms[text] = geom
 
         # add node path in scene for label
-        text3d = NodePath(label)                                   # add text to node
+        text3d = parent.attachNewNode('id_label')
+        geom.instanceTo(text3d)                                     # share text geometry
         text3d.setScale(3, 3, 3)
+        if hasattr(self, 'selected_comp') and parent == self.selected_comp:
+            text3d.setScale(6, 6, 6)                                # label of selected component stays enlarged
         text3d.setTwoSided(True)
-        text3d.setBillboardPointEye()                              # make text billboard (move with camera)
-        text3d.reparentTo(parent)
-        text3d.setPos(self.render, pos + LVector3f(0, 0, 20))      # set pos above component model
-        self.labels.append(text3d)
+        text3d.setLightOff()                                        # remove lighting on labels
+        text3d.setBillboardPointEye()                               # make text billboard (move with camera)
+        text3d.showThrough()                                        # shown at every level of detail
+        text3d.setPos(core, pos + LABEL_HEIGHT)                     # set pos above component model
+        return text3d
 
     def select(self):
         """Determines which robot is selected (by mouse click), updates self.selected_robot to represent this"""
         mpos = self.mouseWatcherNode.getMouse()
         self.pickerRay.setFromLens(self.camNode, mpos.getX(), mpos.getY())
 
-        self.myTraverser.traverse(self.render)
-        # get objects close to mouse click
+        self.myTraverser.traverse(self.robotNode)
+        # get picking boxes close to mouse click
         if self.myHandler.getNumEntries() > 0:
             self.myHandler.sortEntries()
-            pickedObj = self.myHandler.getEntry(0).getIntoNodePath()    # = closest to mouse click
-            pickedObj = pickedObj.findNetTag('robot')                   # find selectable objects (pre-tagged 'robot')
-            if not pickedObj.isEmpty():
-                # if a robot was previously selected
-                if hasattr(self, 'selected_robot'):
-                    self.toggleBounding()                               # hide old selection box
-
-                self.enlargeLabel(pickedObj)
-                self.selected_comp = pickedObj
-
-                # find Core comp. of robot in which the comp. is currently selected
-                while True:
-                    if 'Core' not in pickedObj.getName():
-                        pickedObj = pickedObj.parent
-                    else:
-                        break
-                self.selected_robot = pickedObj                         # set class attribute to selected robot core
-                self.toggleBounding()                                   # show new selection box
-                # update selected robot and component displays
-                if self.selected_robot.getName()[0].isdigit() and self.selected_robot.getName()[1].isdigit():
-                    sel_text = 'Selected Robot: ' + self.selected_robot.getName()[0:2] + '\nSelected Component: ' + self.selected_comp.getName()
-                else:
-                    sel_text = 'Selected Robot: ' + self.selected_robot.getName()[0] + '\nSelected Component: ' + self.selected_comp.getName()
-                self.sel_textNode.setText(sel_text)
+            picked = self.myHandler.getEntry(0).getIntoNodePath()       # = closest to mouse click
+            self.selectRobot(*self.pickedIds(picked))
+
+    def selectRobot(self, robot_id, comp_id):
+        """
+        Selects a robot and one of its components, updating the selection displays and the robot's warnings
+        Args:
+            `robot_id`: ID of robot (int)  
+            `comp_id`: ID of component (String)
+        """
+        comp = self.componentNode(robot_id, comp_id)
+        self.enlargeLabel(comp)
+        self.selected_comp = comp
+        self.selected_robot = self.bodies[robot_id][0]                  # set class attribute to selected robot core
+        self.selected_id = robot_id
+        self.moveSelectionBox()                                         # show selection box on new robot
+        if self.label_toggle:
+            self.updateLabels()                                         # label selected robot
+        # update selected robot and component displays
+        self.sel_textNode.setText('Selected Robot: {}\nSelected Component: {}'.format(robot_id, comp_id))
+        self.showWarnings(robot_id, *self.checkRobot(robot_id))
+
+    def pickedIds(self, picked):
+        """
+        Gets the robot and component a picking box belongs to
+        Args:
+            `picked`: path to the picking box hit (NodePath)
+        Returns:
+            `(robot_id, comp_id)`: ID of the robot and of the component (int, String)
+        """
+        return picked.getNetPythonTag('robot'), picked.getPythonTag('component')
+
+    def componentNode(self, robot_id, comp_id):
+        """
+        Finds the node of a robot's component
+        Args:
+            `robot_id`: ID of robot (int)  
+            `comp_id`: ID of component (String)
+        Returns:
+            `node`: component's node, the robot's core node for its core component (NodePath)
+        """
+        core, template, _, _ = self.bodies[robot_id]
+        if comp_id == template.parts[template.connections[0][0]][0]:
+            return core
+        for node in core.findAllMatches('**/=robot'):
+            if node.getTag('robot') == comp_id:
+                return node
+
+    def pickProxies(self, template):
+        """
+        Builds picking boxes for a body, one per component (the component model's bounding box), relative to the core
+        Args:
+            `template`: laid out body (BodyTemplate)
+        Returns:
+            `pick`: collision nodes of the body's picking boxes, each tagged with its component ID, shared by robots with the body (NodePath)
+        """
+        pick = self.pick_boxes.get(template)
+        if pick is not None:
+            return pick
+        pick = NodePath('pick_boxes')
+        root = template.connections[0][0]
+        placed = [(root, (0, 0, 0, 0, 0))] + [(dst, pose) for (_, dst, _, _), pose in zip(template.connections, template.poses)]
+        for index, (x, y, z, heading, roll) in placed:
+            comp_id, type = template.parts[index][0], template.parts[index][1]
+            part_min, part_max = self.partBox(type, heading, roll)      # model bounds, rotated as the component is placed
+            centre = (part_min + part_max) / 2 + (x, y, z)
+            half = (part_max - part_min) / 2
+            node = CollisionNode('pick')
+            node.addSolid(CollisionBox(LPoint3f(*centre), *half))
+            node.setIntoCollideMask(PICK_MASK)
+            node.setFromCollideMask(BitMask32.allOff())
+            node.setPythonTag('component', comp_id)
+            pick.attachNewNode(node)
+        self.pick_boxes[template] = pick
+        return pick
 
     def moveRobot(self, direction):
         """
@@ -320,33 +697,459 @@ class Environment(ShowBase):
         shift = SHIFT_DIRECTION[direction]                                  # get direction of shift
         # move robot
         self.selected_robot.setPos(self.render, self.selected_robot.getPos(self.render) + shift)
-        # update robot position
-        self.robot_pos[int(self.selected_robot.getName()[0])] = self.selected_robot.getPos(self.render)
+        # update robot position (the core node is at the robot's origin when it is first rendered)
+        self.robot_pos[self.selected_id] = self.render.getRelativePoint(self.selected_robot, self.bodies[self.selected_id][2])
+        self.showLevels(self.tiles.move(self.selected_id, self.robot_pos[self.selected_id]))     # robot may have moved into another tile
+        self.showWarnings(self.selected_id, *self.checkRobot(self.selected_id))
+
+    def rotateRobot(self, heading):
+        """
+        Rotates selected robot about its core
+        Args:
+            `heading`: degrees to turn robot by (int)
+        """
+        self.turnRobot(self.selected_id, heading)
+        self.showWarnings(self.selected_id, *self.checkRobot(self.selected_id))
+
+    def turnRobot(self, id, heading):
+        """
+        Turns a built robot about its core
+        Args:
+            `id`: ID of robot (int)  
+            `heading`: degrees to turn robot by (int)
+        """
+        core = self.bodies[id][0]
+        pivot = self.robot_pos[id]
+        rotation = Mat4.translateMat(-pivot) * Mat4.rotateMat(heading, LVector3f(0, 0, 1)) * Mat4.translateMat(pivot)
+        core.setMat(self.render, core.getMat(self.render) * rotation)
+        self.showLevels(self.tiles.touch(id))
+
+    def robotBounds(self, id):
+        """
+        Calculates the bounding box of a robot where it is now (after any moves or rotations)
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `(min, max)`: corners of the bounding box, in scene coords ((3,) float ndarray, (3,) float ndarray)
+        """
+        if id in self.paged:
+            box_min, box_max = self.pagedBox(id)
+            return np.array(box_min, dtype=float), np.array(box_max, dtype=float)
+        core, _, origin, (box_min, box_max) = self.bodies[id]
+        corners = np.array([[x, y, z] for x in (box_min[0], box_max[0]) for y in (box_min[1], box_max[1]) for z in (box_min[2], box_max[2])])
+        corners = self.sceneCoords(core, corners + np.array(origin, dtype=float))     # box is relative to robot's origin
+        return corners.min(axis=0), corners.max(axis=0)
+
+    def updateBounds(self, id):
+        """
+        Recalculates a robot's bounds where it is now, updating them in place (so the robot's own bounds stay current) and in the
+        collision index
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `(min, max)`: corners of the bounding box, in scene coords ((3,) float ndarray, (3,) float ndarray)
+        """
+        lower, upper = self.robotBounds(id)
+        self.robot_bounds.setdefault(id, [])[:] = [float(v) for v in (upper[0], lower[0], upper[1], lower[1], upper[2], lower[2])]
+        self.collision_index.update(id, lower, upper)
+        return lower, upper
+
+    def sceneCoords(self, core, points):
+        """
+        Transforms points relative to a robot's core node into scene coords
+        Args:
+            `core`: core node of robot (NodePath)  
+            `points`: points relative to core node ((..., 3) float ndarray)
+        Returns:
+            `points`: points in scene coords ((..., 3) float ndarray)
+        """
+        mat = core.getMat(self.render)
+        mat = np.array([[mat.getCell(row, col) for col in range(4)] for row in range(4)])
+        return points @ mat[:3, :3] + mat[3, :3]                       # Panda3D transforms row vectors
+
+    def componentBoxes(self, id):
+        """
+        Calculates the box of each of a robot's components where the robot is now
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `(ids, lower, upper)`: ID of each component (String[]) + min. and max. corners of their boxes, in scene coords
+            ((N, 3) float ndarray, (N, 3) float ndarray)
+        """
+        if id in self.bodies:
+            template = self.bodies[id][1]
+        else:
+            robot = self.pageable[id][0]
+            template = robot.template if robot.template is not None else BodyTemplate.fromBody(robot.components, robot.connections)
+        if template not in self.layouts:
+            self.layouts[template] = BodyLayout(template)
+        boxes = self.layouts[template].boxes
+        placed = np.flatnonzero(~np.isnan(boxes[:, 0, 0]))
+        ids = [template.parts[i][0] for i in placed]
+        boxes = boxes[placed]
+        # corners of each box, relative to the core
+        corners = np.stack([np.stack([boxes[:, i, 0], boxes[:, j, 1], boxes[:, k, 2]], axis=1)
+                            for i in (0, 1) for j in (0, 1) for k in (0, 1)], axis=1)
+        if id in self.paged:
+            corners = corners @ hprMatrix(self.pageable[id][3], 0) + np.array(self.robot_pos[id], dtype=float)
+            return ids, corners.min(axis=1), corners.max(axis=1)
+        # geometry is placed at the robot's origin
+        corners = self.sceneCoords(self.bodies[id][0], corners + np.array(self.bodies[id][2], dtype=float))
+        return ids, corners.min(axis=1), corners.max(axis=1)
+
+    def checkRobot(self, id):
+        """
+        Updates a robot's box in the collision index, then checks the robot against the robots whose boxes overlap it
+        (component by component) and the edges of the environment
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `(collisions, out_of_bounds)`: robots the robot collides with, each with the IDs of every pair of colliding components
+            ([int, int, String[][]][]) + x and y values of how far the robot is out of bounds (int[]), `None` if it isn't
+        """
+        lower, upper = self.updateBounds(id)
+        collisions = []
+        neighbours = self.collision_index.neighbours(id)
+        if neighbours:
+            ids, first_lower, first_upper = self.componentBoxes(id)
+            for other in neighbours:
+                other_ids, second_lower, second_upper = self.componentBoxes(other)
+                overlap = np.all((first_upper[:, None] >= second_lower[None]) & (first_lower[:, None] <= second_upper[None]), axis=2)
+                if overlap.any():
+                    collisions.append([id, other, [[ids[i], other_ids[j]] for i, j in zip(*np.nonzero(overlap))]])
+        indices, units = outOfBounds([upper[0], lower[0], upper[1], lower[1], upper[2], lower[2]], self.x_length, self.y_length)
+        return collisions, (units[0].tolist() if len(indices) else None)
+
+    def showWarnings(self, id, collisions, out_of_bounds):
+        """
+        Shows a robot's collisions and how far it is out of bounds (from **checkRobot**), hiding the warning if there are none
+        Args:
+            `id`: ID of robot (int)  
+            `collisions`: robots the robot collides with, with their colliding components ([int, int, String[][]][])  
+            `out_of_bounds`: x and y values of how far the robot is out of bounds (int[]), `None` if it isn't
+        """
+        warning_text = ''
+        for first_id, second_id, components in collisions:
+            warning_text += 'Possible Collision Between:\nRobot {}, Robot {}\n'.format(first_id, second_id)
+            for first, second in components:
+                warning_text += '    Component {}, Component {}\n'.format(first, second)
+        if out_of_bounds is not None:
+            warning_text += 'Robot {} out of bounds:\n'.format(id)
+            if out_of_bounds[0] != 0:
+                warning_text += 'x-axis = {} units\n'.format(int(out_of_bounds[0]))
+            if out_of_bounds[1] != 0:
+                warning_text += 'y-axis = {} units\n'.format(int(out_of_bounds[1]))
+        self.showMessage(warning_text.rstrip('\n'))
+
+    def showMessage(self, text):
+        """
+        Shows a message in the warning text over the scene (until a robot is selected), hiding it if the message is empty
+        Args:
+            `text`: message to show (String)
+        """
+        if not text:
+            self.warning_textNode.hide()
+            return
+        self.warning_textNode.setText(text)
+        self.warning_textNode.show()
 
     def initialView(self):
         """Moves and zooms camera so that all robots are initially placed in the camera's view"""
-        # move + zoom camera to overlook all robots
         bounds = self.robotNode.getBounds()                                             # bounding box of all robots together
+        if bounds.isEmpty():
+            self.planeView()                                                            # no robots rendered yet
+            return
+        self.viewBounds(bounds)
+
+    def saveImage(self, path):
+        """
+        Renders the scene and saves it as an image (when rendering offscreen, or from the window)
+        Args:
+            `path`: file path of image, the format is taken from its extension (String)
+        Returns:
+            `saved`: whether the image was saved, `False` if there is no graphics output (boolean)
+        """
+        if self.win is None:
+            return False
+        # tasks don't run without a window, so build + switch robots for the camera's view first
+        if self.page_budget is not None:
+            self.updatePages()
+        self.updateLOD()
+        self.graphicsEngine.renderFrame()
+        self.graphicsEngine.renderFrame()                               # frames are double buffered
+        return self.win.saveScreenshot(Filename.fromOsSpecific(path))
+
+    def planeView(self):
+        """Moves and zooms camera so that the whole environment plane is in the camera's view (before any robots are rendered)"""
+        self.viewBounds(self.plane.getBounds())
+
+    def viewBounds(self, bounds):
+        """
+        Moves and zooms camera to overlook a bounding volume
+        Args:
+            `bounds`: bounding volume to fit in the camera's view (BoundingVolume)
+        """
+        if self.camLens is None:
+            return                                                                      # no camera without graphics
         centre = bounds.getCenter()                                                     # centre of bounding box
         fov = self.camLens.getFov()
-        distance = bounds.getRadius() / math.tan(deg2rad(min(fov[0], fov[1]) * 0.6))    # calc distance needed to see all robots
+        distance = bounds.getRadius() / math.tan(deg2rad(min(fov[0], fov[1]) * 0.6))    # calc distance needed to see all of bounds
         self.moveCamera(pos=centre, z_dist=distance)
 
+    def setProgress(self, count, total):
+        """
+        Shows how many robots have been rendered while the scene is built, hiding the progress once all are rendered
+        Args:
+            `count`: number of robots rendered so far (int)  
+            `total`: number of robots in swarm (int)
+        """
+        if count >= total:
+            self.progress_textNode.hide()
+            return
+        self.progress_textNode.setText('Rendering Robots: {}/{}'.format(count, total))
+        self.progress_textNode.show()
+
     def reposition(self, pack_info):
         """
         Repositions Robots and resizes environment based on the info received from the robotUtils _auto_pack_ method
         Args:
-            `pack_info`: contains positions of robots and dims of environment to fit them (Tuple)
+            `pack_info`: contains (x, y) positions of robots ((N, 2) ndarray) and dims of environment to fit them (Tuple)
         """
         positions = pack_info[0]
+        self.x_length, self.y_length = pack_info[1], pack_info[2]
         self.plane.setScale(pack_info[1], pack_info[2], 10)                             # resize environment to fit all robots
         print('Resized environment to {} by {} units'.format(pack_info[1], pack_info[2]))
-        robots = self.robotNode.getChildren()
-        # iterate through all robots in scene and reposition
+        if self.instances:
+            # move instances of robots rendered instanced
+            for i, (robot_id, swarm, index) in enumerate(self.instances):
+                new_pos = LVector3f(positions[i][0], positions[i][1], 0)
+                swarm.setPosition(index, new_pos)
+                shift = new_pos - self.robot_pos[robot_id]
+                self.robot_bounds[robot_id][:] = [bound + shift[axis // 2] for axis, bound in enumerate(self.robot_bounds[robot_id])]
+                self.robot_pos[robot_id] = new_pos                                      # update robot position
+            for swarm in {swarm for _, swarm, _ in self.instances}:                 # each swarm once
+                swarm.update()
+            return
+        # iterate through all robots in scene (in the order they were rendered) and reposition
+        for i, id in enumerate(list(self.robot_pos)):
+            new_pos = LVector3f(positions[i][0], positions[i][1], self.robot_pos[id][2])
+            if id in self.paged:
+                self.paged[id].setPos(self.paged[id].getPos() + new_pos - self.robot_pos[id])     # robot isn't built, move its box
+            else:
+                core = self.bodies[id][0]
+                core.setPos(self.render, core.getPos(self.render) + new_pos - self.robot_pos[id])     # (robot may be rotated)
+            self.robot_pos[id] = new_pos                                                # update robot position
+            self.showLevels(self.tiles.move(id, new_pos))                               # migrate robot to its new tile
+            self.updateBounds(id)
+
+    def renderInstanced(self, robots):
+        """
+        Renders a swarm with hardware instancing: each distinct body is uploaded once and drawn for every robot that shares it.
+        Robots rendered this way can't be selected, moved by hand or labelled
+        Args:
+            `robots`: robots to render (Robot[])
+        Returns:
+            `instanced`: whether the swarm was rendered, `False` if the graphics device doesn't support instancing
+            or the robots don't share body templates (boolean)
+        """
+        if not instancingSupported(self.win.getGsg() if self.win else None):
+            return False
+        if any(robot.template is None for robot in robots):
+            return False
+        groups = {}                                                     # template id -> indices of robots sharing it
         for i, robot in enumerate(robots):
-            new_pos = LVector3f(positions[i][0], positions[i][1], 0)
-            robot.setPos(self.render, new_pos)
-            self.robot_pos[i] = new_pos                                                 # update robot position
+            groups.setdefault(id(robot.template), []).append(i)
+
+        self.instances = [None] * len(robots)
+        for indices in groups.values():
+            template = robots[indices[0]].template
+            layout = BodyLayout(template)
+            template.setPoses(layout.poses)
+            positions = np.array([robots[i].core_pos for i in indices], dtype=float).reshape(-1, 3)
+            swarm = InstancedSwarm(self.buildBody(template), positions)
+            swarm.node.reparentTo(self.robotNode)
+            for index, i in enumerate(indices):
+                robot = robots[i]
+                self.robot_pos[robot.id] = LVector3f(*positions[index])
+                robot.bounds = [float(v) for v in layout.bounds(positions[index])]    # bounds without a node tree
+                self.robot_bounds[robot.id] = robot.bounds
+                self.instances[i] = (robot.id, swarm, index)
+        return True
+
+    def buildBody(self, template, high_poly=False):
+        """
+        Builds a flattened body from a laid out template, relative to the core, for drawing instanced or at a high level of detail
+        Args:
+            `template`: laid out body (BodyTemplate)  
+            `high_poly`: whether the body is built from the high poly models (boolean) **optional**
+        Returns:
+            `body`: body with as few geoms as possible (NodePath)
+        """
+        body = NodePath('body')
+        root = template.connections[0][0]
+        nodes = {root: self.bodyModel(template.parts[root][1], high_poly)}
+        nodes[root].reparentTo(body)
+        for (src, dst, _, _), pose in zip(template.connections, template.poses):
+            type = template.parts[dst][1]
+            node = self.bodyModel(type, high_poly)
+            node.setColor(HINGE_COLOUR if 'Hinge' in type else BRICK_COLOUR)
+            node.reparentTo(nodes[src])
+            node.setHpr(body, pose[3], 0, pose[4])
+            node.setPos(body, LVector3f(pose[0], pose[1], pose[2]))
+            nodes[dst] = node
+        # high poly bodies are drawn like the standard models, so they keep their models' lights + materials
+        if not high_poly:
+            # drop the lights + cameras exported with each model so that components with the same colour merge into one geom
+            for node in body.findAllMatches('**/+LightNode') + body.findAllMatches('**/+Camera'):
+                node.getParent().removeNode()
+            for node in nodes.values():
+                node.clearLight()
+            # materials + textures (plain white) are replaced by the instancing shader, and would stop geoms from merging
+            for node in body.findAllMatches('**/+GeomNode'):
+                for i in range(node.node().getNumGeoms()):
+                    state = node.node().getGeomState(i).removeAttrib(MaterialAttrib).removeAttrib(TextureAttrib)
+                    node.node().setGeomState(i, state)
+                node.setState(node.getState().removeAttrib(MaterialAttrib).removeAttrib(TextureAttrib))
+        body.clearModelNodes()
+        body.flattenStrong()
+        return body
+
+    def bodyModel(self, type, high_poly=False):
+        """
+        Gets a new node for a component of a built body
+        Args:
+            `type`: component type (String)  
+            `high_poly`: whether to use the type's high poly model (boolean) **optional**
+        Returns:
+            `node`: copy of the type's model, lined up with the standard model (NodePath)
+        """
+        if not high_poly:
+            return self.models.get(type)
+        node = NodePath(type)
+        model = self.models.get(HIGH_POLY_MODEL.format(type))
+        model.setHpr(HIGH_POLY_HPR.get(type, (0, 0, 0)))
+        model.reparentTo(node)
+        return node
+
+    def addRobot(self, robot):
+        """
+        Adds a robot to the scene. With a page budget the robot is laid out (without models) and drawn as a box, and is only built
+        once it is near the camera, otherwise it is rendered straight away
+        Args:
+            `robot`: robot to add (Robot)
+        """
+        if self.page_budget is None:
+            self.renderRobot(robot)
+            return
+        # lay out robot without loading models, for its bounds + so it can be built from its template
+        if robot.template is not None and robot.template in self.layouts:
+            layout = self.layouts[robot.template]
+            robot.bounds = [float(v) for v in layout.bounds(robot.core_pos)]
+        else:
+            layout = layoutRobot(robot)
+            if robot.template is not None:
+                self.layouts[robot.template] = layout
+        size = len(robot.template.parts) if robot.template is not None else len(robot.components)
+        self.pageable[robot.id] = (robot, size, (LPoint3f(*layout.min), LPoint3f(*layout.max)), 0)
+        self.robot_pos[robot.id] = LVector3f(robot.core_pos[0], robot.core_pos[1], robot.core_pos[2])
+        self.pageOut(robot.id)
+        robot.bounds = self.robot_bounds[robot.id]                     # kept current as the robot is moved
+
+    def pageOut(self, id):
+        """
+        Draws a box in place of a robot that isn't built
+        Args:
+            `id`: ID of robot (int)
+        """
+        self.paged[id] = self.impostorNode(*self.pagedBox(id))
+        self.showLevels(self.tiles.add(id, self.paged[id], self.robot_pos[id]))
+        self.updateBounds(id)
+
+    def pagedBox(self, id):
+        """
+        Calculates the box drawn in place of a robot that isn't built, turned to the robot's heading
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `(min, max)`: corners of the box, in scene coords (LPoint3f, LPoint3f)
+        """
+        _, _, (box_min, box_max), heading = self.pageable[id]
+        box_min, box_max = placedBox((tuple(box_min), tuple(box_max)), heading, 0)    # turning by right angles keeps the box aligned
+        pos = self.robot_pos[id]
+        return LPoint3f(*box_min) + pos, LPoint3f(*box_max) + pos
+
+    def pageIn(self, id):
+        """
+        Builds a robot that was drawn as a box
+        Args:
+            `id`: ID of robot (int)
+        """
+        robot = self.pageable[id][0]
+        self.showLevels(self.tiles.remove(id))
+        self.paged.pop(id).removeNode()
+        robot.core_pos = list(self.robot_pos[id])                       # robot may have been moved since it was last built
+        self.renderRobot(robot)
+        heading = self.pageable[id][3]
+        if heading:
+            self.turnRobot(id, heading)                                 # robot may have been turned since it was last built
+            self.updateBounds(id)
+
+    def unloadRobot(self, id):
+        """
+        Tears down a built robot's nodes (and labels), drawing it as a box until it is built again
+        Args:
+            `id`: ID of robot (int)
+        """
+        robot, size, box, _ = self.pageable[id]
+        core = self.bodies.pop(id)[0]
+        self.pageable[id] = (robot, size, box, int(round(core.getH(self.render))) % 360)     # keep the robot's heading for its box
+        del self.lod[id]
+        for label in self.labels.pop(id, []):
+            label.removeNode()
+        self.showLevels(self.tiles.remove(id))
+        core.removeNode()
+        # drop every reference to the robot's nodes, so they are freed
+        robot.node = None
+        if robot.template is None:
+            for comp in robot.components:
+                comp.node = None
+        self.pageOut(id)
+
+    def updatePages(self, task=None):
+        """
+        Builds the robots nearest the camera (up to PAGE_DISTANCE away) that fit in the page budget, and unloads built robots that
+        no longer do. The selected robot is always kept built
+        Args:
+            `task`: Panda3D task, when called every PAGE_INTERVAL (Task) **optional**, only PAGE_TIME is spent building robots per task
+        Returns:
+            `task.again` if called as a task
+        """
+        if self.page_budget is None:
+            return                                                      # every robot is built
+        ids, distances = self.cameraDistances(list(self.pageable))
+        wanted = set()
+        if hasattr(self, 'selected_id') and self.selected_id in self.pageable:
+            wanted.add(self.selected_id)
+        used = sum(self.pageable[id][1] for id in wanted)
+        nearest = [ids[i] for i in np.argsort(distances) if distances[i] <= PAGE_DISTANCE]
+        for id in nearest:
+            size = self.pageable[id][1]
+            if used + size > self.page_budget:
+                break
+            if id not in wanted:
+                wanted.add(id)
+                used += size
+
+        for id in [id for id in self.bodies if id not in wanted]:
+            self.unloadRobot(id)                                        # unload first, so built robots never exceed the budget
+        start = time.perf_counter()
+        for id in nearest:
+            if id in wanted and id in self.paged:
+                self.pageIn(id)
+                if task is not None and time.perf_counter() - start > PAGE_TIME:
+                    break                                               # let the frame be drawn
+        if task is not None:
+            return task.again
 
     def renderRobot(self, robot):
         """
@@ -356,27 +1159,113 @@ class Environment(ShowBase):
         """
         # add position of robot core to list (for camera focus switching)
         self.robot_pos[robot.id] = LVector3f(robot.core_pos[0], robot.core_pos[1], robot.core_pos[2])
-        robot.connections[0].src.root = True
+        if robot.template is not None and robot.template.poses is not None:
+            # body already laid out, place components without building the robot's own components
+            box = self.renderTemplate(robot)
+            template = robot.template
+        else:
+            poses, box = self.renderConnections(robot)
+            template = robot.template
+            if template is None:
+                # robot's own laid out body, for labels + high poly models (comp. positions are lost when flattening)
+                template = BodyTemplate.fromBody(robot.components, robot.connections)
+                template.setPoses(poses)
+        # flatten nodes into one node per robot (performance optimisation)
+        robot.node.flattenStrong()
+        self.showLevels(self.tiles.add(robot.id, robot.node, self.robot_pos[robot.id]))  # place robot in its tile
+        # flattening moves the core's transform into its geometry, so the core's original position is the robot's origin
+        self.bodies[robot.id] = (robot.node, template, LPoint3f(self.robot_pos[robot.id]), box)
+        # picking boxes of robot, tagged with its ID
+        pick = robot.node.attachNewNode('pick')
+        pick.setPos(self.bodies[robot.id][2])
+        pick.setPythonTag('robot', robot.id)
+        self.pickProxies(template).instanceTo(pick)
+        self.lod[robot.id] = 1                                          # drawn with standard models until LOD is updated
+        self.updateBounds(robot.id)
+        robot.bounds = self.robot_bounds[robot.id]                      # kept current as the robot is moved
+
+    def renderCore(self, robot, type, id):
+        """
+        Loads and places the core component of a robot
+        Args:
+            `robot`: robot being rendered (Robot)  
+            `type`: component type of the core (String)  
+            `id`: component ID of the core (String)
+        Returns:
+            `src`: node of the core component (NodePath)
+        """
+        src = self.models.get(type)                                     # copy of core model
+        src.setPos(self.robot_pos[robot.id])                            # set core's position to robot core_pos
+        src.reparentTo(self.robotNode)                                  # set parent to robotNode
+        src.setName(str(robot.id) + id)                                 # set name of node to component ID
+        src.setTag('robot', str(robot.id) + id)                         # tag as selectable
+        robot.node = src
+        return src
+
+    def partBox(self, type, heading, roll):
+        """
+        Gets the box of a component's model once placed with a heading and roll (the model's bounds, rotated)
+        Args:
+            `type`: component type (String)  
+            `heading`: heading of component in degrees, a multiple of 90 (int)  
+            `roll`: roll of component in degrees, a multiple of 90 (int)
+        Returns:
+            `(min, max)`: corners of the box, relative to the component's position ((3,) float ndarray, (3,) float ndarray)
+        """
+        key = (type, int(heading) % 360, int(roll) % 360)
+        if key not in self.part_boxes:
+            self.part_boxes[key] = placedBox(modelBounds()[type], heading, roll)
+        return self.part_boxes[key]
+
+    def renderTemplate(self, robot):
+        """
+        Renders a robot whose shared body template has already been laid out, using the template's component poses
+        Args:
+            `robot`: robot object to render (Robot)
+        Returns:
+            `(min, max)`: corners of the robot's bounding box relative to its core, accumulated as components are placed (LPoint3f, LPoint3f)
+        """
+        template = robot.template
+        core = self.robot_pos[robot.id]
+        root = template.connections[0][0]
+        nodes = {root: self.renderCore(robot, template.parts[root][1], template.parts[root][0])}
+        box_min, box_max = self.partBox(template.parts[root][1], 0, 0)
+        for (src, dst, _, _), pose in zip(template.connections, template.poses):
+            id, type = template.parts[dst][0], template.parts[dst][1]
+            node = self.models.get(type)
+            node.setName(id)
+            node.setTag('robot', id)                                    # tag as selectable
+            node.setColor(HINGE_COLOUR if 'Hinge' in type else BRICK_COLOUR)
+            node.reparentTo(nodes[src])
+            node.setHpr(self.render, pose[3], 0, pose[4])
+            node.setPos(self.render, core + LVector3f(pose[0], pose[1], pose[2]))
+            nodes[dst] = node
+            part_min, part_max = self.partBox(type, pose[3], pose[4])
+            box_min, box_max = np.minimum(box_min, part_min + pose[:3]), np.maximum(box_max, part_max + pose[:3])
+        return LPoint3f(*box_min), LPoint3f(*box_max)
+
+    def renderConnections(self, robot):
+        """
+        Renders a robot by laying out each of its Connections, recording the layout in the robot's template (if it has one)
+        Args:
+            `robot`: robot object to render (Robot)
+        Returns:
+            `poses`: (x, y, z, heading, roll) of each connection's dest. component relative to the core ((float, float, float, float, float)[])  
+            `(min, max)`: corners of the robot's bounding box relative to its core, accumulated as components are placed (LPoint3f, LPoint3f)
+        """
+        core = self.robot_pos[robot.id]
+        poses = []
+        robot.connections[0].src.bounds = None                              # core bounds are recalculated every render
         # loop through connections in robot
         for i, connection in enumerate(robot.connections):
             # if src comp. is the core comp.
-            if connection.src.root and i == 0:
-                src_path = './models/BAM/' + connection.src.type + '.bam'   # get path of src model file
-                src = self.loader.loadModel(src_path)                       # load model of src component
-                # set core's position to robot core_pos
-                connection.src.pos = LVector3f(robot.core_pos[0], robot.core_pos[1], robot.core_pos[2])
-
-                src.setPos(connection.src.pos)                              # set position of src comp.
-                src.reparentTo(self.robotNode)                              # set parent to robotNode
-                src.setName(str(robot.id) + connection.src.id)              # set name of node to component ID
-                src.setTag('robot', str(robot.id) + connection.src.id)      # tag as selectable
-
-                # display robot id label text
-                self.displayLabel(pos=connection.src.pos, text='Robot ' + str(robot.id), parent=src)
-                connection.src.node = src                                   # add Panda3D node to RobotComp
+            if i == 0:
+                connection.src.pos = LVector3f(core)
+                connection.src.node = self.renderCore(robot, connection.src.type, connection.src.id)   # add Panda3D node to RobotComp
+                src = connection.src.node
+                box_min, box_max = self.partBox(connection.src.type, 0, 0)
 
-            dst_path = './models/BAM/' + connection.dst.type + '.bam'       # get path of destination model file
-            dst = self.loader.loadModel(dst_path)                           # load model of source component
+            dst = self.models.get(connection.dst.type)                      # copy of destination model
 
             if not connection.standardised:                                 # if connection isn't standardised
                 connection.standardiseSlots()                               # standardise slots
@@ -394,23 +1283,24 @@ class Environment(ShowBase):
             dst.setPos(self.render, connection.dst.pos)                     # set position of dest. comp.
 
             # apply orientation if comp. is a hinge
+            roll = 0
             if 'Hinge' in connection.dst.type:
-                connection.dst.orientation += connection.src.orientation
-                while connection.dst.orientation > 3:                       # scale orientation back to 0->3
-                    connection.dst.orientation -= 4
-                dst.setR(self.render, ORIENTATION[connection.dst.orientation])
+                # orientation in file is kept as is so the robot can be written back out
+                connection.dst.global_orientation = connection.dst.orientation + connection.src.global_orientation
+                while connection.dst.global_orientation > 3:                # scale orientation back to 0->3
+                    connection.dst.global_orientation -= 4
+                roll = ORIENTATION[connection.dst.global_orientation]
+                dst.setR(self.render, roll)
 
             connection.dst.node = dst                                      # add Panda3D node to robotComp
+            offset = connection.dst.pos - core
+            poses.append((offset[0], offset[1], offset[2], heading, roll))
+            part_min, part_max = self.partBox(connection.dst.type, heading, roll)
+            box_min, box_max = np.minimum(box_min, part_min + offset), np.maximum(box_max, part_max + offset)
 
-        # add all comp. labels
-        for i, connection in enumerate(robot.connections):
-            node = connection.dst.node
-            self.displayLabel(pos=node.getPos(self.render), text=node.getName(), parent=node)
-        robot.drawBounds()
-        # flatten nodes into one node per robot (performance optimisation)
-        robot.connections[0].src.node.flattenStrong()
-        # hide labels and set colours after flattening
-        self.toggleLabels(first=True)
+        if robot.template is not None:
+            robot.template.setPoses(poses)                                  # share layout with other robots using this body
+        return poses, (LPoint3f(*box_min), LPoint3f(*box_max))
 
     def stepNetwork(self, ann, robot):
         """
@@ -5,6 +5,8 @@
 
 from roboviz.robotComp import RobotComp
 
+HINGE_COLOUR = (0, 1, 0, 1)    # colour of hinge components
+
 
 class Hinge(RobotComp):
     """Represents an ActiveHinge or PassiveHinge component"""
@@ -19,5 +21,5 @@ class Hinge(RobotComp):
             `orientation`: orientation (roll) of this component relative to its parent (int)
         """
         super().__init__(id, type, root, orientation)
-        self.colour = (0, 1, 0, 1)                      # colour of component
+        self.colour = HINGE_COLOUR                      # colour of component
         self.mass = 20                                  # made up mass of component
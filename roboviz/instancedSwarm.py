@@ -0,0 +1,128 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+import numpy as np
+from panda3d.core import BoundingBox
+from panda3d.core import GeomEnums
+from panda3d.core import LPoint3f
+from panda3d.core import LVector3f
+from panda3d.core import Shader
+from panda3d.core import Texture
+
+AMBIENT = 0.4                   # brightness of faces facing away from the light (same as the scene's ambient light)
+LIGHT_DIR = (0.3, -0.5, 0.8)    # direction towards the light, in world coords
+
+# per-instance data is read from a buffer texture, 2 texels per instance: (x, y, z, heading) then (r, g, b, a)
+VERTEX_SHADER = """
+#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer instances;
+uniform vec3 light_dir;
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec4 p3d_Color;
+out vec4 colour;
+out float light;
+
+void main() {
+    vec4 offset = texelFetch(instances, gl_InstanceID * 2);
+    vec4 tint = texelFetch(instances, gl_InstanceID * 2 + 1);
+    float h = radians(offset.w);
+    mat3 rotation = mat3(cos(h), sin(h), 0, -sin(h), cos(h), 0, 0, 0, 1);
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(rotation * p3d_Vertex.xyz + offset.xyz, 1);
+    light = %f + %f * max(dot(normalize(rotation * p3d_Normal), light_dir), 0.0);
+    colour = p3d_Color * tint;
+}
+""" % (AMBIENT, 1 - AMBIENT)
+FRAGMENT_SHADER = """
+#version 140
+in vec4 colour;
+in float light;
+out vec4 p3d_FragColor;
+
+void main() {
+    p3d_FragColor = vec4(colour.rgb * light, colour.a);
+}
+"""
+
+
+def instancingSupported(gsg):
+    """
+    Determines whether a graphics device can draw instanced swarms
+    Args:
+        `gsg`: graphics state guardian of the window (GraphicsStateGuardian), `None` if there is no window
+    Returns:
+        `supported`: whether geometry instancing, GLSL shaders and buffer textures are all supported (boolean)
+    """
+    return gsg is not None and gsg.getSupportsGeometryInstancing() and gsg.getSupportsGlsl() and gsg.getSupportsBufferTexture()
+
+
+class InstancedSwarm:
+    """Draws many copies of one robot body in a single call per geom, each copy with its own position, heading and colour"""
+
+    def __init__(self, body, positions, headings=None, colours=None):
+        """
+        Constructor
+        Args:
+            `body`: flattened body of the robots, relative to the core (NodePath)
+            `positions`: position of each robot's core ((N, 3) float ndarray)
+            `headings`: heading of each robot in degrees ((N,) float ndarray) **optional**, defaults to 0
+            `colours`: colour each robot is tinted with ((N, 4) float ndarray) **optional**, defaults to white (no tint)
+        """
+        n = len(positions)
+        self.node = body
+        self.data = np.zeros((n, 2, 4), dtype=np.float32)                  # per-instance texels
+        self.data[:, 0, :3] = positions
+        self.data[:, 0, 3] = 0 if headings is None else headings
+        self.data[:, 1] = 1 if colours is None else colours
+
+        body_min, body_max = body.getTightBounds()
+        self.radius = max(np.hypot(x, y) for x in (body_min[0], body_max[0]) for y in (body_min[1], body_max[1]))   # reach of body at any heading
+        self.z_range = (body_min[2], body_max[2])
+
+        self.texture = Texture('instances')
+        self.texture.setupBufferTexture(n * 2, Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+        self.update()
+
+        body.setShader(Shader.make(Shader.SL_GLSL, VERTEX_SHADER, FRAGMENT_SHADER))
+        body.setShaderInput('instances', self.texture)
+        body.setShaderInput('light_dir', LVector3f(*LIGHT_DIR).normalized())
+        body.setInstanceCount(n)
+
+    def __len__(self):
+        """
+        Number of robots in swarm
+        Returns:
+            `length`: number of instances (int)
+        """
+        return len(self.data)
+
+    def setPosition(self, index, pos):
+        """
+        Moves a robot (call **update** once all changes are made)
+        Args:
+            `index`: index of robot in swarm (int)
+            `pos`: new position of robot's core (float[] or LVector3f)
+        """
+        self.data[index, 0, :3] = tuple(pos)[:3]
+
+    def setColour(self, index, colour):
+        """
+        Tints a robot (call **update** once all changes are made)
+        Args:
+            `index`: index of robot in swarm (int)
+            `colour`: (r, g, b, a) colour robot is multiplied by (float[])
+        """
+        self.data[index, 1] = colour
+
+    def update(self):
+        """Uploads the per-instance data and recalculates the bounds of the swarm (used for culling)"""
+        self.texture.setRamImage(self.data.tobytes())
+        positions = self.data[:, 0, :3]
+        lower = positions.min(axis=0) - (self.radius, self.radius, 0)
+        upper = positions.max(axis=0) + (self.radius, self.radius, 0)
+        # instances aren't known to Panda3D's culling, so give the node bounds that enclose them all
+        self.node.node().setBounds(BoundingBox(LPoint3f(lower[0], lower[1], lower[2] + self.z_range[0]),
+                                               LPoint3f(upper[0], upper[1], upper[2] + self.z_range[1])))
+        self.node.node().setFinal(True)
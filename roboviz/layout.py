@@ -0,0 +1,144 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+"""Lays out robot bodies with the same placement rules as RobotComp **calcPos**, without Panda3D models or a window"""
+
+import numpy as np
+
+from roboviz.bodyTemplate import BodyTemplate
+from roboviz.robotComp import SRC_SLOTS, DST_SLOTS, DIRECTION, BUFFER, ORIENTATION
+from roboviz.modelBounds import modelBounds
+
+BRICKS = ('FixedBrick', 'CoreComponent')    # types that hinges 'slot' into using BUFFER
+
+
+def hprMatrix(heading, roll):
+    """
+    Calculates the rotation of a component placed with a heading and roll, the same as Panda3D's setHpr(heading, 0, roll)
+    Args:
+        `heading`: heading in degrees, a multiple of 90 (int)  
+        `roll`: roll in degrees, a multiple of 90 (int)
+    Returns:
+        `matrix`: rotation applied to row vectors of model coords ((3, 3) ndarray)
+    """
+    h, r = np.radians(heading), np.radians(roll)
+    ch, sh, cr, sr = np.rint([np.cos(h), np.sin(h), np.cos(r), np.sin(r)])    # exact for right angles
+    roll_mat = np.array([[cr, 0, -sr], [0, 1, 0], [sr, 0, cr]])
+    heading_mat = np.array([[ch, sh, 0], [-sh, ch, 0], [0, 0, 1]])
+    return roll_mat @ heading_mat
+
+
+def placedBox(dimensions, heading, roll):
+    """
+    Calculates the box of a component's model once placed with a heading and roll (the model's bounds, rotated)
+    Args:
+        `dimensions`: tight bounds (min, max) of the component type's model (float[][])  
+        `heading`: heading in degrees, a multiple of 90 (int)  
+        `roll`: roll in degrees, a multiple of 90 (int)
+    Returns:
+        `(min, max)`: corners of the box relative to the component's position ((3,) float ndarray, (3,) float ndarray)
+    """
+    dim_min, dim_max = np.array(dimensions, dtype=float)
+    corners = np.array([[x, y, z] for x in (dim_min[0], dim_max[0]) for y in (dim_min[1], dim_max[1]) for z in (dim_min[2], dim_max[2])])
+    corners = corners @ hprMatrix(heading, roll)
+    return corners.min(axis=0), corners.max(axis=0)
+
+
+class BodyLayout:
+    """Positions, headings and orientations of every component in a laid out body, relative to the robot's core"""
+
+    def __init__(self, template, dimensions=None):
+        """
+        Lays out a body
+        Args:
+            `template`: body to lay out (BodyTemplate)  
+            `dimensions`: tight bounds (min, max) of each component type's model (dict) **optional**, defaults to **modelBounds**
+        Raises:
+            `ValueError`: if a connection's source hasn't been placed by an earlier connection
+        """
+        if dimensions is None:
+            dimensions = modelBounds()
+        parts = template.parts
+        n = len(parts)
+        self.pos = np.full((n, 3), np.nan)                  # position of each component relative to the core
+        self.heading = np.zeros(n, dtype=int)               # heading of each component in degrees
+        self.orientation = np.array([part[3] for part in parts], dtype=int)     # global orientation of each component
+        self.roll = np.zeros(n, dtype=int)                  # roll of each component in degrees
+        self.poses = []                                     # (x, y, z, heading, roll) of each connection's dest., as in BodyTemplate
+        self.boxes = np.full((n, 2, 3), np.nan)             # (min, max) corners of each component's box relative to the core (NaN if unplaced)
+        direction = np.zeros(n, dtype=int)                  # global heading of each component (0->3)
+        half = {type: (np.array(dim_max, dtype=float) - np.array(dim_min, dtype=float)) / 2 for type, (dim_min, dim_max) in dimensions.items()}
+        buffer = np.array(BUFFER, dtype=float)
+
+        placed = np.zeros(n, dtype=bool)
+        if template.connections:
+            core = template.connections[0][0]
+            self.pos[core] = 0
+            placed[core] = True
+        for (src, dst, _, _), (src_slot, dst_slot) in zip(template.connections, template.slots):
+            if not placed[src]:
+                raise ValueError("Component '{}' is connected to before it is placed".format(parts[src][0]))
+            src_type, dst_type = parts[src][1], parts[dst][1]
+            src_dims = half[src_type]
+            # if hinge connected to a brick, use buffer to 'slot' together cleanly
+            if dst_type in BRICKS or src_type in BRICKS:
+                src_dims = src_dims - buffer
+            dst_dims = half[dst_type]
+
+            global_slot = (src_slot - direction[src]) % 4                       # slot number relative to direction of src comp.
+            heading = SRC_SLOTS[global_slot] + DST_SLOTS[dst_slot]
+            direction[dst] = DIRECTION[heading % 360]
+
+            # which dims to use to calculate new pos (x or y)
+            src_dim = src_dims[1] if src_slot in [0, 2] else src_dims[0]
+            dst_dim = dst_dims[1] if dst_slot in [0, 2] else dst_dims[0]
+            offset = src_dim + dst_dim
+            step = {0: (0, -offset, 0), 1: (-offset, 0, 0), 2: (0, offset, 0), 3: (offset, 0, 0)}[global_slot]
+            self.pos[dst] = self.pos[src] + step
+            self.heading[dst] = heading
+
+            # apply orientation if comp. is a hinge
+            if 'Hinge' in dst_type:
+                self.orientation[dst] = (self.orientation[dst] + self.orientation[src]) % 4
+                self.roll[dst] = ORIENTATION[self.orientation[dst]]
+            placed[dst] = True
+            self.poses.append((*self.pos[dst].tolist(), heading, int(self.roll[dst])))
+
+        # AABB of the body, from the rotated model bounds of every placed component
+        for i in np.flatnonzero(placed):
+            part_min, part_max = placedBox(dimensions[parts[i][1]], self.heading[i], self.roll[i])
+            self.boxes[i] = part_min + self.pos[i], part_max + self.pos[i]
+        if placed.any():
+            self.min, self.max = self.boxes[placed, 0].min(axis=0), self.boxes[placed, 1].max(axis=0)
+        else:
+            self.min, self.max = np.zeros(3), np.zeros(3)
+
+    def bounds(self, core_pos):
+        """
+        Gets the bounds of the body once its core is placed, in the same format as Robot **setBounds**
+        Args:
+            `core_pos`: position of the core component of the robot (float[] or ndarray row)
+        Returns:
+            `bounds`: [x_max, x_min, y_max, y_min, z_max, z_min] of the robot (float[])
+        """
+        core = np.asarray(core_pos, dtype=float)
+        robot_min, robot_max = self.min + core, self.max + core
+        return [robot_max[0], robot_min[0], robot_max[1], robot_min[1], robot_max[2], robot_min[2]]
+
+
+def layoutRobot(robot, dimensions=None):
+    """
+    Lays out a robot without rendering it, setting its bounds. A robot's template is given the layout so it renders without calcPos
+    Args:
+        `robot`: robot to lay out (Robot)  
+        `dimensions`: tight bounds (min, max) of each component type's model (dict) **optional**
+    Returns:
+        `layout`: layout of the robot's body (BodyLayout)
+    """
+    if robot.template is not None:
+        layout = BodyLayout(robot.template, dimensions)
+        robot.template.setPoses(layout.poses)
+    else:
+        layout = BodyLayout(BodyTemplate.fromBody(robot.components, robot.connections), dimensions)
+    robot.bounds = [float(v) for v in layout.bounds(robot.core_pos)]
+    return layout
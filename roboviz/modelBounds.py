@@ -0,0 +1,95 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'BAM')
+BOUNDS_FILE = 'bounds.json'         # table of model bounds, stored in the model directory
+
+tables = {}                         # model directory -> bounds table, built once per process
+hashes = {}                         # model directory -> hash of each component type's model, found while building its table
+
+
+def fileHash(path):
+    """
+    Hashes the content of a model file, so that bounds are recalculated when the model changes
+    Args:
+        `path`: file path of model (String)
+    Returns:
+        `hash`: hash of file (String)
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def tightBounds(path):
+    """
+    Loads a model (without a window) and calculates its tight bounds
+    Args:
+        `path`: file path of model (String)
+    Returns:
+        `(min, max)`: corners of the model's tight bounding box ((float, float, float), (float, float, float))
+    """
+    from panda3d.core import Loader, LoaderOptions, Filename, NodePath    # only needed when the table is out of date
+
+    node = Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(path), LoaderOptions(LoaderOptions.LF_no_cache))
+    model_min, model_max = NodePath(node).getTightBounds()
+    return tuple(model_min), tuple(model_max)
+
+
+def modelBounds(model_dir=MODEL_DIR):
+    """
+    Gets the tight bounds of every component model, read from the table stored next to the models. Models that are new or have
+    changed since the table was written are loaded and measured, and the table is rewritten
+    Args:
+        `model_dir`: directory of component .bam models (String) **optional**
+    Returns:
+        `bounds`: component type -> (min, max) corners of its model ({String: ((float, float, float), (float, float, float))})
+    """
+    if model_dir in tables:
+        return tables[model_dir]
+    table_path = os.path.join(model_dir, BOUNDS_FILE)
+    try:
+        with open(table_path, 'r') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+
+    entries = {}
+    for name in sorted(os.listdir(model_dir)):
+        if not name.endswith('.bam'):
+            continue
+        type = name[:-len('.bam')]
+        path = os.path.join(model_dir, name)
+        hash = fileHash(path)
+        entry = stored.get(type)
+        if entry is None or entry.get('hash') != hash:
+            model_min, model_max = tightBounds(path)
+            entry = {'hash': hash, 'min': model_min, 'max': model_max}
+        entries[type] = entry
+
+    if entries != stored:
+        try:
+            with open(table_path + '.tmp', 'w') as f:
+                json.dump(entries, f, indent=4)
+            os.replace(table_path + '.tmp', table_path)
+        except OSError:
+            pass                    # model directory may be read-only, bounds are then recalculated each process
+    tables[model_dir] = {type: (tuple(entry['min']), tuple(entry['max'])) for type, entry in entries.items()}
+    hashes[model_dir] = {type: entry['hash'] for type, entry in entries.items()}
+    return tables[model_dir]
+
+
+def modelHashes(model_dir=MODEL_DIR):
+    """
+    Gets the hash of every component model, so that anything calculated from the models' bounds can tell when they change
+    Args:
+        `model_dir`: directory of component .bam models (String) **optional**
+    Returns:
+        `hashes`: component type -> hash of its model file ({String: String})
+    """
+    modelBounds(model_dir)
+    return hashes[model_dir]
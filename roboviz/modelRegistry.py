@@ -0,0 +1,49 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+from panda3d.core import NodePath
+
+MODEL_PATH = './models/BAM/{}.bam'      # path of each component type's model
+
+
+class ModelRegistry:
+    """Loads the model of each component type once, handing out copies (that share the model's geometry) for each component"""
+
+    def __init__(self, loader, model_path=MODEL_PATH):
+        """
+        Constructor
+        Args:
+            `loader`: Panda3D loader to load models with (Loader)
+            `model_path`: path of models, formatted with the component type (String) **optional**
+        """
+        self.loader = loader
+        self.model_path = model_path
+        self.templates = {}             # component type -> loaded model, never placed in the scene
+        self.hits = 0                   # num. of components given a copy of an already loaded model
+        self.misses = 0                 # num. of models loaded
+
+    def get(self, type):
+        """
+        Gets a new node for a component, loading its type's model if it hasn't been loaded yet
+        Args:
+            `type`: component type (String)
+        Returns:
+            `node`: copy of the type's model, not yet parented to anything (NodePath)
+        """
+        template = self.templates.get(type)
+        if template is None:
+            template = self.loader.loadModel(self.model_path.format(type))
+            self.templates[type] = template
+            self.misses += 1
+        else:
+            self.hits += 1
+        return template.copyTo(NodePath())   # nodes are copied, geometry is shared
+
+    def __str__(self):
+        """
+        toString for ModelRegistry object
+        Returns:
+            ModelRegistry in String form (String)
+        """
+        return f"models loaded: {self.misses}, reused: {self.hits}"
@@ -0,0 +1,215 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+import math
+import time
+from panda3d.core import GeomNode
+
+TILE_SIZE = 1000                # width of the smallest (leaf) tiles, in units
+TILE_LEVELS = 4                 # levels of tiles above the leaves, each tile covering 2x2 tiles of the level below
+
+
+def relativeState(node, ancestor):
+    """
+    Composes the render state of a node with those of its parents, up to (not including) an ancestor
+    Args:
+        `node`: node to get the state of (NodePath)  
+        `ancestor`: ancestor of node (NodePath)
+    Returns:
+        `state`: state of node relative to ancestor (RenderState)
+    """
+    state = node.getState()
+    parent = node.getParent()
+    while parent != ancestor:
+        state = parent.getState().compose(state)
+        parent = parent.getParent()
+    return state
+
+
+class QuadTree:
+    """
+    Places robots in square tiles over the environment plane, grouped into a quadtree so that Panda3D can cull whole regions at once.
+    Tiles are only created where there are robots, so robots can be placed anywhere (including out of bounds)
+    """
+
+    def __init__(self, root, tile_size=TILE_SIZE, levels=TILE_LEVELS):
+        """
+        Constructor
+        Args:
+            `root`: node the top level tiles are attached to (NodePath)  
+            `tile_size`: width of leaf tiles (float) **optional**  
+            `levels`: levels of tiles above the leaves (int) **optional**
+        """
+        self.root = root
+        self.tile_size = tile_size
+        self.levels = levels
+        self.tiles = {}                 # (level, x index, y index) -> tile node, created when first needed
+        self.members = {}               # leaf tile key -> {robot ID: robot node} of robots in tile
+        self.robot_tile = {}            # robot ID -> key of leaf tile robot is in
+        self.geometry = {}              # robot ID -> geom nodes of robot's body, as it was when added
+        self.batches = {}               # leaf tile key -> merged geometry of the tile's robots
+        self.changed = {}               # leaf tile key -> time tile last changed, for tiles that aren't batched
+
+    def leafKey(self, pos):
+        """
+        Gets the leaf tile a position lies in
+        Args:
+            `pos`: position in the scene (float[] or LVector3f)
+        Returns:
+            `key`: (level, x index, y index) of leaf tile (int, int, int)
+        """
+        return (0, math.floor(pos[0] / self.tile_size), math.floor(pos[1] / self.tile_size))
+
+    def tile(self, key):
+        """
+        Gets a tile's node, creating it (and any missing parent tiles) if needed
+        Args:
+            `key`: (level, x index, y index) of tile (int, int, int)
+        Returns:
+            `node`: tile node (NodePath)
+        """
+        node = self.tiles.get(key)
+        if node is None:
+            level, x, y = key
+            parent = self.root if level == self.levels else self.tile((level + 1, x >> 1, y >> 1))
+            node = parent.attachNewNode('tile_{}_{}_{}'.format(*key))
+            self.tiles[key] = node
+        return node
+
+    def prune(self, key):
+        """
+        Removes a tile if it is empty, then any of its parents that are left empty
+        Args:
+            `key`: (level, x index, y index) of tile (int, int, int)
+        """
+        while key in self.tiles and self.tiles[key].getNumChildren() == 0:
+            self.tiles.pop(key).removeNode()
+            self.members.pop(key, None)
+            self.changed.pop(key, None)
+            level, x, y = key
+            key = (level + 1, x >> 1, y >> 1)
+
+    def add(self, id, node, pos):
+        """
+        Places a robot in the leaf tile its position lies in. The robot's current geometry is kept as the geometry it is batched with
+        Args:
+            `id`: ID of robot (int)  
+            `node`: robot's node, positioned in scene coords (NodePath)  
+            `pos`: position of robot's core (float[] or LVector3f)
+        Returns:
+            `ids`: IDs of robots whose tile batch was removed, to be shown again (int[])
+        """
+        key = self.leafKey(pos)
+        unbatched = self.unbatch(key)
+        node.reparentTo(self.tile(key))                 # tiles have no transform of their own, so robot stays in place
+        self.members.setdefault(key, {})[id] = node
+        self.robot_tile[id] = key
+        self.geometry[id] = list(node.findAllMatches('**/+GeomNode'))
+        return unbatched
+
+    def move(self, id, pos):
+        """
+        Moves a robot into the leaf tile its new position lies in
+        Args:
+            `id`: ID of robot (int)  
+            `pos`: new position of robot's core (float[] or LVector3f)
+        Returns:
+            `ids`: IDs of robots whose tile batches were removed, to be shown again (int[])
+        """
+        old = self.robot_tile[id]
+        key = self.leafKey(pos)
+        unbatched = self.unbatch(old)
+        if key != old:
+            node = self.members[old].pop(id)
+            unbatched += self.unbatch(key)
+            node.reparentTo(self.tile(key))
+            self.members.setdefault(key, {})[id] = node
+            self.robot_tile[id] = key
+            self.prune(old)
+        return unbatched
+
+    def remove(self, id):
+        """
+        Takes a robot out of its tile, leaving its node unparented
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `ids`: IDs of robots whose tile batch was removed, to be shown again (int[])
+        """
+        key = self.robot_tile.pop(id)
+        del self.geometry[id]
+        unbatched = self.unbatch(key)
+        self.members[key].pop(id).detachNode()
+        self.prune(key)
+        return [other for other in unbatched if other != id]
+
+    def touch(self, id):
+        """
+        Marks a robot's tile as changed (e.g. when the robot is rotated or drawn differently), removing the tile's batch
+        Args:
+            `id`: ID of robot (int)
+        Returns:
+            `ids`: IDs of robots whose tile batch was removed, to be shown again (int[])
+        """
+        return self.unbatch(self.robot_tile[id])
+
+    def unbatch(self, key):
+        """
+        Marks a tile as changed, removing its batch if it has one
+        Args:
+            `key`: (level, x index, y index) of leaf tile (int, int, int)
+        Returns:
+            `ids`: IDs of the tile's robots if it was batched, to be shown again (int[])
+        """
+        self.changed[key] = time.monotonic()
+        batch = self.batches.pop(key, None)
+        if batch is None:
+            return []
+        batch.removeNode()
+        return list(self.members.get(key, ()))
+
+    def settled(self, settle, limit=None):
+        """
+        Gets the tiles that haven't changed for a while, which are no longer waiting to be batched once returned
+        Args:
+            `settle`: seconds since a tile last changed for it to be settled (float)  
+            `limit`: max. number of tiles to return (int) **optional**, the rest are returned by later calls
+        Returns:
+            `keys`: keys of settled leaf tiles (tuple[])
+        """
+        now = time.monotonic()
+        keys = [key for key, changed in self.changed.items() if now - changed >= settle][:limit]
+        for key in keys:
+            del self.changed[key]
+        return keys
+
+    def batch(self, key, nodes):
+        """
+        Merges copies of geometry in a leaf tile into one flattened batch (as few geoms as possible), drawn in place of the robots
+        Args:
+            `key`: (level, x index, y index) of leaf tile (int, int, int)  
+            `nodes`: geom nodes to merge, within the tile (NodePath[])
+        Returns:
+            `batch`: merged geometry, a child of the tile (NodePath)
+        """
+        tile = self.tiles[key]
+        batch = tile.attachNewNode('batch')
+        for node in nodes:
+            part = GeomNode('part')
+            part.addGeomsFrom(node.node())              # geoms are shared until the batch is flattened
+            path = batch.attachNewNode(part)
+            path.setTransform(node.getTransform(tile))
+            path.setState(relativeState(node, tile))
+        batch.flattenStrong()
+        self.batches[key] = batch
+        return batch
+
+    def __str__(self):
+        """
+        toString for QuadTree object
+        Returns:
+            QuadTree in String form (String)
+        """
+        leaves = sum(1 for key in self.tiles if key[0] == 0)
+        return f"tiles: {len(self.tiles)} ({leaves} leaves), batched: {len(self.batches)}"
@@ -0,0 +1,150 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+import hashlib
+import os
+import pickle
+
+from roboviz.robot import Robot
+from roboviz.modelBounds import modelHashes, MODEL_DIR
+
+CACHE_DIR = '.roboviz_cache'        # directory cache entries are stored in (relative to working directory, like LastRender.txt)
+CACHE_SIZE = 512 * 1024 * 1024      # max. total size of cache entries in bytes, least recently used entries are evicted first
+CACHE_VERSION = 2                   # bump to invalidate all entries when parsed/laid out data changes format
+
+
+def codeVersion():
+    """
+    Hashes the RoboViz source files so that entries made by different code are never reused
+    Returns:
+        `version`: hash of the roboviz package source (String)
+    """
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    package = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package)):
+        if name.endswith('.py'):
+            with open(os.path.join(package, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """On-disk cache of parsed and laid out robots, keyed on the content of the input files"""
+
+    code_version = None             # computed once per process
+
+    def __init__(self, directory=CACHE_DIR, max_size=CACHE_SIZE, model_dir=MODEL_DIR):
+        """
+        Constructor
+        Args:
+            `directory`: directory to store cache entries in (String) **optional**
+            `max_size`: max. total size of cache entries in bytes (int) **optional**
+            `model_dir`: directory of the component models robots are laid out with (String) **optional**
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.model_dir = model_dir
+        if RenderCache.code_version is None:
+            RenderCache.code_version = codeVersion()
+
+    def key(self, config_path, pos_path, robot_path, auto_pack=False):
+        """
+        Calculates the cache key of a set of input files
+        Args:
+            `config_path`: file path of configuration text file (String)
+            `pos_path`: file path of robot positions text file (String)
+            `robot_path`: file path of robot JSON file (String)
+            `auto_pack`: whether robots are auto-packed, in which case positions are not read (boolean) **optional**
+        Returns:
+            `key`: hash of the input files' content, the code version and the models (String)
+        """
+        digest = hashlib.sha256(self.code_version.encode())
+        # cached layouts + bounds are calculated from the models' bounds
+        for type, hash in sorted(modelHashes(self.model_dir).items()):
+            digest.update('{}={};'.format(type, hash).encode())
+        digest.update(b'auto_pack' if auto_pack else b'positions')
+        paths = [config_path, robot_path] if auto_pack else [config_path, pos_path, robot_path]
+        for path in paths:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            digest.update(b'\0')                                            # separate files
+        return digest.hexdigest()
+
+    def path(self, key):
+        """
+        Gets the file path of a cache entry
+        Args:
+            `key`: cache key (String)
+        Returns:
+            `path`: file path of entry (String)
+        """
+        return os.path.join(self.directory, key + '.pickle')
+
+    def load(self, key):
+        """
+        Loads a cache entry, marking it as recently used
+        Args:
+            `key`: cache key (String)
+        Returns:
+            `(config, positions, robots)`: parsed configuration, positions and laid out robots, or `None` if not cached
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)                                                  # mark as recently used
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        templates = entry['templates']
+        robots = []
+        for id, template, core_pos, bounds, brain in entry['robots']:
+            robot = Robot.fromTemplate(id, templates[template], core_pos, brain=brain)
+            robot.bounds = bounds
+            robots.append(robot)
+        return entry['config'], [robot.core_pos for robot in robots], robots
+
+    def store(self, key, config, robots):
+        """
+        Stores rendered robots (with laid out templates and bounds) in the cache, then evicts old entries if the cache is too large
+        Args:
+            `key`: cache key (String)
+            `config`: configuration parameters (int[])
+            `robots`: robots that have been rendered (Robot[])
+        """
+        templates = []
+        index = {}                                                          # template id -> index in templates
+        entry_robots = []
+        for robot in robots:
+            template = robot.template
+            if template is None or template.poses is None:
+                return                                                      # only fully laid out swarms are cached
+            if id(template) not in index:
+                index[id(template)] = len(templates)
+                templates.append(template)
+            if robot.bounds is None:
+                robot.setBounds()
+            entry_robots.append((robot.id, index[id(template)], [float(v) for v in robot.core_pos], [float(v) for v in robot.bounds], robot.brain))
+        entry = {'config': config, 'templates': templates, 'robots': entry_robots}
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(key))                                # never leave a half-written entry
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits within its max. size"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pickle'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
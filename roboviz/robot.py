@@ -4,72 +4,107 @@
 # ---------------------------------------------------------------------------
 
 
-from panda3d.core import BoundingBox
 from panda3d.core import LVector2f
-from panda3d.core import NodePath
-from panda3d.core import LineSegs
-
-LINE_THICKNESS = 1
 
 
 class Robot:
     """Represents a robot and its connections"""
 
-    def __init__(self, id, connections, components, core_pos):
+    def __init__(self, id, connections, components, core_pos, template=None, brain=None):
         """
         Constructor
         Args:
             `id`: ID of robot (int)  
             `connections`: connections between components that make up the robot (Connection[])  
-            `components`: every component in the Robot
-            `core_pos`: positions of the core component of the robot (int[])
+            `components`: every component in the Robot  
+            `core_pos`: position of the core component of the robot (float[] or ndarray row)  
+            `template`: shared body of the robot (BodyTemplate) **optional**, if given `connections` and `components` are only built when first used  
+            `brain`: brain section of the robot's JSON, kept as is for writing the robot back out (dict) **optional**
         """
         self.id = id
-        self.connections = connections      # list of Connections in Robot
+        self.template = template            # shared body the robot is an instance of
+        self._connections = connections     # list of Connections in Robot
         self.core_pos = core_pos            # position (x, y, z) of robot core component
-        self.components = components        # list of RobotComps in Robot
+        self._components = components       # list of RobotComps in Robot
+        self.node = None                    # root Panda3D node of the robot once rendered
+        self.bounds = None                  # bounds (bounding box) of the robot once calculated
+        self.brain = brain                  # brain section of robot JSON (shared by a homogeneous swarm)
 
-        self.ls = LineSegs()                # for use in drawing bounding/selection box
-        self.ls.setThickness(LINE_THICKNESS)
-        self.ls.setColor(1, 1, 1, 1)
+    @classmethod
+    def fromTemplate(cls, id, template, core_pos, brain=None):
+        """
+        Creates a lightweight Robot that shares its body with other robots
+        Args:
+            `id`: ID of robot (int)  
+            `template`: shared body of the robot (BodyTemplate)  
+            `core_pos`: position of the core component of the robot (float[] or ndarray row)  
+            `brain`: brain section of the robot's JSON (dict) **optional**
+        Returns:
+            `robot`: new robot (Robot)
+        """
+        return cls(id, None, None, core_pos, template=template, brain=brain)
+
+    def instantiate(self):
+        """Builds the robot's own components and connections from its template"""
+        self._components, self._connections = self.template.instantiate()
+
+    @property
+    def connections(self):
+        """Connections between components that make up the robot (Connection[])"""
+        if self._connections is None and self.template is not None:
+            self.instantiate()
+        return self._connections
+
+    @connections.setter
+    def connections(self, connections):
+        self._connections = connections
+
+    @property
+    def components(self):
+        """Every component in the Robot (RobotComp[])"""
+        if self._components is None and self.template is not None:
+            self.instantiate()
+        return self._components
+
+    @components.setter
+    def components(self, components):
+        self._components = components
+
+    def as_dict(self):
+        """
+        Represents a Robot object as a dictionary in the robot JSON format, for use in the RobotUtils **writeSwarm** method.
+        The robot is not changed, and a robot sharing a template is written straight from the template
+        Returns:
+            `dict`: contains the robot's ID, body and brain (if it has one) as a dict
+        """
+        body = {}
+        if self.template is not None:
+            parts = self.template.parts
+            body["part"] = [{"id": id, "type": type, "root": root, "orientation": orientation} for id, type, root, orientation in parts]
+            body["connection"] = [{"src": parts[src][0], "dest": parts[dst][0], "srcSlot": src_slot, "destSlot": dst_slot}
+                                  for src, dst, src_slot, dst_slot in self.template.connections]
+        else:
+            body["part"] = [component.as_dict() for component in self.components]
+            body["connection"] = [connection.as_dict() for connection in self.connections]
+        dict = {}
+        dict["id"] = self.id
+        dict["body"] = body
+        if self.brain is not None:
+            dict["brain"] = self.brain
+        return dict
 
     def setBounds(self):
-        """Calculates and sets the bounds (bounding box) of the robot"""
-        root_node = self.connections[0].src.node                            # get root node
+        """
+        Calculates and sets the bounds (bounding box) of the robot from its rendered nodes. Robots rendered or laid out by Environment
+        already have bounds (calculated from their layout), so this is only needed for robots rendered some other way
+        """
+        root_node = self.node                                               # get root node
 
         robot_min, robot_max = root_node.getTightBounds()                   # root node bounds
-        box = BoundingBox(robot_min, robot_max)
-        vertices = box.getPoints()                                          # get 8 corners of bounding box
-
         # calc bounds of robot bounding box
-        x_max, x_min, y_max, y_min, z_max, z_min = vertices[4][0], vertices[0][0], vertices[2][1], vertices[0][1], vertices[1][2], vertices[2][2]
+        x_max, x_min, y_max, y_min, z_max, z_min = robot_max[0], robot_min[0], robot_max[1], robot_min[1], robot_max[2], robot_min[2]
         self.bounds = [x_max, x_min, y_max, y_min, z_max, z_min]            # set bounds of robot
 
-    def drawBounds(self):
-        """Draws LineSegs between all points of the robot bounding box"""
-        root_node = self.connections[0].src.node                            # get root node
-        robot_min, robot_max = root_node.getTightBounds(root_node)          # get bounds of whole robot
-        box = BoundingBox(robot_min, robot_max)
-        vertices = box.getPoints()                                          # get points of robot bounding box
-
-        # draw 'side' parts of selection box
-        for z in range(0, len(vertices), 4):
-            self.ls.moveTo(vertices[z])
-            self.ls.drawTo(vertices[z + 1])
-            self.ls.drawTo(vertices[z + 3])
-            self.ls.drawTo(vertices[z + 2])
-            self.ls.drawTo(vertices[z])
-
-        # draw 'top and bottom' parts of selection box
-        for xy in range(0, len(vertices)//2):
-            self.ls.moveTo(vertices[xy])
-            self.ls.drawTo(vertices[xy + len(vertices)//2])
-
-        bounds_node = self.ls.create()
-        self.bounding_box = NodePath(bounds_node)
-        self.bounding_box.reparentTo(root_node)                             # reparent bounding box to robot root
-        self.bounding_box.hide()                                            # hide bounding box
-
     def outOfBoundsDetect(self, x_length, y_length, test=False):
         """
         Determines if robot exceeds the dimensions of the environment
@@ -80,7 +115,7 @@ class Robot:
         Returns:
             `out_of_bounds`: x and y values of how far the robot is out of bounds (LVector3f), returns `'none'` if not out of bounds
         """
-        if not test:
+        if not test and self.bounds is None:
             self.setBounds()                                                # calc & set bounds of robot
         out_of_bounds = LVector2f(0, 0)
         if self.bounds[0] > x_length/2:                                     # if over +x edge
@@ -0,0 +1,208 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+"""
+Compact binary robot format (.rvb), loaded by memory-mapping the file.
+
+Layout (little-endian, every section 8-byte aligned, in this order):
+    header      MAGIC, version, flags, body/robot/type/part/connection counts and string table size
+    types       (offset, length) of each component type name in the string table
+    bodies      range of parts and connections belonging to each body
+    parts       type index, orientation, root flag, parent index and ID of every part
+    connections src/dest part indices, RoboGen and standardised slot pairs of every connection
+    poses       laid out (x, y, z, heading, roll) of every connection's dest. part relative to the core
+    robots      ID and body index of every robot (heterogeneous swarms only)
+    strings     UTF-8 component type names and IDs
+"""
+
+import mmap
+import struct
+import numpy as np
+
+from roboviz.bodyTemplate import BodyTemplate
+from roboviz.robot import Robot
+
+MAGIC = b'RVZB'
+VERSION = 1
+HOMOGENEOUS = 1                 # flag set if the file holds a single body shared by the whole swarm
+
+HEADER = struct.Struct('<4sHHIIIIII')
+TYPE_DTYPE = np.dtype([('offset', '<u4'), ('length', '<u4')])
+BODY_DTYPE = np.dtype([('part_start', '<u4'), ('part_count', '<u4'), ('conn_start', '<u4'), ('conn_count', '<u4'), ('laid_out', '<u4')])
+PART_DTYPE = np.dtype([('type', '<u2'), ('orientation', 'u1'), ('root', 'u1'), ('parent', '<i4'), ('id_offset', '<u4'), ('id_length', '<u4')])
+CONN_DTYPE = np.dtype([('src', '<u4'), ('dst', '<u4'), ('src_slot', 'u1'), ('dst_slot', 'u1'), ('std_src_slot', 'u1'), ('std_dst_slot', 'u1')])
+POSE_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('heading', '<f4'), ('roll', '<f4')])
+ROBOT_DTYPE = np.dtype([('id', '<i8'), ('body', '<u4'), ('pad', '<u4')])
+
+
+def align(offset):
+    """
+    Rounds a file offset up to the next multiple of 8
+    Args:
+        `offset`: offset in bytes (int)
+    Returns:
+        `offset`: aligned offset (int)
+    """
+    return (offset + 7) & ~7
+
+
+def sectionOffsets(n_types, n_bodies, n_parts, n_conns, n_robots):
+    """
+    Calculates where each section of a binary robot file starts
+    Args:
+        `n_types`, `n_bodies`, `n_parts`, `n_conns`, `n_robots`: number of entries in each section (int)
+    Returns:
+        `offsets`: start of each section, plus the start of the string table (int[])
+    """
+    offsets = []
+    offset = align(HEADER.size)
+    for count, dtype in [(n_types, TYPE_DTYPE), (n_bodies, BODY_DTYPE), (n_parts, PART_DTYPE), (n_conns, CONN_DTYPE),
+                         (n_conns, POSE_DTYPE), (n_robots, ROBOT_DTYPE)]:
+        offsets.append(offset)
+        offset = align(offset + count * dtype.itemsize)
+    offsets.append(offset)
+    return offsets
+
+
+def writeBinary(path, templates, robot_ids=None):
+    """
+    Writes robot bodies out to a binary robot file
+    Args:
+        `path`: file path of binary robot file (String)
+        `templates`: bodies to write, one per robot or a single body for a homogeneous swarm (BodyTemplate[])
+        `robot_ids`: ID of the robot using each body (int[]) **optional**, leave out for a homogeneous swarm
+    """
+    strings = bytearray()
+    type_index = {}
+    types, bodies, parts, conns, poses = [], [], [], [], []
+
+    def addString(text):
+        data = text.encode('utf-8')
+        strings.extend(data)
+        return len(strings) - len(data), len(data)
+
+    for template in templates:
+        parents = [-1] * len(template.parts)
+        for src, dst, _, _ in template.connections:
+            parents[dst] = src
+        bodies.append((len(parts), len(template.parts), len(conns), len(template.connections), template.poses is not None))
+        for (id, type, root, orientation), parent in zip(template.parts, parents):
+            if type not in type_index:
+                type_index[type] = len(types)
+                types.append(addString(type))
+            parts.append((type_index[type], orientation, root, parent) + addString(str(id)))
+        for (src, dst, src_slot, dst_slot), (std_src_slot, std_dst_slot) in zip(template.connections, template.slots):
+            conns.append((src, dst, src_slot, dst_slot, std_src_slot, std_dst_slot))
+        poses.extend(template.poses or [(0, 0, 0, 0, 0)] * len(template.connections))
+    robots = [(id, i, 0) for i, id in enumerate(robot_ids)] if robot_ids is not None else []
+
+    offsets = sectionOffsets(len(types), len(bodies), len(parts), len(conns), len(robots))
+    with open(path, 'wb') as f:
+        flags = HOMOGENEOUS if robot_ids is None else 0
+        f.write(HEADER.pack(MAGIC, VERSION, flags, len(bodies), len(robots), len(types), len(parts), len(conns), len(strings)))
+        for offset, rows, dtype in zip(offsets, [types, bodies, parts, conns, poses, robots],
+                                       [TYPE_DTYPE, BODY_DTYPE, PART_DTYPE, CONN_DTYPE, POSE_DTYPE, ROBOT_DTYPE]):
+            f.write(b'\0' * (offset - f.tell()))                                # padding up to section start
+            f.write(np.array(rows, dtype=dtype).tobytes())
+        f.write(b'\0' * (offsets[-1] - f.tell()))
+        f.write(strings)
+
+
+class RobotBinary:
+    """Memory-mapped binary robot file, building BodyTemplates and Robots only when they are requested"""
+
+    def __init__(self, path):
+        """
+        Constructor
+        Args:
+            `path`: file path of binary robot file (String)
+        """
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, n_bodies, n_robots, n_types, n_parts, n_conns, n_strings = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version {} RoboViz binary robot file'.format(VERSION))
+        self.homogeneous = bool(flags & HOMOGENEOUS)
+
+        offsets = sectionOffsets(n_types, n_bodies, n_parts, n_conns, n_robots)
+        # views straight into the mapped file, nothing is copied
+        self.types = np.frombuffer(self.mm, TYPE_DTYPE, n_types, offsets[0])
+        self.bodies = np.frombuffer(self.mm, BODY_DTYPE, n_bodies, offsets[1])
+        self.parts = np.frombuffer(self.mm, PART_DTYPE, n_parts, offsets[2])
+        self.conns = np.frombuffer(self.mm, CONN_DTYPE, n_conns, offsets[3])
+        self.poses = np.frombuffer(self.mm, POSE_DTYPE, n_conns, offsets[4])
+        self.robot_table = np.frombuffer(self.mm, ROBOT_DTYPE, n_robots, offsets[5])
+        self.strings = offsets[6]
+        self.type_names = [self.string(offset, length) for offset, length in self.types.tolist()]
+        self.templates = {}                                                     # body index -> BodyTemplate, built on first use
+
+    def close(self):
+        """Unmaps the file. Templates and robots already created stay usable, as they hold copies of what they read"""
+        # views into the map must be dropped before it can be closed
+        self.types = self.bodies = self.parts = self.conns = self.poses = self.robot_table = None
+        self.mm.close()
+
+    def __enter__(self):
+        """
+        Uses the file as a context manager, unmapping it on exit
+        Returns:
+            `binary`: this binary robot file (RobotBinary)
+        """
+        return self
+
+    def __exit__(self, *exc):
+        """Unmaps the file when leaving a with block"""
+        self.close()
+
+    def string(self, offset, length):
+        """
+        Reads a string from the string table
+        Args:
+            `offset`: offset of the string in the table (int)
+            `length`: length of the string in bytes (int)
+        Returns:
+            `string`: decoded string (String)
+        """
+        start = self.strings + offset
+        return self.mm[start:start + length].decode('utf-8')
+
+    def template(self, index):
+        """
+        Gets the body template of a body in the file, building it the first time it is requested
+        Args:
+            `index`: index of body in file (int)
+        Returns:
+            `template`: body of the robot (BodyTemplate)
+        """
+        if index not in self.templates:
+            part_start, part_count, conn_start, conn_count, laid_out = self.bodies[index].tolist()
+            parts = [(self.string(id_offset, id_length), self.type_names[type], bool(root), orientation)
+                     for type, orientation, root, _, id_offset, id_length in self.parts[part_start:part_start + part_count].tolist()]
+            conns = self.conns[conn_start:conn_start + conn_count].tolist()
+            poses = self.poses[conn_start:conn_start + conn_count].tolist() if laid_out else None
+            self.templates[index] = BodyTemplate(parts, [conn[:4] for conn in conns], slots=[conn[4:] for conn in conns], poses=poses)
+        return self.templates[index]
+
+    def __len__(self):
+        """
+        Number of robots in the file
+        Returns:
+            `length`: number of heterogeneous robots, 1 for a homogeneous swarm (int)
+        """
+        return 1 if self.homogeneous else len(self.robot_table)
+
+    def robots(self, swarm_size, positions):
+        """
+        Creates the robots stored in the file, one at a time
+        Args:
+            `swarm_size`: number of robots in swarm, only used for a homogeneous swarm (int)
+            `positions`: positions of each robot in swarm (int[])
+        Returns:
+            `robots`: robots to be rendered in the scene (generator of Robot), raises IndexError if too few positions are given
+        """
+        if self.homogeneous:
+            for i in range(int(swarm_size)):
+                yield Robot.fromTemplate(i, self.template(0), positions[i])
+        else:
+            for i, (id, body, _) in enumerate(self.robot_table.tolist()):
+                yield Robot.fromTemplate(id, self.template(body), positions[i])
@@ -4,11 +4,15 @@
 # ---------------------------------------------------------------------------
 
 from panda3d.core import LVector3f
+from panda3d.core import LPoint3f
+
+from roboviz.modelBounds import modelBounds
 
 SRC_SLOTS = {0: 180, 1: 90, 2: 0, 3: 270}           # headings related to each source slots
 DST_SLOTS = {0: 0, 1: 90, 2: 180, 3: 270}           # headings related to each dest. slot
 DIRECTION = {0: 0, 90: 1, 180: 2, 270: 3, 360: 0}   # directions related to each heading
 BUFFER = LVector3f(1.5, 1.5, 0)                     # negative space between hinges and bricks
+ORIENTATION = {0: 0, 1: 90, 2: 180, 3: 270}         # roll in degrees relating to orientation values
 
 
 class RobotComp:
@@ -28,8 +32,10 @@ class RobotComp:
         self.id = id
         self.type = type                # component type
         self.root = root                # component is the root of the robot component tree
-        self.orientation = orientation  # global orientation
+        self.orientation = orientation  # orientation relative to parent, as given in the robot file
+        self.global_orientation = orientation  # global orientation, calculated when laid out
         self.direction = 0              # global heading
+        self.bounds = None              # bounds of component's model, calculated when laid out
         self.deltaX = 0
 
     def calcPos(self, src, dst, connection, test=False):
@@ -43,15 +49,15 @@ class RobotComp:
         Returns:
             `(dst_pos, heading)`: position and heading that component should be placed at in the scene (LVector3f, int)
         """
+        # bounds are looked up by component type instead of measuring each loaded model
         if not test:
-            connection.dst.bounds = dst.getTightBounds()
+            connection.dst.bounds = modelBounds()[connection.dst.type]
 
-        # only get new bounds for src comp. if it's the 'root' comp. Otherwise just use connection.src.bounds
-        if connection.src.root == True and not test:
-            connection.src.bounds = src.getTightBounds()
-            connection.src.root = False
+        # only get new bounds for src comp. if it's the 'root' comp. (hasn't been laid out). Otherwise just use connection.src.bounds
+        if connection.src.bounds is None and not test:
+            connection.src.bounds = modelBounds()[connection.src.type]
 
-        src_min, src_max = connection.src.bounds[0], connection.src.bounds[1]
+        src_min, src_max = LPoint3f(*connection.src.bounds[0]), LPoint3f(*connection.src.bounds[1])
         src_dims = (src_max - src_min)/2                                        # get distance from centre of source model to edge
         src_pos = connection.src.pos
 
@@ -59,7 +65,7 @@ class RobotComp:
         if connection.dst.type in ['FixedBrick', 'CoreComponent'] or connection.src.type in ['FixedBrick', 'CoreComponent']:
             src_dims -= BUFFER
 
-        dst_min, dst_max = connection.dst.bounds[0], connection.dst.bounds[1]
+        dst_min, dst_max = LPoint3f(*connection.dst.bounds[0]), LPoint3f(*connection.dst.bounds[1])
         dst_dims = (dst_max - dst_min)/2                                        # get distance from centre of dest model to edge
 
         src_slot = connection.src_slot - connection.src.direction               # get slot number relative to direction of src comp. ('global' slot number)
@@ -7,9 +7,15 @@ import PySimpleGUI as sg
 import os
 from os.path import exists
 import subprocess
+import time
+import numpy as np
 
-from roboviz.robotUtils import RobotUtils
+from roboviz.robotUtils import RobotUtils, BodyError
+from roboviz.robotStream import CompressionError
 from roboviz.environment import Environment
+from roboviz.renderCache import RenderCache
+from roboviz.layout import layoutRobot
+from roboviz.collision import outOfBounds
 from roboviz.hinge import Hinge
 from roboviz.brick import Brick
 from roboviz.connection import Connection
@@ -17,19 +23,22 @@ from roboviz.robot import Robot
 
 # components available for adding to a robot (for building a robot)
 COMPONENTS = ['FixedBrick', 'ActiveHinge', 'PassiveHinge']
+FRAME_BUDGET = 1 / 60               # seconds per frame spent rendering robots when the scene is built progressively
 
 
 def formatCollisions(collisions):
     """
     Formats List of collisions into displayable format
     Args:
-        `collisions`: possible collisions between robots (int[][])
+        `collisions`: possible collisions between robots, with the colliding components of each if known (int[][] or [int, int, String[][]][])
     Returns:
         `collision_text`: text format of robot collisions (String)
     """
     collision_text = 'Possible Collision Between:\n'
     for collision in collisions:
         collision_text += 'Robot {}, Robot {}\n'.format(collision[0], collision[1])
+        for first, second in (collision[2] if len(collision) > 2 else []):
+            collision_text += '    Component {}, Component {}\n'.format(first, second)      # colliding components of each robot
     return collision_text
 
 
@@ -37,7 +46,7 @@ def formatOutOfBounds(out_of_bounds):
     """
     Formats List of out of bounds robots into displayable format
     Args:
-        `out_of_bounds`: robots that are out of bounds + units ([int, LVector3f])
+        `out_of_bounds`: robots that are out of bounds + x and y units ([int, int[]][])
     Returns:
         `out_of_bounds_text`: text format of out of bounds robots (String)
     """
@@ -51,17 +60,41 @@ def formatOutOfBounds(out_of_bounds):
     return out_of_bounds_text
 
 
+def formatErrorSummary(collisions, out_of_bounds):
+    """
+    Summarises the errors found in a scene in a few words, for showing over the scene itself
+    Args:
+        `collisions`: possible collisions between robots (int[][] or [int, int, String[][]][])  
+        `out_of_bounds`: robots that are out of bounds + x and y units ([int, int[]][])
+    Returns:
+        `summary_text`: text summary of the errors, empty if there are none (String)
+    """
+    if len(collisions) == 0 and len(out_of_bounds) == 0:
+        return ''
+    return ('{} possible collision(s), {} robot(s) out of bounds\n'
+            'Select a robot to see its errors'.format(len(collisions), len(out_of_bounds)))
+
+
 class RobotGUI:
     """Initialises the GUI for inputting files, building robots and reporting errors"""
 
-    def __init__(self, config_path='', pos_path='', robot_path='', cli=False):
+    def __init__(self, config_path='', pos_path='', robot_path='', cli=False, stream=False, cache=True, workers=1, instanced=False, progressive=False,
+                 window_type='onscreen', image_path=None, page_budget=None):
         """
         Constructor
         Args:
             `config_path`: file path of configuration text file (String) **optional**, only used when building a robot  
             `pos_path`: file path of robot positions text file (String) **optional**, only used when building a robot  
-            `robot_path`: file path of robot JSON file (String) **optional**, only used when building a robot
-            `cli`: whether or not the program is running in CLI mode (boolean) **optional**
+            `robot_path`: file path of robot JSON file (String) **optional**, only used when building a robot  
+            `cli`: whether or not the program is running in CLI mode (boolean) **optional**  
+            `stream`: whether robots are parsed one at a time while rendering, rather than all up front (boolean) **optional**, CLI only  
+            `cache`: whether parsed and laid out robots are cached on disk between runs (boolean) **optional**  
+            `workers`: number of processes used to parse heterogeneous swarms (int) **optional**  
+            `instanced`: whether robots sharing a body are drawn with hardware instancing (boolean) **optional**  
+            `progressive`: whether robots are rendered a few at a time each frame, with the window already open (boolean) **optional**  
+            `window_type`: 'onscreen', or 'offscreen'/'none' to run without a window (String) **optional**, CLI only  
+            `image_path`: file path the scene is saved to as an image when rendering offscreen (String) **optional**  
+            `page_budget`: max. number of components built at once, far away robots are drawn as boxes (int) **optional**, defaults to no limit
         """
         self.config_path = config_path
         self.pos_path = pos_path
@@ -69,7 +102,16 @@ class RobotGUI:
         self.working_directory = os.getcwd()
         self.out_of_bounds_all = []
         self.collisions = []
+        self.robot_error = None
         self.cli = cli
+        self.stream = stream
+        self.cache = RenderCache() if cache else None
+        self.instanced = instanced
+        self.progressive = progressive
+        self.window_type = window_type
+        self.image_path = image_path
+        self.page_budget = page_budget
+        self.workers = workers
         self.utils = RobotUtils(self.config_path, self.pos_path, self.robot_path)
         self.bgColour = "Black"
 
@@ -285,12 +327,15 @@ class RobotGUI:
                  sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Configuration file", "*.txt")])], [configError],
                 [sg.Text("Choose a positions file:", background_color=self.bgColour)],
                 [sg.InputText(key="-FILE_PATH-"),
-                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Position file", "*.txt")])], [posError],
+                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Position file", "*.txt *.csv *.npy")])], [posError],
                 [sg.Text("Choose a robots file:", background_color=self.bgColour)],
                 [sg.InputText(key="-FILE_PATH-"),
-                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Robot file", "*.json")])], [jsonError],
+                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Robot file", "*.json *.json.gz *.json.zst *.rvb")])], [jsonError],
                 [sg.Button('Submit', tooltip='start simulation'), sg.Button('Help', tooltip='help menu'), sg.Button(
-                    'Build', tooltip='open robot building menu'), sg.Exit(), sg.Checkbox('Auto-pack', key='-A_PACK-', tooltip='auto-position robots')]
+                    'Build', tooltip='open robot building menu'), sg.Exit(), sg.Checkbox('Auto-pack', key='-A_PACK-', tooltip='auto-position robots'),
+                 sg.Text('Workers:', background_color=self.bgColour), sg.Spin(values=list(range(1, (os.cpu_count() or 1) + 1)), initial_value=self.workers, key='-WORKERS-', size=3, tooltip='processes used to parse heterogeneous swarms'),
+                 sg.Checkbox('Instanced', default=self.instanced, key='-INSTANCED-', tooltip='draw large swarms with hardware instancing (robots can\'t be selected)'),
+                 sg.Checkbox('Progressive', default=self.progressive, key='-PROGRESSIVE-', tooltip='open the window straight away and render robots while it is in use')]
             ]
         else:
             # if previous file paths found, read in and place in file path text boxes
@@ -315,12 +360,15 @@ class RobotGUI:
                  sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Configuration file", "*.txt")])], [configError],
                 [sg.Text("Choose a positions file:", background_color=self.bgColour)],
                 [sg.InputText(default_text=pos_path, key="-FILE_PATH-"),
-                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Position file", "*.txt")])], [posError],
+                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Position file", "*.txt *.csv *.npy")])], [posError],
                 [sg.Text("Choose a robots file:", background_color=self.bgColour)],
                 [sg.InputText(default_text=robot_path, key="-FILE_PATH-"),
-                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Robot file", "*.json")])], [jsonError],
+                 sg.FileBrowse(initial_folder=self.working_directory, file_types=[("Robot file", "*.json *.json.gz *.json.zst *.rvb")])], [jsonError],
                 [sg.Button('Submit', tooltip='start simulation'), sg.Button('Help', tooltip='help menu'), sg.Button(
-                    'Build', tooltip='open robot building menu'), sg.Exit(), sg.Checkbox('Auto-pack', key='-A_PACK-', tooltip='auto-position robots')]
+                    'Build', tooltip='open robot building menu'), sg.Exit(), sg.Checkbox('Auto-pack', key='-A_PACK-', tooltip='auto-position robots'),
+                 sg.Text('Workers:', background_color=self.bgColour), sg.Spin(values=list(range(1, (os.cpu_count() or 1) + 1)), initial_value=self.workers, key='-WORKERS-', size=3, tooltip='processes used to parse heterogeneous swarms'),
+                 sg.Checkbox('Instanced', default=self.instanced, key='-INSTANCED-', tooltip='draw large swarms with hardware instancing (robots can\'t be selected)'),
+                 sg.Checkbox('Progressive', default=self.progressive, key='-PROGRESSIVE-', tooltip='open the window straight away and render robots while it is in use')]
             ]
 
         sg.theme(self.bgColour)
@@ -370,42 +418,51 @@ class RobotGUI:
 
                 # GUI parsing and error checking
                 self.utils = RobotUtils(self.config_path, self.pos_path, self.robot_path)
-                # config parsing #
-                config = self.utils.configParse()
-                if not config:
-                    configError.update(value="Incorrect configuration file format", visible=True)
-                    continue
-                else:
+                # reuse parsed and laid out robots if these exact files have been rendered before
+                cache_key = self.cacheKey(auto_pack)
+                cached = self.cache.load(cache_key) if cache_key else None
+                if cached:
+                    config, positions, robots = cached
                     configError.update(visible=False)
-                if not auto_pack:
-                    # positions parsing #
-                    positions = self.utils.posParse()
-                    if not positions:
-                        posError.update(value="Incorrect positions file format", visible=True)
+                    posError.update(visible=False)
+                    jsonError.update(visible=False)
+                else:
+                    # config parsing #
+                    config = self.utils.configParse()
+                    if not config:
+                        configError.update(value="Incorrect configuration file format" + self.errorDetail(), visible=True)
                         continue
                     else:
-                        posError.update(visible=False)
-                else:
-                    # default positions for auto-pack to use
-                    positions = [[0, 0, 0]]*int(config[2])
-                # robots parsing #
-                robots = self.utils.robotParse(int(config[2]), positions)
-                if not robots:
-                    jsonError.update(value="Incorrect robot file format", visible=True)
-                    continue
-                elif robots == True:
-                    posError.update(value="Incorrect amount of robot positions given", visible=True)
-                    continue
-                else:
-                    jsonError.update(visible=False)
-                # num. of robots in robot file do not match swarm size in config file
-                if len(robots) != config[2]:
-                    configError.update(value="Mismatch between swarm size and number of robots given", visible=True)
-                    continue
-                # num. of positions in positions file do not match swarm size in config file
-                if len(positions) != config[2]:
-                    posError.update(value="Mismatch between number of positions and swarm size given", visible=True)
-                    continue
+                        configError.update(visible=False)
+                    if not auto_pack:
+                        # positions parsing #
+                        positions = self.utils.posParse()
+                        if positions is False:
+                            posError.update(value="Incorrect positions file format" + self.errorDetail(), visible=True)
+                            continue
+                        else:
+                            posError.update(visible=False)
+                    else:
+                        # default positions for auto-pack to use
+                        positions = np.zeros((int(config[2]), 3))
+                    # robots parsing #
+                    robots = self.utils.robotParse(int(config[2]), positions, workers=int(values['-WORKERS-']))
+                    if not robots:
+                        jsonError.update(value="Incorrect robot file format" + self.errorDetail(), visible=True)
+                        continue
+                    elif robots == True:
+                        posError.update(value="Incorrect amount of robot positions given", visible=True)
+                        continue
+                    else:
+                        jsonError.update(visible=False)
+                    # num. of robots in robot file do not match swarm size in config file
+                    if len(robots) != config[2]:
+                        configError.update(value="Mismatch between swarm size and number of robots given", visible=True)
+                        continue
+                    # num. of positions in positions file do not match swarm size in config file
+                    if len(positions) != config[2]:
+                        posError.update(value="Mismatch between number of positions and swarm size given", visible=True)
+                        continue
 
                 # write chosen file paths to file
                 lines = [self.pos_path, self.config_path, self.robot_path]
@@ -414,39 +471,69 @@ class RobotGUI:
                         f.write(line)
                         f.write(' \n')
 
+                self.instanced = values['-INSTANCED-']
+                self.progressive = values['-PROGRESSIVE-']
                 window.hide()                                       # hide GUI window
-                self.runSim(config, robots, auto_pack=auto_pack)    # start simulation (Panda)
+                self.runSim(config, robots, auto_pack=auto_pack, cache_key=None if cached else cache_key)  # start simulation (Panda)
                 window.UnHide()                                     # show GUI window again after exiting Panda
 
         window.close()
 
-    def runSim(self, config='', robots='', auto_pack=False, build=False):
+    def errorDetail(self):
         """
-        Creates the Environment and runs the simulation
-        Args:
-            `auto_pack`: whether the packing algorithm will be used to auto-position the robots (Boolean) **optional**  
-            `config`: configuration parameters (int[]) **optional**, only used when building a robot  **optional**  
-            `robots`: array of Robots (Robot[]) **optional**, only used when building a robot  **optional**  
-            `build`: whether or not simulation is being run from robot builder (boolean) **optional**
+        Formats the description of the last parsing error for display after an error message
+        Returns:
+            `detail`: ': ' followed by the error description, or '' if there is none (String)
         """
-        # CLI parsing and error checking
-        if self.cli:
-            # config parsing #
-            config = self.utils.configParse()
-            if not config:
-                print("[ERROR] Incorrect configuration file format or file not found")
-                quit()
-
-            # positions parsing #
-            positions = self.utils.posParse()
-            if not positions:
-                print("[ERROR] Incorrect positions file format or file not found")
-                quit()
+        return ': ' + self.utils.error if self.utils.error else ''
 
-            # robot parsing #
-            robots = self.utils.robotParse(int(config[2]), positions)
+    def cacheKey(self, auto_pack=False):
+        """
+        Calculates the render cache key of the current input files
+        Args:
+            `auto_pack`: whether robots are auto-packed (boolean) **optional**
+        Returns:
+            `key`: cache key (String), or `None` if caching is disabled or a file can't be read
+        """
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.key(self.config_path, self.pos_path, self.robot_path, auto_pack=auto_pack)
+        except OSError:
+            return None
+
+    def cliParse(self):
+        """
+        Parses and error checks the input files given on the command line, quitting with an error message if any are incorrect
+        Returns:
+            `(config, positions, robots)`: configuration parameters, positions and robots (generator of Robot when streaming)
+        """
+        # config parsing #
+        config = self.utils.configParse()
+        if not config:
+            print("[ERROR] Incorrect configuration file format or file not found")
+            if self.utils.error:
+                print("[ERROR] " + self.utils.error)
+            quit()
+
+        # positions parsing #
+        positions = self.utils.posParse()
+        if positions is False:
+            print("[ERROR] Incorrect positions file format or file not found")
+            if self.utils.error:
+                print("[ERROR] " + self.utils.error)
+            quit()
+
+        # robot parsing #
+        if self.stream:
+            # robots are parsed as they are rendered, so robot file errors are reported while rendering
+            robots = self.utils.robotStream(int(config[2]), positions)
+        else:
+            robots = self.utils.robotParse(int(config[2]), positions, workers=self.workers)
             if not robots:
                 print("[ERROR] Incorrect robot file format or file not found")
+                if self.utils.error:
+                    print("[ERROR] " + self.utils.error)
                 quit()
             elif robots == True:
                 print('[ERROR] Incorrect amount of robot positions given')
@@ -455,34 +542,213 @@ class RobotGUI:
             if len(robots) != config[2]:
                 print('[ERROR] Mismatch between number of robots and swarm size given')
                 quit()
-            # num. of positions in positions file do not match swarm size in config gile
-            if len(positions) != config[2]:
-                print('[ERROR] Mismatch between number of positions and swarm size given')
+        # num. of positions in positions file do not match swarm size in config gile
+        if len(positions) != config[2]:
+            print('[ERROR] Mismatch between number of positions and swarm size given')
+            quit()
+        return config, positions, robots
+
+    def checkedRobots(self, robots, env=None):
+        """
+        Iterates over robots, quitting with an error message if a robot can't be parsed (robots may be parsed as they are reached when streaming)
+        Args:
+            `robots`: robots in swarm (Robot[] or generator of Robot)  
+            `env`: environment whose window is already open (Environment) **optional**, the error is shown in it and the robots stop
+            instead of quitting
+        Returns:
+            `robots`: robots in swarm (generator of Robot), `self.robot_error` describes the error if they stopped early
+        """
+        self.robot_error = None
+        robot_iter = iter(robots)
+        while True:
+            try:
+                robot = next(robot_iter)                            # next robot in swarm (parsed here when streaming)
+            except StopIteration:
+                return
+            except IndexError:
+                error, detail = 'Incorrect amount of robot positions given', None
+            except (BodyError, CompressionError) as e:
+                error, detail = 'Incorrect robot file format or file not found', str(e)
+            except (OSError, ValueError, KeyError, TypeError):
+                error, detail = 'Incorrect robot file format or file not found', None
+            else:
+                yield robot
+                continue
+            print('[ERROR] ' + error)
+            if detail:
+                print('[ERROR] ' + detail)
+            if env is None:
                 quit()
+            # robots already in the window are kept, the error is shown over them
+            self.robot_error = error + (': ' + detail if detail else '')
+            env.showMessage(self.robot_error)
+            return
+
+    def checkSim(self):
+        """Lays out the robots given on the command line without rendering them and reports any collisions and out of bounds robots"""
+        config, positions, robots = self.cliParse()
+        print('Laying out Robots...')
+        laid_out = []
+        for robot in self.checkedRobots(robots):
+            layoutRobot(robot)                                      # set bounds without loading any models
+            laid_out.append(robot)
+        if len(laid_out) != config[2]:
+            print('[ERROR] Mismatch between number of robots and swarm size given')
+            quit()
+        print('...Done')
+        self.detectErrors(laid_out, config)
+        self.printErrors()
 
-        env = Environment(int(config[0]), int(config[1]), int(config[2]))
+    def detectErrors(self, robots, config, bounds=None):
+        """
+        Finds the out of bounds robots and collisions between robots, from the bounds of the whole swarm at once
+        Args:
+            `robots`: robots in the scene (Robot[])  
+            `config`: configuration parameters (int[])  
+            `bounds`: bounds of robots, from RobotUtils **swarmBounds** ((N, 6) float ndarray) **optional**
+        """
+        if bounds is None:
+            bounds = self.utils.swarmBounds(robots)
+        indices, units = outOfBounds(bounds, int(config[0]), int(config[1]))
+        self.out_of_bounds_all = [[index, out_of_bounds] for index, out_of_bounds in zip(indices.tolist(), units.tolist())]
+        print('Detecting collisions...')
+        # get any possible collisions between robots, then check which of their components collide
+        self.collisions = self.utils.componentCollisions(robots, self.utils.collisionDetect(robots, bounds))
+        print('...Done')
+
+    def printErrors(self):
+        """Prints the collisions and out of bounds robots that were detected (CLI equivalent of **error_window**)"""
+        if len(self.collisions) == 0 and len(self.out_of_bounds_all) == 0:
+            print('No collisions or out of bounds robots detected')
+        if len(self.collisions) > 0:
+            print(formatCollisions(self.collisions).rstrip())
+        if len(self.out_of_bounds_all) > 0:
+            print('Robots out of bounds:')
+            print(formatOutOfBounds(self.out_of_bounds_all).rstrip())
+
+    def buildScene(self, env, config, robots, auto_pack=False, build=False, cache_key=None):
+        """
+        Renders robots into the Environment, then auto-packs them and reports collisions and out of bounds robots once all are rendered
+        Args:
+            `env`: environment to render robots in (Environment)  
+            `config`: configuration parameters (int[])  
+            `robots`: robots to render (Robot[] or generator of Robot)  
+            `auto_pack`: whether the packing algorithm will be used to auto-position the robots (Boolean) **optional**  
+            `build`: whether or not simulation is being run from robot builder (boolean) **optional**  
+            `cache_key`: render cache key to store the robots under once rendered (String) **optional**
+        Returns:
+            `counts`: number of robots rendered so far, after each robot is rendered (generator of int)
+        """
         print('Rendering Robots...')
-        for i, robot in enumerate(robots):                          # loop through robots in swarm
-            env.renderRobot(robot)                                  # render robot
-            # get any out of bounds robots
-            if not self.cli and not build:
-                out_of_bounds = robot.outOfBoundsDetect(int(config[0]), int(config[1]))
-                if out_of_bounds != 'none':
-                    self.out_of_bounds_all.append([i, out_of_bounds])
+        # only hold on to rendered robots if they are needed after rendering (robots may be streamed in)
+        # collisions + out of bounds robots are reported in the GUI, and on the command line when there is no window to look at
+        report = not build and (not self.cli or self.window_type != 'onscreen')
+        # when built progressively, this runs inside a task of the open window, so nothing here may quit or block the frame loop
+        live = self.progressive and self.window_type == 'onscreen'
+        keep = auto_pack or report or cache_key is not None
+        rendered = []
+        # draw robots that share a body with instancing if possible, otherwise render each robot's own nodes
+        instanced = self.instanced and not build and isinstance(robots, list) and env.renderInstanced(robots)
+        count = 0
+        for robot in self.checkedRobots(robots, env if live else None):
+            if not instanced:
+                env.addRobot(robot)                                 # render robot (or page it in later if it is far from the camera)
+            if keep:
+                rendered.append(robot)
+            count += 1
+            yield count
+        if self.robot_error is not None:
+            return                                                  # robot file error is already shown in the window
+        if count != config[2]:
+            print('[ERROR] Mismatch between number of robots and swarm size given')
+            if live:
+                # robots already in the window are kept, the error is shown over them
+                env.showMessage('Mismatch between number of robots ({}) and swarm size given ({})'.format(count, config[2]))
+                return
+            quit()
+        robots = rendered
+        bounds = self.utils.swarmBounds(robots)                     # bounds of whole swarm, used by every check below
         print('...Done')
+        if cache_key is not None:
+            # store parsed + laid out robots before auto-pack moves them
+            self.cache.store(cache_key, config, robots)
         if auto_pack:
             # auto-pack and reposition robots if option is selected
             print('Auto-packing Robots...')
-            env.reposition(self.utils.autoPack(robots, config[0], config[1]))
-            print('...Done')
-        env.initialView()                                           # zoom camera out to look at all robots in scene
-        if not auto_pack and not self.cli and not build:
-            print('Detecting collisions...')
-            # get any possible collisions between robots
-            self.collisions = self.utils.collisionDetect(robots)
+            env.reposition(self.utils.autoPack(robots, config[0], config[1], bounds))
             print('...Done')
+        if not self.progressive or auto_pack:
+            env.initialView()                                       # zoom camera out to look at all robots in scene (camera is in use if progressive)
+        if not auto_pack and report:
+            self.detectErrors(robots, config, bounds)
+            if self.cli:
+                self.printErrors()
+            elif live:
+                # summarise errors in the window instead of opening the (modal) error window
+                env.showMessage(formatErrorSummary(self.collisions, self.out_of_bounds_all))
             # show error window if collisions or out of bounds are detected
-            if len(self.collisions) > 0 or len(self.out_of_bounds_all) > 0:
+            elif len(self.collisions) > 0 or len(self.out_of_bounds_all) > 0:
                 self.error_window()
+
+    def progressTask(self, env, scene, total, task):
+        """
+        Panda3D task that builds the scene progressively, rendering robots until the frame's time budget is used up
+        Args:
+            `env`: environment robots are rendered in (Environment)  
+            `scene`: scene being built, from **buildScene** (generator of int)  
+            `total`: number of robots in swarm (int)  
+            `task`: Panda3D task (Task)
+        Returns:
+            `task.cont` until the scene is complete, then `task.done`
+        """
+        start = time.perf_counter()
+        for count in scene:
+            if time.perf_counter() - start > FRAME_BUDGET:
+                env.setProgress(count, total)                       # let the frame be drawn
+                return task.cont
+        env.setProgress(total, total)
+        return task.done
+
+    def runSim(self, config='', robots='', auto_pack=False, build=False, cache_key=None):
+        """
+        Creates the Environment and runs the simulation
+        Args:
+            `auto_pack`: whether the packing algorithm will be used to auto-position the robots (Boolean) **optional**  
+            `config`: configuration parameters (int[]) **optional**, only used when building a robot  **optional**  
+            `robots`: array of Robots (Robot[]) **optional**, only used when building a robot  **optional**  
+            `build`: whether or not simulation is being run from robot builder (boolean) **optional**  
+            `cache_key`: render cache key to store the robots under once rendered (String) **optional**
+        """
+        # CLI cache lookup
+        cached = None
+        if self.cli and not self.stream:
+            cache_key = self.cacheKey()
+            cached = self.cache.load(cache_key) if cache_key else None
+            if cached:
+                config, positions, robots = cached
+                cache_key = None
+        # CLI parsing and error checking
+        if self.cli and not cached:
+            config, positions, robots = self.cliParse()
+
+        env = Environment(int(config[0]), int(config[1]), int(config[2]), window_type=self.window_type,
+                          page_budget=self.page_budget)
+        scene = self.buildScene(env, config, robots, auto_pack=auto_pack, build=build, cache_key=cache_key)
+        if self.progressive and self.window_type == 'onscreen':
+            # build the scene a little every frame, so the window can be used while robots stream in
+            env.planeView()
+            env.taskMgr.add(self.progressTask, 'buildScene', extraArgs=[env, scene, int(config[2])], appendTask=True)
+        else:
+            for _ in scene:                                         # build whole scene before opening window
+                pass
+        if self.window_type != 'onscreen':
+            # headless run: save the scene if it was rendered offscreen, then exit instead of opening a window
+            if self.image_path is not None and self.window_type == 'offscreen':
+                if env.saveImage(self.image_path):
+                    print('Saved scene to {}'.format(self.image_path))
+                else:
+                    print('[ERROR] Scene could not be saved to {}'.format(self.image_path))
+            env.destroy()
+            return
         print('Rendering Environment...')
         env.run()
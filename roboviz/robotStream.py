@@ -0,0 +1,158 @@
+# ----------------------------------------------------------------------------
+# Created Date: 18/10/26
+# ---------------------------------------------------------------------------
+
+import gzip
+import io
+import json
+
+try:
+    import zstandard                # optional, only needed for .zst robot files
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 1 << 16                # number of characters read from the robot file at a time
+WHITESPACE = ' \t\n\r'
+
+
+class CompressionError(OSError):
+    """Raised when a compressed robot file can't be opened because its compression package isn't installed"""
+
+
+def openRobotFile(path, mode='r'):
+    """
+    Opens a robot JSON file as text, (de)compressing it if it ends in .gz or .zst
+    Args:
+        `path`: file path of robot JSON file (String)  
+        `mode`: 'r' to read or 'w' to write (String) **optional**
+    Returns:
+        `f`: text file object (TextIO)
+    Raises:
+        `CompressionError`: if the file is .zst and zstandard isn't installed
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise CompressionError('the zstandard package is required for .zst robot files')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode)
+
+
+class JSONStream:
+    """Incrementally walks a robot JSON document, decoding one value at a time instead of the whole file"""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        """
+        Constructor
+        Args:
+            `f`: text file object to read from (TextIO)  
+            `chunk_size`: number of characters to read from the file at a time (int) **optional**
+        """
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0                # position of the next unread character in buffer
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def read(self, size=None):
+        """
+        Appends more of the file to the buffer, discarding what has already been decoded
+        Args:
+            `size`: number of characters to read (int) **optional**, defaults to the chunk size
+        """
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character in the document
+        Returns:
+            `char`: next character, '' at the end of the document (String)
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.read()
+
+    def expect(self, char):
+        """
+        Consumes the next character in the document, which must be `char`
+        Args:
+            `char`: expected character (String)
+        """
+        if self.peek() != char:
+            raise ValueError("Expected '{}' in robot file".format(char))
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next complete JSON value in the document, reading more of the file until the value is complete
+        Returns:
+            `value`: decoded value (dict, list, String, int, float, boolean or None)
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a value ending at the end of the buffer (e.g. a number) may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read(size)
+            size *= 2               # grow reads so that large values are not re-decoded too often
+
+    def items(self):
+        """
+        Walks the top-level object of the document, yielding (key, value) pairs. The `swarm` array is yielded as a generator of its elements,
+        which must be exhausted before the next item is requested
+        Returns:
+            `items`: (key, value) pairs of the top-level object (generator)
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            if key == 'swarm':
+                yield key, self.elements()
+            else:
+                yield key, self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+    def elements(self):
+        """
+        Walks a JSON array, decoding and yielding one element at a time
+        Returns:
+            `elements`: elements of the array (generator)
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
@@ -7,16 +7,34 @@ from roboviz.hinge import Hinge
 from roboviz.brick import Brick
 from roboviz.connection import Connection
 from roboviz.robot import Robot
+from roboviz.bodyTemplate import BodyTemplate
 from roboviz.brain import ann
+from roboviz.robotStream import openRobotFile, JSONStream, CompressionError
+from roboviz.robotBinary import RobotBinary, writeBinary
+from roboviz.layout import BodyLayout
+from roboviz.collision import overlappingPairs, BoxTree
 
 import json
+import os
+import re
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+import warnings
+import numpy as np
 import rpack
-from copy import deepcopy
 
 
 CREATE_BRAIN = False        # create brain or not
 PACK_BUFFER = 50            # buffer between auto-packed robots
 INC_AMT = 100               # amount to increase environment dims by in auto-pack if unable to fit all robots
+PARALLEL_MIN = 64           # min. heterogeneous swarm size worth compiling in parallel
+SHARDS_PER_WORKER = 4       # number of shards a parallel parse gives each worker process
+POS_FIELD = re.compile(r'[^,\s]+')    # a value in a positions file line
+NUMBER = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')    # a (float) number
+
+
+class BodyError(Exception):
+    """Raised when a robot body contains duplicate or dangling component IDs"""
 
 
 class RobotUtils:
@@ -33,26 +51,75 @@ class RobotUtils:
         self.config_path = config_path
         self.pos_path = pos_path
         self.robot_path = robot_path
+        self.error = None               # description of the last parsing error (if known)
+        self.trees = {}                 # body template -> (component box hierarchy, component IDs), shared by robots with that body
+
+    def swarmBounds(self, robots):
+        """
+        Gathers the bounds of every robot into one array, calculating any that aren't known yet
+        Args:
+            `robots`: list of all robots in the scene (Robot[])
+        Returns:
+            `bounds`: [x_max, x_min, y_max, y_min, z_max, z_min] of each robot, in the order robots are given ((N, 6) float ndarray)
+        """
+        for robot in robots:
+            if robot.bounds is None:
+                robot.setBounds()
+        return np.array([robot.bounds for robot in robots], dtype=float).reshape(-1, 6)
 
-    def collisionDetect(self, robots):
+    def collisionDetect(self, robots, bounds=None):
         """
-        Determines if there are any possible collisions between robots in the scene
+        Determines if there are any possible collisions between robots in the scene (robots whose bounding boxes overlap)
             Args:
-                `robots`: list of all robots in the scene (Robot[])
+                `robots`: list of all robots in the scene (Robot[])  
+                `bounds`: bounds of robots, from **swarmBounds** ((N, 6) float ndarray) **optional**
             Returns
-                `collisions`: possible collisions between robots (int[][])
-        """
-        collisions = []
-        for i, first_robot in enumerate(robots):
-            for second_robot in robots[i + 1:]:
-                # if robots cross each other's z bounds
-                if first_robot.bounds[4] >= second_robot.bounds[5] and first_robot.bounds[5] <= second_robot.bounds[4]:
-                    # if robots cross each other's x bounds
-                    if first_robot.bounds[0] >= second_robot.bounds[1] and first_robot.bounds[1] <= second_robot.bounds[0]:
-                        # if robots cross each other's y bounds
-                        if first_robot.bounds[2] >= second_robot.bounds[3] and first_robot.bounds[3] <= second_robot.bounds[2]:
-                            collisions.append([first_robot.id, second_robot.id])
-        return collisions
+                `collisions`: possible collisions between robots, in the order robots are given (int[][])
+        """
+        if bounds is None:
+            bounds = self.swarmBounds(robots)
+        return [[robots[i].id, robots[j].id] for i, j in overlappingPairs(bounds).tolist()]
+
+    def bodyTree(self, robot):
+        """
+        Gets the bounding volume hierarchy of a robot's component boxes (laid out relative to its core), built once per body template
+        Args:
+            `robot`: robot to get hierarchy of (Robot)
+        Returns:
+            `(tree, ids)`: hierarchy of component boxes (BoxTree) + ID of the component each box belongs to (String[])
+        """
+        if robot.template is not None and robot.template in self.trees:
+            return self.trees[robot.template]
+        template = robot.template if robot.template is not None else BodyTemplate.fromBody(robot.components, robot.connections)
+        layout = BodyLayout(template)
+        placed = np.flatnonzero(~np.isnan(layout.boxes[:, 0, 0]))
+        tree = (BoxTree(layout.boxes[placed, 0], layout.boxes[placed, 1]), [template.parts[i][0] for i in placed])
+        if robot.template is not None:
+            self.trees[robot.template] = tree
+        return tree
+
+    def componentCollisions(self, robots, collisions):
+        """
+        Checks possible collisions (robots with overlapping bounding boxes, from **collisionDetect**) component by component,
+        dropping robots whose boxes overlap but whose components don't
+        Args:
+            `robots`: list of all robots in the scene (Robot[])  
+            `collisions`: possible collisions between robots (int[][])
+        Returns:
+            `collisions`: collisions between robots, each with the IDs of every pair of colliding components ([int, int, String[][]][])
+        """
+        robots = {robot.id: robot for robot in robots}
+        # robots sharing bodies share hierarchies, so pairs of robots with the same pair of bodies are checked together
+        groups = {}
+        for first_id, second_id in collisions:
+            first_tree, second_tree = self.bodyTree(robots[first_id]), self.bodyTree(robots[second_id])
+            groups.setdefault((id(first_tree), id(second_tree)), (first_tree, second_tree, []))[2].append((first_id, second_id))
+        components = {}                 # (robot ID, robot ID) -> colliding component pairs
+        for (first_tree, first_ids), (second_tree, second_ids), pairs in groups.values():
+            offsets = [np.subtract(np.reshape(robots[second].core_pos, 3), np.reshape(robots[first].core_pos, 3)) for first, second in pairs]
+            for p, i, j in zip(*first_tree.overlaps(second_tree, offsets)):
+                components.setdefault(pairs[p], []).append([first_ids[i], second_ids[j]])
+        return [[first_id, second_id, components[first_id, second_id]] for first_id, second_id in collisions if (first_id, second_id) in components]
 
     def createBrain(self, components, brain, neurons):
         """
@@ -108,238 +175,377 @@ class RobotUtils:
             `robot`: Robot to be written out (Robot)  
             `name`: name of Robot JSON file (String)
         """
-        path = 'json/{}.json'.format(name)
-        dict_outer = {}
-        dict_inner = {}
-        connections = list(robot.connections)
-        components = list(robot.components)
-
-        with open(path, 'w') as f:
-            # get all components & connections as dicts
-            for i, component in enumerate(components):
-                components[i] = component.as_dict()
-            for i, connection in enumerate(connections):
-                connections[i].unStandardiseSlots()
-                connections[i] = connection.as_dict()
-
-            # construct JSON file sections
-            dict_inner["part"] = components
-            dict_inner["connection"] = connections
-            dict_outer["id"] = robot.id
-            dict_outer["body"] = dict_inner
-
-            # write to JSON file
-            json.dump(dict_outer, f, indent=4)
+        self.writeSwarm([robot], 'json/{}.json'.format(name), single=True)
+
+    def writeSwarm(self, robots, path, single=False):
+        """
+        Writes Robots out to a robot JSON file one at a time, so that only one robot is held as a dict at once.
+        Robots are not changed (slots are written back in RoboGen's system from copies). Compressed if the path ends in .gz or .zst
+        Args:
+            `robots`: Robots to be written out (Robot[] or generator of Robot)  
+            `path`: file path of robot JSON file (String)  
+            `single`: write the first robot as a single body (homogeneous swarm) instead of a `swarm` array (boolean) **optional**
+        """
+        with openRobotFile(path, 'w') as f:
+            # SINGLE BODY
+            if single:
+                for robot in robots:
+                    json.dump(robot.as_dict(), f, indent=4)
+                    break
+                return
+            # SWARM
+            f.write('{\n    "swarm": [')
+            for i, robot in enumerate(robots):
+                f.write(',\n' if i > 0 else '\n')
+                f.write(textwrap.indent(json.dumps(robot.as_dict(), indent=4), ' ' * 8))
+            f.write('\n    ]\n}')
 
     def posParse(self):
         """
-        Parses robot positions from positions file
+        Parses robot positions from positions file, either text (whitespace or comma separated x y z per line, with an optional
+        header line and # comments) or a NumPy .npy array
         Returns:
-            `positions`: positions of Robots in scene (int[])
+            `positions`: positions of Robots in scene ((N, 3) float ndarray), `False` on a format error (described by `self.error`)
         """
+        self.error = None
         try:
-            positions = []
+            if self.pos_path.endswith('.npy'):
+                positions = np.load(self.pos_path)
+                if positions.ndim != 2 or positions.shape[1] != 3:
+                    self.error = 'Expected an (N, 3) array of positions, found shape {}'.format(positions.shape)
+                    return False
+                return positions.astype(float, copy=False)
             with open(self.pos_path, 'r') as f:
-                for line in f:
-                    robot_position = []
-                    line = line.split(' ')
-                    robot_position.append(int(line[0]))  # x value
-                    robot_position.append(int(line[1]))  # y value
-                    robot_position.append(int(line[2]))  # z value
-                    positions.append(robot_position)
-            return positions
-        except:
-            # format error or file not found
+                lines = f.read().splitlines()
+        except (OSError, ValueError):
+            # file not found or not a NumPy file
             return False
 
+        # find first line with values, a header if none of it is numeric or it doesn't line up with the data below
+        data_lines = [line.split('#')[0] for line in lines]
+        filled = [i for i, line in enumerate(data_lines) if line.strip()]
+        if not filled:
+            self.error = 'No positions given'
+            return False
+        first = filled[0]
+        fields = POS_FIELD.findall(data_lines[first])
+        numeric = [NUMBER.fullmatch(field) is not None for field in fields]
+        header = not any(numeric)
+        if not all(numeric) and not header and len(filled) > 1:
+            header = len(fields) != len(POS_FIELD.findall(data_lines[filled[1]]))
+        skip = first + 1 if header else 0
+        data = filled[1] if header and len(filled) > 1 else first
+        delimiter = ',' if ',' in data_lines[data] else None
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')                               # no data is reported below instead
+                positions = np.loadtxt(lines, delimiter=delimiter, comments='#', skiprows=skip, ndmin=2, dtype=float)
+            if positions.size == 0:
+                self.error = 'No positions given'
+                return False
+            if positions.shape[1] == 3:
+                return positions
+        except ValueError:
+            pass
+        self.error = self.findPosError(data_lines, skip, delimiter)
+        return False
+
+    def findPosError(self, data_lines, skip, delimiter=None):
+        """
+        Finds the first malformed entry in a positions file (only used once a fast parse has failed)
+        Args:
+            `data_lines`: lines of the positions file with comments removed (String[])  
+            `skip`: number of lines before the positions (including any header) (int)  
+            `delimiter`: **optional**, delimiter used by the positions, `None` for whitespace (String)
+        Returns:
+            `error`: description of the malformed entry, with its line and column (String)
+        """
+        for n, line in enumerate(data_lines[skip:], skip + 1):
+            if not line.strip():
+                continue
+            fields = list(POS_FIELD.finditer(line))
+            for field in fields:
+                if not NUMBER.fullmatch(field.group()):
+                    return "Line {}, column {}: '{}' is not a number".format(n, field.start() + 1, field.group())
+            if len(fields) != 3:
+                return 'Line {}: expected 3 values (x y z), found {}'.format(n, len(fields))
+            if line.count(',') != (2 if delimiter == ',' else 0):
+                return 'Line {}: expected {} separated values'.format(n, 'comma' if delimiter == ',' else 'whitespace')
+        return 'Incorrect positions file format'
+
     def configParse(self):
         """
         Parses environment and swarm size from configuration file
         Returns:
-            `configuration`: environment and swarm size (int[])
+            `configuration`: environment and swarm size (int[]), `False` on a format error (described by `self.error`)
         """
+        self.error = None
         try:
             configuration = []
             with open(self.config_path, 'r') as f:
-                for line in f:
-                    configuration.append(int(line))
-            return configuration
-        except:
-            # format error or file not found
+                for n, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        configuration.append(int(line))
+                    except ValueError:
+                        column = len(line) - len(line.lstrip()) + 1
+                        self.error = "Line {}, column {}: '{}' is not a whole number".format(n, column, line.strip())
+                        return False
+        except OSError:
+            # file not found
+            return False
+        if len(configuration) != 3:
+            self.error = 'Expected 3 values (x_length, y_length, swarm_size), found {}'.format(len(configuration))
             return False
+        return configuration
 
-    def robotParse(self, swarm_size, positions, build=False):
+    def compileBody(self, body):
+        """
+        Builds the components and connections of a robot body in a single pass, resolving connection IDs through an index
+        Args:
+            `body`: body section of a robot JSON entry (dict)
+        Returns:
+            `(compArr, connArr)`: components and connections of the body (RobotComp[], Connection[])
+        Raises:
+            `BodyError`: if a component ID is duplicated or a connection references an unknown component ID
+        """
+        index = {}                                                          # component ID -> component
+        compArr = []
+        for part in body["part"]:
+            id = part['id']
+            if id in index:
+                raise BodyError("Duplicate component ID '{}'".format(id))
+            type = part['type']
+            # determine component type
+            if 'Hinge' in type:
+                newComp = Hinge(id, type, part['root'], part['orientation'])    # create new Hinge component
+            else:
+                newComp = Brick(id, type, part['root'], part['orientation'])    # create new Brick component
+            index[id] = newComp
+            compArr.append(newComp)
+
+        connArr = []
+        for i in body["connection"]:
+            src = index.get(i['src'])
+            dest = index.get(i['dest'])
+            if src is None:
+                raise BodyError("Connection source '{}' is not a component ID".format(i['src']))
+            if dest is None:
+                raise BodyError("Connection destination '{}' is not a component ID".format(i['dest']))
+            connArr.append(Connection(src, dest, i['srcSlot'], i['destSlot']))  # construct new connection
+        return compArr, connArr
+
+    def robotParse(self, swarm_size, positions, build=False, workers=1):
         """
         Parses robot(s) from robot JSON file
         Args:
             `swarm_size`: number of robots in swarm (int)  
             `positions`: positions of each robot in swarm (int[])  
-            `build`: whether or not robot is being loaded into builder (boolean) **optional**
+            `build`: whether or not robot is being loaded into builder (boolean) **optional**  
+            `workers`: number of processes to compile a heterogeneous swarm with (int) **optional**
         Returns:
-            `robotArr`: all robots to be rendered in the scene (Robot[])
+            `robotArr`: all robots to be rendered in the scene (Robot[]), `False` on a format error (described by `self.error`)
+            or `True` if too few positions were given
         """
+        self.error = None
         try:
             robotArr = []
-            count = 0  # counting the positions
-            with open(self.robot_path, 'r') as f:
+            # COMPILED BINARY FILE
+            if self.robot_path.endswith('.rvb'):
+                with RobotBinary(self.robot_path) as binary:
+                    return list(binary.robots(swarm_size, positions))
+            with openRobotFile(self.robot_path) as f:
                 data = json.load(f)
             # HETERGENEOUS SWARM
-            if("swarm" in data.keys()):
-                swarm = data["swarm"]
-
-                for robot in swarm:
-                    roboId = robot["id"]
-                    body = robot["body"]
-
-                    bodyComp = body["part"]
-                    compArr = []
-
-                    for i in bodyComp:
-                        id = i['id']
-                        type = i['type']
-                        root = i['root']
-                        orient = i['orientation']
-                        # determine component type
-                        if 'Hinge' in type:
-                            newComp = Hinge(id, type, root, orient)     # create new Hinge component
-                        else:
-                            newComp = Brick(id, type, root, orient)     # create new Brick component
-
-                        compArr.append(newComp)
-
-                    bodyConnect = body["connection"]
-                    connArr = []
-
-                    for i in bodyConnect:
-                        src = i['src']
-                        # find the component that is the source
-                        for j in compArr:
-                            compare = j.id
-                            if src == compare:
-                                src = j
-
-                        dest = i['dest']
-                        # find the component that is the destination
-                        for j in compArr:
-                            if dest == (j.id):
-                                dest = j
-
-                        srcSlot = i['srcSlot']
-                        # find the component that is the source slot
-                        for j in compArr:
-                            if srcSlot == (j.id):
-                                srcSlot = j
-
-                        destSlot = i['destSlot']
-                        # find the component that is the destination slot
-                        for j in compArr:
-                            if destSlot == (j.id):
-                                srcSlot = j
-
-                        newCon = Connection(src, dest, srcSlot, destSlot)               # construct new connection
-                        connArr.append(newCon)                                          # add to list of connections
-
-                    robot = Robot(roboId, connArr, compArr, positions[count - 1])
-                    count += 1
-                    robotArr.append(robot)
+            if("swarm" in data):
+                if build:
+                    # builder edits the parsed components directly
+                    for i, robot in enumerate(data["swarm"]):
+                        compArr, connArr = self.compileBody(robot["body"])
+                        robotArr.append(Robot(robot["id"], connArr, compArr, positions[i], brain=robot.get("brain")))
+                    return robotArr
+                workers = min(workers, os.cpu_count() or 1)                 # a pool is only worth starting with cores to run it
+                if workers > 1 and len(data["swarm"]) >= PARALLEL_MIN:
+                    return self.parallelParse(data["swarm"], positions, workers)
+                # same laid out bodies as a parallel parse, compiled in this process
+                for id, template, brain in compileShard(data["swarm"]):
+                    robotArr.append(Robot.fromTemplate(id, template, positions[len(robotArr)], brain=brain))
                 return robotArr
             # HOMOGENOUS SWARM
             else:
-                roboId = data["id"]
-                body = data["body"]
-                bodyComp = body["part"]
-                compArr = []
-
-                for i in bodyComp:
-                    id = i['id']
-                    type = i['type']
-                    root = i['root']
-                    orient = i['orientation']
-                    if 'Hinge' in type:
-                        newComp = Hinge(id, type, root, orient)                     # create new Hinge component
-                    else:
-                        newComp = Brick(id, type, root, orient)                     # create new Brick component
-                    compArr.append(newComp)
-
-                bodyConnect = body["connection"]
-                connArr = []
-
-                for i in bodyConnect:
-                    src = i['src']
-                    # find the component that is the source
-                    for j in compArr:
-                        compare = j.id
-                        if src == compare:
-                            src = j
-
-                    dest = i['dest']
-                    # find the component that is the destination
-                    for j in compArr:
-                        if dest == (j.id):
-                            dest = j
-
-                    srcSlot = i['srcSlot']
-                    # find the component that is the source slot
-                    for j in compArr:
-                        if srcSlot == (j.id):
-                            srcSlot = j
-
-                    destSlot = i['destSlot']
-                    # find the component that is the destination slot
-                    for j in compArr:
-                        if destSlot == (j.id):
-                            srcSlot = j
-
-                    newCon = Connection(src, dest, srcSlot, destSlot)
-                    connArr.append(newCon)
+                compArr, connArr = self.compileBody(data["body"])
                 if CREATE_BRAIN:
                     network = data["brain"]
                     neurons = network["neuron"]
                     brain = network["connection"]
                     ann = self.createBrain(compArr, brain, neurons)
+                if build:
+                    # builder edits the parsed components directly
+                    return [Robot(0, connArr, compArr, positions[0], brain=data.get("brain"))]
+                # every robot in the swarm shares one body (and brain)
+                template = BodyTemplate.fromBody(compArr, connArr)
                 for i in range(int(swarm_size)):                      # loop through robots in swarm
-                    if not build:
-                        connArr = deepcopy(connArr)
-                    robotArr.append(Robot(i, connArr, compArr, positions[i]))
+                    robotArr.append(Robot.fromTemplate(i, template, positions[i], brain=data.get("brain")))
                 return robotArr
         except IndexError:
             # means incorrect number of positions given
             return True
-        except:
-            # format error or file not found
+        except (BodyError, CompressionError) as e:
+            # dangling or duplicate component IDs, or compressed file that can't be opened
+            self.error = str(e)
+            return False
+        except FileNotFoundError:
+            # file not found (already named by the error message)
+            return False
+        except KeyError as e:
+            # robot file is missing an entry
+            self.error = 'Missing {} entry'.format(e)
+            return False
+        except (OSError, ValueError, TypeError) as e:
+            # format error or unreadable file
+            self.error = str(e)
             return False
 
-    def autoPack(self, robots, x_length, y_length):
+    def parallelParse(self, swarm, positions, workers):
+        """
+        Compiles the robots of a heterogeneous swarm across a pool of processes. Each process compiles a shard of the swarm into
+        laid out BodyTemplates, which are returned (pickled) to this process and given positions in swarm order. Gives the same
+        Robots as a serial parse
+        Args:
+            `swarm`: swarm section of a robot JSON file (dict[])  
+            `positions`: positions of each robot in swarm (int[])  
+            `workers`: number of processes (int)
+        Returns:
+            `robotArr`: all robots to be rendered in the scene (Robot[]), raises IndexError if too few positions are given
+            and BodyError if a body has dangling/duplicate component IDs
+        """
+        if len(positions) < len(swarm):
+            raise IndexError('too few positions')
+        shard_size = -(-len(swarm) // (workers * SHARDS_PER_WORKER))           # ceil, several shards per worker to balance load
+        shards = [swarm[i:i + shard_size] for i in range(0, len(swarm), shard_size)]
+        robotArr = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for shard in pool.map(compileShard, shards):                        # results come back in swarm order
+                for id, template, brain in shard:
+                    robotArr.append(Robot.fromTemplate(id, template, positions[len(robotArr)], brain=brain))
+        return robotArr
+
+    def robotStream(self, swarm_size, positions):
+        """
+        Parses robot(s) from robot JSON file one at a time, without loading the whole file into memory.
+        Heterogeneous robots are decoded from the `swarm` array as they are reached
+        Args:
+            `swarm_size`: number of robots in swarm (int)  
+            `positions`: positions of each robot in swarm (int[])
+        Returns:
+            `robots`: robots to be rendered in the scene (generator of Robot), raises IndexError if too few positions are given,
+            BodyError if a body has dangling/duplicate component IDs and ValueError on a format error
+        """
+        if self.robot_path.endswith('.rvb'):
+            with RobotBinary(self.robot_path) as binary:
+                yield from binary.robots(swarm_size, positions)
+            return
+        with openRobotFile(self.robot_path) as f:
+            data = {}
+            for key, value in JSONStream(f).items():
+                # HETERGENEOUS SWARM
+                if key == 'swarm':
+                    # each robot compiled + laid out as it is reached, the same as a serial or parallel parse
+                    for i, robot in enumerate(value):
+                        [(id, template, brain)] = compileShard([robot])
+                        yield Robot.fromTemplate(id, template, positions[i], brain=brain)
+                    return
+                data[key] = value
+        # HOMOGENOUS SWARM
+        template = BodyTemplate.fromBody(*self.compileBody(data["body"]))
+        for i in range(int(swarm_size)):
+            yield Robot.fromTemplate(i, template, positions[i], brain=data.get("brain"))
+
+    def convertBinary(self, path):
+        """
+        Converts the robot JSON file into a compiled binary robot file (.rvb) that loads without JSON parsing.
+        Bodies are laid out (headlessly) before being written, and the brain section is not converted
+        Args:
+            `path`: file path of binary robot file to write (String)
+        Raises:
+            `BodyError`: if a body has dangling or duplicate component IDs  
+            `ValueError`: if a body connects to a component before placing it, or a robot's ID isn't an integer
+        """
+        templates = []
+        robot_ids = []
+        with openRobotFile(self.robot_path) as f:
+            for key, value in JSONStream(f).items():
+                # HETERGENEOUS SWARM
+                if key == 'swarm':
+                    for robot in value:
+                        if not isinstance(robot["id"], int) or isinstance(robot["id"], bool):
+                            raise ValueError("Robot ID {!r} isn't an integer, binary robot files only store integer IDs".format(robot["id"]))
+                        templates.append(BodyTemplate.fromBody(*self.compileBody(robot["body"])))
+                        robot_ids.append(robot["id"])
+                # HOMOGENOUS SWARM
+                elif key == 'body':
+                    templates.append(BodyTemplate.fromBody(*self.compileBody(value)))
+                    robot_ids = None
+        for template in templates:
+            template.setPoses(BodyLayout(template).poses)
+        writeBinary(path, templates, robot_ids)
+
+    def convertJSON(self, path):
+        """
+        Rewrites the robot file (JSON or binary) as a robot JSON file, compressed if the path ends in .gz or .zst.
+        Heterogeneous robots are written out as they are read, so the whole swarm is never held in memory
+        Args:
+            `path`: file path of robot JSON file to write (String)
+        Raises:
+            `BodyError`: if a body has dangling or duplicate component IDs
+        """
+        # COMPILED BINARY FILE
+        if self.robot_path.endswith('.rvb'):
+            with RobotBinary(self.robot_path) as binary:
+                self.writeSwarm(binary.robots(1, np.zeros((len(binary), 3))), path, single=binary.homogeneous)
+            return
+        with openRobotFile(self.robot_path) as f:
+            data = {}
+            for key, value in JSONStream(f).items():
+                # HETERGENEOUS SWARM
+                if key == 'swarm':
+                    robots = (Robot(robot["id"], *reversed(self.compileBody(robot["body"])), [0, 0, 0], brain=robot.get("brain"))
+                              for robot in value)
+                    self.writeSwarm(robots, path)
+                    return
+                data[key] = value
+        # HOMOGENOUS SWARM
+        compArr, connArr = self.compileBody(data["body"])
+        self.writeSwarm([Robot(data.get("id", 0), connArr, compArr, [0, 0, 0], brain=data.get("brain"))], path, single=True)
+
+    def autoPack(self, robots, x_length, y_length, bounds=None):
         """
         Calculates automatic positioning of Robots to fit within certain bounds (resizes environment if not possible)
         Args:
             `robots`: Robots in the Environment (Robot[])  
             `x_length`: current x-dim of the environment  
-            `y_length`: current y-dim of the environment
+            `y_length`: current y-dim of the environment  
+            `bounds`: bounds of robots, from **swarmBounds** ((N, 6) float ndarray) **optional**
         Returns:
-            `(positions, x_length, y_length)`: new positions of Robots + new dims of environment
+            `(positions, x_length, y_length)`: new (x, y) positions of Robots ((N, 2) float ndarray) + new dims of environment
         """
+        if bounds is None:
+            bounds = self.swarmBounds(robots)
+        core_pos = np.array([robot.core_pos for robot in robots], dtype=float).reshape(-1, 3)
+        # get bounding box sizes for all robots
+        sizes = bounds[:, [0, 2]].astype(int) - bounds[:, [1, 3]].astype(int) + PACK_BUFFER
+        sizes = [tuple(size) for size in sizes.tolist()]
         while True:
             try:
-                sizes = []
-                # get bounding box sizes for all robots
-                for robot in robots:
-                    bounds = robot.bounds
-                    width = int(bounds[0]) - int(bounds[1]) + PACK_BUFFER
-                    height = int(bounds[2]) - int(bounds[3]) + PACK_BUFFER
-                    sizes.append((width, height))
-
                 # calculate optimal packing positions
                 positions = rpack.pack(sizes, max_width=y_length, max_height=x_length)
                 box_size = rpack.bbox_size(sizes, positions)    # size of packed robots
 
                 # adjust positions so that they're at the centre of each robot bounding box
                 # (originally put at bottom left corner)
-                for i, _ in enumerate(positions):
-                    bounds = robots[i].bounds
-                    core_pos = robot.core_pos
-                    positions[i] = (positions[i][0] + core_pos[0] - bounds[1] - box_size[0]/2,
-                                    positions[i][1] + core_pos[1] - bounds[3] - box_size[1]/2)
+                positions = np.array(positions, dtype=float).reshape(-1, 2) + core_pos[:, :2] - bounds[:, [1, 3]] - np.array(box_size) / 2
             except rpack.PackingImpossibleError:
                 # can't pack into environment dims
                 # resize environment and try again
@@ -349,3 +555,20 @@ class RobotUtils:
             else:
                 break
         return (positions, x_length, y_length)
+
+
+def compileShard(swarm):
+    """
+    Compiles part of a heterogeneous swarm into body templates, run in worker processes by RobotUtils **parallelParse**
+    Args:
+        `swarm`: robots from the swarm section of a robot JSON file (dict[])
+    Returns:
+        `shard`: (id, laid out body, brain) of each robot ((int, BodyTemplate, dict)[])
+    """
+    utils = RobotUtils('', '', '')
+    shard = []
+    for robot in swarm:
+        template = BodyTemplate.fromBody(*utils.compileBody(robot["body"]))
+        template.setPoses(BodyLayout(template).poses)                       # lay out here too, so rendering needs no calcPos
+        shard.append((robot["id"], template, robot.get("brain")))
+    return shard
@@ -10,7 +10,7 @@ from roboviz.brain import *
 
 fakeGUI = RobotGUI()
 fakeUtil = RobotUtils('', '', '')
-fakeEnv = Environment(0, 0, 0)
+fakeEnv = None                                              # created by TestEnv, as only one Environment can exist at a time
 
 """For testing the initialisation/activation of object classes"""
 
@@ -36,6 +36,15 @@ class TestUtil(unittest.TestCase):
 
 class TestEnv(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        global fakeEnv
+        fakeEnv = Environment(0, 0, 0, window_type='none')
+
+    @classmethod
+    def tearDownClass(cls):
+        fakeEnv.destroy()
+
     def test_env_activation(self):
         self.assertEqual(fakeEnv.x_length, 0)
         self.assertEqual(fakeEnv.y_length, 0)
@@ -56,7 +65,7 @@ class testComp(unittest.TestCase):
         self.assertTrue(fakeHinge.root)
         self.assertEqual(fakeHinge.orientation, 0)
         self.assertEqual(fakeHinge.direction, 0)
-        self.assertEqual(fakeHinge.dst_pos, 0)
+        self.assertIsNone(fakeHinge.bounds)
         self.assertEqual(fakeHinge.deltaX, 0)
         self.assertEqual(fakeHinge.mass, 20)
         self.assertEqual(fakeHinge.calcAcceleration(), 196)
@@ -70,7 +79,7 @@ class testComp(unittest.TestCase):
         self.assertTrue(fakeBrick.root)
         self.assertEqual(fakeBrick.orientation, 0)
         self.assertEqual(fakeBrick.direction, 0)
-        self.assertEqual(fakeBrick.dst_pos, 0)
+        self.assertIsNone(fakeBrick.bounds)
         self.assertEqual(fakeBrick.deltaX, 0)
         self.assertEqual(fakeBrick.mass, 50)
         self.assertAlmostEqual(fakeBrick.calcAcceleration(), 490)
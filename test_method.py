@@ -3,19 +3,53 @@ from roboviz.hinge import Hinge
 from roboviz.brick import Brick
 from roboviz.connection import Connection
 from roboviz.robot import Robot
-from roboviz.robotUtils import RobotUtils
-from roboviz.robotGUI import RobotGUI
+from roboviz.robotUtils import RobotUtils, BodyError
+from roboviz.bodyTemplate import BodyTemplate
+from roboviz.renderCache import RenderCache
+from roboviz.robotBinary import RobotBinary
+from roboviz import modelBounds
+from roboviz.robotGUI import RobotGUI, formatCollisions, formatOutOfBounds
+from roboviz import robotStream
+from roboviz.robotStream import CompressionError, JSONStream
+from roboviz.collision import overlappingPairs, BoxTree, outOfBounds, CollisionIndex
+from roboviz.layout import layoutRobot, placedBox
+from roboviz.modelRegistry import ModelRegistry
+from roboviz.instancedSwarm import InstancedSwarm, instancingSupported
+from roboviz.environment import Environment, impostorBox, wireframeBox
+from roboviz.quadTree import QuadTree
 
 import pytest
 import os
+import io
+import gzip
+import json
+import shutil
+import numpy as np
 
+from panda3d.core import Loader, NodePath, Filename
 from panda3d.core import LPoint3f
 from panda3d.core import LVector2f
 from panda3d.core import LVector3f
+from panda3d.core import GeomVertexReader
 
 """For testing the class methods"""
 
 
+@pytest.fixture
+def offscreen():
+    """Creates offscreen Environments for a test, destroying each one when the next is created or the test ends (only one can exist at a time)"""
+    envs = []
+
+    def create(*args, **kwargs):
+        if envs:
+            envs.pop().destroy()
+        envs.append(Environment(*args, window_type='offscreen', **kwargs))
+        return envs[-1]
+    yield create
+    for env in envs:
+        env.destroy()
+
+
 class TestClass():
     """Automatic testing class, invoke with 'pytest -q test_method.py'"""
 
@@ -146,6 +180,64 @@ class TestClass():
         print(utils.collisionDetect(robots))
         assert utils.collisionDetect(robots) == [[0, 1]]
 
+    def test_overlappingPairs(self):
+        rng = np.random.default_rng(0)
+        centres, half = rng.uniform(-1000, 1000, (300, 3)), rng.uniform(0, 150, (300, 3))
+        half[:5] *= 20                                                  # a few boxes cover much of the grid
+        bounds = np.stack([centres[:, 0] + half[:, 0], centres[:, 0] - half[:, 0], centres[:, 1] + half[:, 1],
+                           centres[:, 1] - half[:, 1], centres[:, 2] + half[:, 2], centres[:, 2] - half[:, 2]], axis=1)
+        lower, upper = bounds[:, 1::2], bounds[:, 0::2]
+        expected = [[i, j] for i in range(300) for j in range(i + 1, 300) if np.all((upper[i] >= lower[j]) & (lower[i] <= upper[j]))]
+        assert overlappingPairs(bounds).tolist() == expected
+        # touching boxes overlap, and every pair of identical boxes is found once
+        assert overlappingPairs([[1, 0, 1, 0, 1, 0], [2, 1, 1, 0, 1, 0]]).tolist() == [[0, 1]]
+        assert len(overlappingPairs(np.tile([1, 0, 1, 0, 1, 0], (50, 1)))) == 50 * 49 // 2
+        assert overlappingPairs(np.zeros((0, 6))).shape == (0, 2)
+
+    def test_componentCollisions(self):
+        tree = BoxTree([[0, 0, 0], [10, 0, 0], [0, 10, 0]], [[1, 1, 1], [11, 1, 1], [1, 11, 1]])
+        assert [pair.tolist() for pair in tree.overlaps(tree, [[10, 0, 0], [50, 0, 0]])] == [[0], [1], [0]]   # box 1 meets box 0 when 10 apart
+        assert len(tree.overlaps(BoxTree(np.zeros((0, 3)), np.zeros((0, 3))), [[0, 0, 0]])[0]) == 0
+
+        utils = RobotUtils('', '', 'json/robot.json')
+        robots = list(utils.robotParse(3, [[0, 0, 0], [-300, -300, 0], [-300, -300, 10]]))
+        for robot in robots:
+            layoutRobot(robot)
+        # L-shaped robots 0 + 1 have overlapping bounding boxes, but none of their components collide
+        assert utils.collisionDetect(robots) == [[0, 1], [0, 2], [1, 2]]
+        collisions = utils.componentCollisions(robots, utils.collisionDetect(robots))
+        assert [collision[:2] for collision in collisions] == [[1, 2]]
+        # robots 1 + 2 are nearly on top of each other, so each component collides with (at least) its counterpart
+        parts = [part[0] for part in robots[1].template.parts]
+        assert all([part, part] in collisions[0][2] for part in parts)
+        assert 'Component {}, Component {}'.format(parts[0], parts[0]) in formatCollisions(collisions)
+
+    def test_outOfBounds(self):
+        bounds = [[10, -10, 10, -10, 5, 0], [130.5, 90, 10, -10, 5, 0], [10, -10, -40, -120.7, 5, 0], [200, -200, 200, -200, 5, 0]]
+        indices, units = outOfBounds(bounds, 200, 200)
+        # robot 3 is over both x edges, and (as in Robot outOfBoundsDetect) the + edge is reported
+        assert indices.tolist() == [1, 2, 3] and units.tolist() == [[30, 0], [0, -20], [100, 100]]
+        for index, bound in enumerate(bounds):
+            robot = Robot(index, [], [], [0, 0, 0])
+            robot.bounds = bound
+            out_of_bounds = robot.outOfBoundsDetect(200, 200, test=True)
+            assert (out_of_bounds == 'none') == (index not in indices)
+        assert formatOutOfBounds([[1, [30, 0]]]) == 'Robot 1:\nx-axis = 30 units\n'
+        assert len(outOfBounds(np.zeros((0, 6)), 200, 200)[0]) == 0
+
+    def test_collisionIndex(self):
+        index = CollisionIndex(cell_size=100)
+        index.update(0, [0, 0, 0], [50, 50, 10])
+        index.update(1, [40, 40, 0], [250, 60, 10])                    # covers several cells
+        index.update(2, [300, 300, 0], [350, 350, 10])
+        assert index.neighbours(0) == [1] and index.neighbours(1) == [0] and index.neighbours(2) == []
+        # moving a robot only updates its own cells
+        index.update(2, [200, 50, 0], [260, 100, 10])
+        assert index.neighbours(2) == [1] and index.neighbours(1) == [0, 2]
+        assert (3, 3) not in index.cells
+        index.remove(1)
+        assert index.neighbours(0) == [] and index.neighbours(2) == [] and 1 not in index.bounds
+
 ###########################################################################################################################################################################
     # Test file operations
 
@@ -156,11 +248,48 @@ class TestClass():
     def test_configParse(self):
         assert self.utils.configParse() == self.config
 
+    def test_configParse_error(self, capfd):
+        gui = RobotGUI(config_path='positions/pos.txt', pos_path='positions/pos.txt', robot_path='json/robot.json', cli=True)
+        with pytest.raises(SystemExit):
+            gui.runSim()
+        out, err = capfd.readouterr()
+        assert out == "[ERROR] Incorrect configuration file format or file not found\n[ERROR] Line 1, column 1: '0 0 0' is not a whole number\n"
+
     def test_posParse(self):
-        assert self.utils.posParse() == self.positions
+        positions = self.utils.posParse()
+        assert positions.shape == (4, 3) and positions.tolist() == self.positions
+
+    def test_posParse_formats(self, tmp_path):
+        utils = RobotUtils('', str(tmp_path / 'pos.txt'), '')
+        (tmp_path / 'pos.txt').write_text('x, y, z\n0.5, -1, 2e2   # robot 1\n\n3,4,5\n')
+        assert utils.posParse().tolist() == [[0.5, -1, 200], [3, 4, 5]]
+        (tmp_path / 'pos.txt').write_text('0 0 0\n1 2 3\n4 5a 6\n')
+        assert utils.posParse() is False
+        assert utils.error == "Line 3, column 3: '5a' is not a number"
+        (tmp_path / 'pos.txt').write_text('0 0 0\n1 2\n')
+        assert utils.posParse() is False
+        assert utils.error == 'Line 2: expected 3 values (x y z), found 2'
+        # a mistyped first row isn't taken as a header
+        (tmp_path / 'pos.txt').write_text('10 20 3O\n1 2 3\n')
+        assert utils.posParse() is False
+        assert utils.error == "Line 1, column 7: '3O' is not a number"
+        # rows must all use the same delimiter
+        (tmp_path / 'pos.txt').write_text('1,2,3\n4 5 6\n')
+        assert utils.posParse() is False
+        assert utils.error == 'Line 2: expected comma separated values'
+        (tmp_path / 'pos.txt').write_text('x y z\n1 2 3\n4,5,6\n')
+        assert utils.posParse() is False
+        assert utils.error == 'Line 3: expected whitespace separated values'
+
+        utils.pos_path = str(tmp_path / 'pos.npy')
+        np.save(utils.pos_path, np.arange(6).reshape(2, 3))
+        assert utils.posParse().tolist() == [[0, 1, 2], [3, 4, 5]]
 
     def test_writeRobot(self):
+        slots = [(c.src_slot, c.dst_slot, c.standardised) for c in self.robot1.connections]
         self.utils.writeRobot(self.robot1, 'robot1')
+        # robot being written isn't changed
+        assert [(c.src_slot, c.dst_slot, c.standardised) for c in self.robot1.connections] == slots
         robotIn = self.utils.robotParse(1, self.positions[0])[0]
         for i, _ in enumerate(robotIn.connections):
             r1 = robotIn.connections[i]
@@ -173,10 +302,480 @@ class TestClass():
             assert r1.dst.root == r2.dst.root
             assert r1.src.orientation == r2.src.orientation
             assert r1.dst.orientation == r2.dst.orientation
-            assert r1.src_slot == r2.src_slot
-            assert r1.dst_slot == r2.dst_slot
+            assert r1.as_dict() == r2.as_dict()
         os.remove('json/robot1.json')
 
+    def test_writeSwarm(self, tmp_path):
+        positions = [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0]]
+        parsed = RobotUtils('', '', 'json/multipleRobots.json').robotParse(4, positions)
+        path = str(tmp_path / 'swarm.json.gz')
+        RobotUtils('', '', '').writeSwarm(iter(parsed), path)
+        written = RobotUtils('', '', path).robotParse(4, positions)
+        assert [r.as_dict() for r in written] == [r.as_dict() for r in parsed]
+        with open('json/multipleRobots.json') as f:
+            assert [r.as_dict() for r in written] == json.load(f)["swarm"]
+        # single body layout keeps brain
+        path = str(tmp_path / 'robot.json')
+        RobotUtils('', '', 'json/robot.json').convertJSON(path)
+        with open('json/robot.json') as f, open(path) as g:
+            assert json.load(f) == json.load(g)
+
+    def test_compileBody(self):
+        utils = RobotUtils('', '', '')
+        body = {"part": [{"id": "Core", "type": "CoreComponent", "root": True, "orientation": 0},
+                         {"id": "Hip", "type": "ActiveHinge", "root": False, "orientation": 1}],
+                "connection": [{"src": "Core", "dest": "Hip", "srcSlot": 0, "destSlot": 1}]}
+        compArr, connArr = utils.compileBody(body)
+        assert connArr[0].src is compArr[0] and connArr[0].dst is compArr[1]
+        assert connArr[0].src_slot == 0 and connArr[0].dst_slot == 1
+
+        body["connection"][0]["dest"] = "Knee"
+        with pytest.raises(BodyError, match='Knee'):
+            utils.compileBody(body)
+        body["connection"][0]["dest"] = "Hip"
+        body["part"][1]["id"] = "Core"
+        with pytest.raises(BodyError, match='Duplicate'):
+            utils.compileBody(body)
+
+    def test_robotParse_dangling(self, tmp_path):
+        path = tmp_path / 'dangling.json'
+        path.write_text('{"id": 0, "body": {"part": [{"id": "Core", "type": "CoreComponent", "root": true, "orientation": 0}], '
+                        '"connection": [{"src": "Core", "dest": "Hip", "srcSlot": 0, "destSlot": 0}]}}')
+        utils = RobotUtils('', '', str(path))
+        assert utils.robotParse(1, [[0, 0, 0]]) == False
+        assert 'Hip' in utils.error
+        # missing entries and malformed JSON are described too
+        path.write_text('{"id": 0}')
+        assert utils.robotParse(1, [[0, 0, 0]]) is False and utils.error == "Missing 'body' entry"
+        path.write_text('{"swarm": [{"body": {"part": [], "connection": []}}]}')
+        assert utils.robotParse(1, [[0, 0, 0]]) is False and utils.error == "Missing 'id' entry"
+        path.write_text('{"id": 0, "body": ')
+        assert utils.robotParse(1, [[0, 0, 0]]) is False and utils.error.startswith('Expecting value')
+        path.write_text('[]')
+        assert utils.robotParse(1, [[0, 0, 0]]) is False and utils.error
+        utils.robot_path = str(tmp_path / 'missing.json')
+        assert utils.robotParse(1, [[0, 0, 0]]) is False and utils.error is None
+
+    def test_robotStream(self, tmp_path):
+        path = tmp_path / 'swarm.json.gz'
+        with open('json/multipleRobots.json') as f:
+            data = json.load(f)
+        with gzip.open(path, 'wt') as f:
+            json.dump(data, f)
+        utils = RobotUtils('', '', str(path))
+        positions = [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0]]
+        streamed = list(utils.robotStream(4, positions))
+        parsed = RobotUtils('', '', 'json/multipleRobots.json').robotParse(4, positions)
+        assert [r.id for r in streamed] == [r.id for r in parsed]
+        assert [r.core_pos for r in streamed] == positions
+        for s, p in zip(streamed, parsed):
+            # constructed the same way: laid out templates, components only built when needed
+            assert s._components is None and p._components is None
+            assert s.template.parts == p.template.parts and s.template.poses == p.template.poses is not None
+            assert [c.as_dict() for c in s.connections] == [c.as_dict() for c in p.connections]
+        with pytest.raises(IndexError):
+            list(utils.robotStream(4, positions[:2]))
+
+    def test_robotStream_zst(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(robotStream, 'zstandard', None)          # as if zstandard isn't installed
+        path = str(tmp_path / 'swarm.json.zst')
+        with pytest.raises(CompressionError):
+            robotStream.openRobotFile(path)
+        # reported like any other unreadable robot file, with the reason
+        utils = RobotUtils('', '', path)
+        assert utils.robotParse(1, [[0, 0, 0]]) is False and 'zstandard' in utils.error
+        with pytest.raises(OSError):
+            list(utils.robotStream(1, [[0, 0, 0]]))
+
+    def test_JSONStream_chunks(self):
+        stream = JSONStream(io.StringIO('{"id": 12345, "swarm": [{"a": [1, 2]}, {"b": "x, y"}], "z": null}'), chunk_size=3)
+        items = []
+        for key, value in stream.items():
+            items.append((key, list(value) if key == 'swarm' else value))
+        assert items == [('id', 12345), ('swarm', [{"a": [1, 2]}, {"b": "x, y"}]), ('z', None)]
+
+    def test_bodyTemplate(self):
+        utils = RobotUtils('', '', 'json/robot.json')
+        robots = utils.robotParse(3, [[0, 0, 0], [100, 0, 0], [200, 0, 0]])
+        template = robots[0].template
+        assert all(robot.template is template for robot in robots)
+        assert robots[0]._connections is None                  # bodies are only built when needed
+        # each robot gets its own components, shared between its connections and components
+        for robot in robots:
+            assert robot.connections[0].src is robot.components[0]
+        assert robots[0].components[0] is not robots[1].components[0]
+        assert len(template.slots) == len(template.connections)
+        with pytest.raises(AttributeError):
+            template.parts = ()
+
+    def test_convertBinary(self, tmp_path):
+        positions = [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0]]
+        for path, swarm_size in [('json/multipleRobots.json', 4), ('json/robot.json', 3)]:
+            utils = RobotUtils('', '', path)
+            utils.convertBinary(str(tmp_path / 'robots.rvb'))
+            parsed = utils.robotParse(swarm_size, positions)
+            loaded = RobotUtils('', '', str(tmp_path / 'robots.rvb')).robotParse(swarm_size, positions)
+            assert [r.id for r in loaded] == [r.id for r in parsed]
+            for l, p in zip(loaded, parsed):
+                assert [c.as_dict() for c in l.components] == [c.as_dict() for c in p.components]
+                assert [c.as_dict() for c in l.connections] == [c.as_dict() for c in p.connections]
+                assert l.template.slots == BodyTemplate.fromBody(p.components, p.connections).slots
+        # the file is unmapped once closed, robots already created stay usable
+        with RobotBinary(str(tmp_path / 'robots.rvb')) as binary:
+            robots = list(binary.robots(3, positions))
+        assert binary.mm.closed and len(robots[0].components) == len(parsed[0].components)
+        # IDs that can't be stored are rejected
+        with open('json/multipleRobots.json') as f:
+            data = json.load(f)
+        data['swarm'][1]['id'] = 'second'
+        with open(tmp_path / 'named.json', 'w') as f:
+            json.dump(data, f)
+        with pytest.raises(ValueError, match="'second'"):
+            RobotUtils('', '', str(tmp_path / 'named.json')).convertBinary(str(tmp_path / 'named.rvb'))
+
+    def test_renderCache(self, tmp_path):
+        cache = RenderCache(directory=str(tmp_path / 'cache'))
+        key = cache.key('config/config4.txt', 'positions/pos4.txt', 'json/robot.json')
+        assert key == cache.key('config/config4.txt', 'positions/pos4.txt', 'json/robot.json')
+        assert key != cache.key('config/config4.txt', 'positions/pos4.txt', 'json/robot.json', auto_pack=True)
+        assert cache.load(key) is None
+        # replacing a model changes the key (layouts depend on the models' bounds)
+        model_dir = tmp_path / 'models'
+        model_dir.mkdir()
+        for name in ('CoreComponent.bam', 'FixedBrick.bam'):
+            shutil.copy(os.path.join('models', 'BAM', name), model_dir / name)
+        models = RenderCache(directory=str(tmp_path / 'cache'), model_dir=str(model_dir))
+        before = models.key('config/config4.txt', 'positions/pos4.txt', 'json/robot.json')
+        shutil.copy(os.path.join('models', 'BAM', 'PassiveHinge.bam'), model_dir / 'FixedBrick.bam')
+        modelBounds.tables.pop(str(model_dir))                          # bounds are otherwise read once per process
+        assert models.key('config/config4.txt', 'positions/pos4.txt', 'json/robot.json') != before
+
+        robots = RobotUtils('', '', 'json/robot.json').robotParse(4, self.positions)
+        template = robots[0].template
+        cache.store(key, self.config, robots)                   # not laid out yet, so not cached
+        assert cache.load(key) is None
+        template.setPoses([(i, 0, 0, 0, 0) for i, _ in enumerate(template.connections)])
+        for i, robot in enumerate(robots):
+            robot.bounds = [i + 1, i, 1, 0, 1, 0]
+        cache.store(key, self.config, robots)
+
+        config, positions, cached = cache.load(key)
+        assert config == self.config and positions == self.positions
+        assert [robot.bounds for robot in cached] == [robot.bounds for robot in robots]
+        assert cached[0].template is cached[3].template
+        assert cached[0].template.poses == template.poses and cached[0].template.slots == template.slots
+
+        # least recently used entry is evicted first
+        small = RenderCache(directory=str(tmp_path / 'cache'), max_size=os.path.getsize(cache.path(key)) * 2)
+        os.utime(cache.path(key), (0, 0))
+        small.store('a', self.config, robots)
+        small.store('b', self.config, robots)
+        assert small.load(key) is None and small.load('b') is not None
+
+    def test_parallelParse(self, tmp_path):
+        with open('json/multipleRobots.json') as f:
+            swarm = json.load(f)["swarm"]
+        swarm = [dict(robot, id=i) for i, robot in enumerate(swarm * 20)]
+        (tmp_path / 'swarm.json').write_text(json.dumps({"swarm": swarm}))
+        utils = RobotUtils('', '', str(tmp_path / 'swarm.json'))
+        positions = [[i, 0, 0] for i in range(len(swarm))]
+        serial = utils.robotParse(len(swarm), positions)
+        parallel = utils.parallelParse(swarm, positions, 2)               # pool is skipped by robotParse on a single core
+        assert [r.id for r in parallel] == [r.id for r in serial]
+        assert [r.core_pos for r in parallel] == [r.core_pos for r in serial]
+        for p, s in zip(parallel, serial):
+            assert [c.as_dict() for c in p.connections] == [c.as_dict() for c in s.connections]
+            assert p.template.slots == s.template.slots
+            assert p.template.poses == s.template.poses is not None
+        assert utils.robotParse(len(swarm), positions[:-1], workers=2) == True
+        with pytest.raises(IndexError):
+            utils.parallelParse(swarm, positions[:-1], 2)
+
+    def test_layout(self):
+        robots = RobotUtils('', '', 'json/robot.json').robotParse(2, [[0, 0, 0], [300, 0, 0]])
+        layout = layoutRobot(robots[0])
+        assert len(layout.poses) == len(robots[0].template.connections)
+        assert robots[0].template.poses == tuple(layout.poses)
+        # bounds match those of the rendered models (from Robot.setBounds)
+        assert robots[0].bounds == pytest.approx([98.5938, -292.0758, 136.6607, -252.5758, 19.3838, -19.3838], abs=1e-3)
+        layoutRobot(robots[1])
+        assert robots[1].bounds[0] == pytest.approx(robots[0].bounds[0] + 300)
+        # collision checks + auto-packing without rendering
+        assert self.utils.collisionDetect(robots) == [[0, 1]]
+        positions, _, _ = self.utils.autoPack(robots, 1000, 1000)
+        assert positions.shape == (2, 2)
+        # builder robots (already standardised) lay out the same
+        robot = RobotUtils('', '', 'json/robot.json').robotParse(1, [[0, 0, 0]], build=True)[0]
+        for connection in robot.connections:
+            connection.standardiseSlots()
+        assert layoutRobot(robot).poses == layout.poses
+        # the body's box is accumulated from the box of each placed component
+        assert [box.tolist() for box in placedBox([[-1, -2, -3], [1, 2, 3]], 90, 0)] == [[-2, -1, -3], [2, 1, 3]]
+        assert np.allclose(layout.min, np.nanmin(layout.boxes[:, 0], axis=0)) and np.allclose(layout.max, np.nanmax(layout.boxes[:, 1], axis=0))
+
+    def test_modelBounds(self, tmp_path):
+        shutil.copy('models/BAM/FixedBrick.bam', tmp_path / 'FixedBrick.bam')
+        bounds = modelBounds.modelBounds(str(tmp_path))
+        assert bounds == {'FixedBrick': ((-20.5, -20.5, -17.75), (20.5, 20.5, 17.75))}
+        assert (tmp_path / 'bounds.json').exists()
+        # table is reused within a process, and from disk while the model is unchanged
+        assert modelBounds.modelBounds(str(tmp_path)) is bounds
+        del modelBounds.tables[str(tmp_path)]
+        assert modelBounds.modelBounds(str(tmp_path)) == bounds
+        # changed model is measured again
+        del modelBounds.tables[str(tmp_path)]
+        shutil.copy('models/BAM/PassiveHinge.bam', tmp_path / 'FixedBrick.bam')
+        assert modelBounds.modelBounds(str(tmp_path))['FixedBrick'][1][0] == pytest.approx(17, abs=1e-3)
+
+    def test_modelRegistry(self):
+
+        class CoreLoader:
+            def loadModel(self, path):
+                return NodePath(Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(os.path.abspath(path))))
+        models = ModelRegistry(CoreLoader())
+        nodes = [models.get(type) for type in ['FixedBrick', 'ActiveHinge', 'FixedBrick', 'FixedBrick']]
+        assert (models.misses, models.hits) == (2, 2)
+        assert nodes[0] != nodes[2] and not nodes[0].hasParent()
+        nodes[0].setPos(10, 0, 0)
+        assert nodes[2].getPos() == LVector3f(0, 0, 0)
+        assert nodes[2].getTightBounds()[1] == LPoint3f(20.5, 20.5, 17.75)
+
+    def test_instancedSwarm(self):
+        assert not instancingSupported(None)
+        body = NodePath(Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(os.path.abspath('models/BAM/FixedBrick.bam'))))
+        swarm = InstancedSwarm(body, np.array([[0, 0, 0], [100, 0, 0], [0, 300, 50]]))
+        assert len(swarm) == 3 and body.getInstanceCount() == 3
+        assert swarm.texture.getRamImageSize() == 3 * 2 * 4 * 4       # 2 rgba32 texels per instance
+        bounds = body.node().getBounds()
+        assert bounds.getMax()[0] >= 120.5 and bounds.getMax()[1] >= 320.5 and bounds.getMax()[2] >= 67.75
+        swarm.setPosition(1, LVector3f(1000, 0, 0))
+        swarm.update()
+        assert body.node().getBounds().getMax()[0] >= 1020.5
+
+    def test_impostorBox(self):
+        box = impostorBox()
+        box_min, box_max = box.getTightBounds()
+        assert tuple(box_min) == (-1, -1, -1) and tuple(box_max) == (1, 1, 1)
+        geom = box.node().getGeom(0)
+        assert geom.getPrimitive(0).getNumFaces() == 12
+        # every face winds outwards (front faces point away from the centre)
+        vertices = GeomVertexReader(geom.getVertexData(), 'vertex')
+        points = [LVector3f(vertices.getData3()) for _ in range(geom.getVertexData().getNumRows())]
+        triangles = geom.getPrimitive(0)
+        for i in range(triangles.getNumPrimitives()):
+            a, b, c = (points[triangles.getVertex(triangles.getPrimitiveStart(i) + j)] for j in range(3))
+            assert (b - a).cross(c - a).dot(a + b + c) > 0
+
+    def test_wireframeBox(self):
+        box = wireframeBox()
+        box_min, box_max = box.getTightBounds()
+        assert tuple(box_min) == (-1, -1, -1) and tuple(box_max) == (1, 1, 1)
+        lines = box.node().getGeom(0).getPrimitive(0)
+        assert sum(lines.getPrimitiveNumVertices(i) - 1 for i in range(lines.getNumPrimitives())) == 12     # 12 edges
+        assert not hasattr(Robot(0, [], [], [0, 0, 0]), 'ls')
+
+    def test_quadTree(self):
+        root = NodePath('root')
+        tree = QuadTree(root, tile_size=100, levels=2)
+        robots = []
+        for id, pos in enumerate([(10, 10, 0), (50, 60, 0), (-10, 10, 0)]):
+            robot = root.attachNewNode('robot')
+            impostorBox().instanceTo(robot)
+            robot.setPos(pos)
+            tree.add(id, robot, pos)
+            robots.append(robot)
+        # robots are placed in leaf tiles, under a tile per level
+        assert robots[0].getParent() == robots[1].getParent() == tree.tiles[(0, 0, 0)]
+        assert robots[2].getParent() == tree.tiles[(0, -1, 0)]
+        assert tree.tiles[(0, 0, 0)].getParent() == tree.tiles[(1, 0, 0)] and tree.tiles[(2, 0, 0)].getParent() == root
+        # settled tiles are batched, and changing a batched tile removes the batch
+        assert sorted(tree.settled(0)) == [(0, -1, 0), (0, 0, 0)] and tree.settled(0) == []
+        batch = tree.batch((0, 0, 0), tree.geometry[0] + tree.geometry[1])
+        assert batch.findAllMatches('**/+GeomNode').getNumPaths() == 1              # both robots' boxes merged into one node
+        assert tree.touch(1) == [0, 1] and (0, 0, 0) not in tree.batches
+        # moving robots migrates them between tiles, and empty tiles are removed
+        robots[2].setPos(20, 20, 0)
+        assert tree.move(2, (20, 20, 0)) == []
+        assert robots[2].getParent() == tree.tiles[(0, 0, 0)] and (0, -1, 0) not in tree.tiles and (1, -1, 0) not in tree.tiles
+        assert robots[2].getPos(root) == (20, 20, 0)
+        # removed robots are left unparented (e.g. robots unloaded when paging)
+        assert tree.remove(0) == [] and not robots[0].hasParent() and 0 not in tree.robot_tile
+
+    def test_progressiveScene(self, offscreen):
+        gui = RobotGUI(cache=False, progressive=True)
+        utils = RobotUtils('', '', 'json/robot.json')
+        # built inside a task of the open window, so a mismatch is shown over the robots instead of quitting
+        env = offscreen(1000, 1000, 3)
+        assert list(gui.buildScene(env, [1000, 1000, 3], utils.robotParse(2, [[0, 0, 0], [300, 0, 0]]))) == [1, 2]
+        assert set(env.robot_pos) == {0, 1}
+        assert env.warning_textNode.getText() == 'Mismatch between number of robots (2) and swarm size given (3)'
+        # errors are summarised over the scene instead of opening the error window
+        env = offscreen(1000, 1000, 2)
+        list(gui.buildScene(env, [1000, 1000, 2], utils.robotParse(2, [[0, 0, 0], [900, 0, 0]])))
+        assert gui.out_of_bounds_all and not gui.collisions
+        assert env.warning_textNode.getText() == '0 possible collision(s), 1 robot(s) out of bounds\nSelect a robot to see its errors'
+        assert not env.warning_textNode.isHidden()
+
+    def test_progressiveScene_streamError(self, offscreen, tmp_path):
+        gui = RobotGUI(cache=False, progressive=True, stream=True)
+        with open('json/multipleRobots.json') as f:
+            swarm = json.load(f)["swarm"][:3]
+        positions = [[0, 0, 0], [1000, 0, 0], [2000, 0, 0]]
+        # a robot that can't be parsed when it is streamed stops the build, leaving the robots before it in the window
+        path = tmp_path / 'swarm.json'
+        path.write_text(json.dumps({"swarm": [swarm[0], dict(swarm[1], body=None), swarm[2]]}))
+        env = offscreen(5000, 5000, 3)
+        assert list(gui.buildScene(env, [5000, 5000, 3], RobotUtils('', '', str(path)).robotStream(3, positions))) == [1]
+        assert set(env.robot_pos) == {swarm[0]["id"]}
+        assert env.warning_textNode.getText() == 'Incorrect robot file format or file not found'
+        # body errors are shown with their reason
+        body = dict(swarm[1]["body"], connection=[{"src": "Nowhere", "dest": "Core", "srcSlot": 0, "destSlot": 0}])
+        path.write_text(json.dumps({"swarm": [swarm[0], dict(swarm[1], body=body), swarm[2]]}))
+        env = offscreen(5000, 5000, 3)
+        assert list(gui.buildScene(env, [5000, 5000, 3], RobotUtils('', '', str(path)).robotStream(3, positions))) == [1]
+        assert env.warning_textNode.getText().startswith("Incorrect robot file format or file not found: Connection source 'Nowhere'")
+        # too few positions
+        env = offscreen(5000, 5000, 3)
+        path.write_text(json.dumps({"swarm": swarm}))
+        assert list(gui.buildScene(env, [5000, 5000, 3], RobotUtils('', '', str(path)).robotStream(3, positions[:2]))) == [1, 2]
+        assert env.warning_textNode.getText() == 'Incorrect amount of robot positions given'
+
+    def test_pagingHeading(self, offscreen):
+        env = offscreen(5000, 5000, 2, page_budget=100)
+        robots = RobotUtils('', '', 'json/robot.json').robotParse(2, [[0, 0, 0], [1000, 0, 0]])
+        for robot in robots:
+            env.addRobot(robot)
+        assert sorted(env.paged) == [0, 1] and not env.bodies
+        # build robot 0, then turn + move it
+        env.pageIn(0)
+        env.selected_id, env.selected_robot = 0, env.bodies[0][0]
+        env.rotateRobot(90)
+        env.moveRobot(0)
+        tight = [np.array(corner) for corner in env.bodies[0][0].getTightBounds(env.render)]
+        bounds = list(robots[0].bounds)
+        assert np.allclose(bounds[1::2], tight[0], atol=1e-3) and np.allclose(bounds[::2], tight[1], atol=1e-3)
+        ids, lower, upper = env.componentBoxes(0)
+        # unloaded robot keeps its heading in its box, bounds and component boxes
+        env.selected_id = None
+        env.unloadRobot(0)
+        assert 0 in env.paged and env.pageable[0][3] == 90
+        assert np.allclose(robots[0].bounds, bounds, atol=1e-3)
+        assert np.allclose(env.paged[0].getTightBounds(env.render)[0], tight[0], atol=1e-3)
+        assert env.componentBoxes(0)[0] == ids
+        assert np.allclose(env.componentBoxes(0)[1], lower, atol=1e-3) and np.allclose(env.componentBoxes(0)[2], upper, atol=1e-3)
+        # built again where it was left, turned as it was
+        env.pageIn(0)
+        assert np.allclose(robots[0].bounds, bounds, atol=1e-3)
+        assert np.allclose(env.bodies[0][0].getTightBounds(env.render)[0], tight[0], atol=1e-3)
+        assert np.allclose(env.collision_index.bounds[0][0], tight[0], atol=1e-3)             # collision index kept current
+
+    def test_liveCheck(self, offscreen):
+        env = offscreen(5000, 5000, 2)
+        robots = RobotUtils('', '', 'json/robot.json').robotParse(2, [[0, 0, 0], [500, 0, 0]])
+        for robot in robots:
+            env.addRobot(robot)
+        env.selectRobot(1, 'Core')
+        assert env.warning_textNode.isHidden() and env.collision_index.neighbours(1) == []
+        # move robot 1 into robot 0 (camera looks along +y, so left is -x)
+        for _ in range(40):
+            env.moveRobot(3)
+        assert env.robot_pos[1] == LVector3f(300, 0, 0)
+        assert not env.warning_textNode.isHidden()
+        assert env.warning_textNode.getText().startswith('Possible Collision Between:\nRobot 1, Robot 0\n    Component ')
+        # index holds robot 1's moved box, in cells shared with robot 0
+        lower, upper = env.collision_index.bounds[1]
+        assert np.allclose(lower[:2], [robots[1].bounds[1], robots[1].bounds[3]]) and upper[0] == robots[1].bounds[0]
+        assert env.collision_index.neighbours(1) == [0]
+        assert all(1 in env.collision_index.cells[cell] for cell in env.collision_index.robot_cells[1])
+        # moving back clears the warning
+        for _ in range(40):
+            env.moveRobot(1)
+        assert env.warning_textNode.isHidden()
+
+    def test_robotBounds(self, offscreen):
+        env = offscreen(5000, 5000, 2)
+        robots = RobotUtils('', '', 'json/robot.json').robotParse(2, [[0, 0, 0], [800, 0, 0]])
+        for robot in robots:
+            env.addRobot(robot)
+
+        def tightBounds(id):
+            lower, upper = env.bodies[id][0].getTightBounds(env.render)
+            return [upper[0], lower[0], upper[1], lower[1], upper[2], lower[2]]
+        # bounds accumulated from placed components match the rendered nodes, as the robot is moved + turned
+        assert np.allclose(robots[1].bounds, tightBounds(1), atol=1e-3)
+        env.selectRobot(1, 'Core')
+        env.moveRobot(0)
+        env.rotateRobot(90)
+        env.moveRobot(3)
+        assert np.allclose(robots[1].bounds, tightBounds(1), atol=1e-3)
+        assert np.allclose(robots[0].bounds, tightBounds(0), atol=1e-3)
+
+        # instanced robots are moved by ID (IDs needn't match their index in the swarm)
+        env = offscreen(5000, 5000, 2)
+        robots = [Robot.fromTemplate(robot.id + 1, robot.template, robot.core_pos) for robot in robots]
+        if not env.renderInstanced(robots):
+            pytest.skip('graphics device does not support instancing')
+        before = [list(robot.bounds) for robot in robots]
+        env.reposition((np.array([[100, 0], [-900, 50]]), 3000, 3000))
+        assert env.robot_pos == {1: LVector3f(100, 0, 0), 2: LVector3f(-900, 50, 0)}
+        assert np.allclose(robots[0].bounds, np.array(before[0]) + [100, 100, 0, 0, 0, 0])
+        assert np.allclose(robots[1].bounds, np.array(before[1]) + [-1700, -1700, 50, 50, 0, 0])
+
+    def test_lazyLabels(self, offscreen):
+        env = offscreen(50000, 50000, 3)
+        robots = RobotUtils('', '', 'json/robot.json').robotParse(3, [[0, 0, 0], [400, 0, 0], [20000, 0, 0]])
+        for robot in robots:
+            env.addRobot(robot)
+        # no labels are built until they are first shown
+        assert env.labels == {} and env.label_geoms == {}
+        assert env.robotNode.findAllMatches('**/id_label').getNumPaths() == 0
+        # only robots near the camera are labelled
+        env.camera.setPos(0, -500, 500)
+        env.toggleLabels()
+        assert sorted(env.labels) == [0, 1]
+        parts = robots[0].template.parts
+        assert env.robotNode.findAllMatches('**/id_label').getNumPaths() == 2 * len(parts)
+        # labels with the same text share their glyph geometry
+        assert len(env.label_geoms) == len(parts) - 1 + 2                             # non-core component IDs + 'Robot 0', 'Robot 1'
+        assert all(first.getChild(0).node() == second.getChild(0).node() for first, second in zip(env.labels[0][1:], env.labels[1][1:]))
+        # the selected robot is labelled wherever it is, with its selected component's label enlarged
+        env.selectRobot(2, parts[2][0])
+        assert sorted(env.labels) == [0, 1, 2]
+        label = env.componentNode(2, parts[2][0]).find('id_label')
+        assert label.getScale() == LVector3f(6, 6, 6)
+        # enlargeLabel works on the lazily built labels when the selection changes
+        env.selectRobot(2, parts[3][0])
+        assert env.componentNode(2, parts[3][0]).find('id_label').getScale() == LVector3f(6, 6, 6)
+        assert label.getScale() == LVector3f(3, 3, 3)
+        env.toggleLabels()
+        assert env.labels == {} and env.robotNode.findAllMatches('**/id_label').getNumPaths() == 0
+
+    def test_picking(self, offscreen):
+        env = offscreen(50000, 50000, 1)
+        template = RobotUtils('', '', 'json/robot.json').robotParse(1, [[0, 0, 0]])[0].template
+        robot = Robot.fromTemplate(123, template, [500, 200, 0])                      # ID with 3 digits
+        env.addRobot(robot)
+        # node names are never parsed, so renaming every node of the robot doesn't change what is picked
+        for node in env.bodies[123][0].findAllMatches('**'):
+            node.setName('renamed')
+        env.bodies[123][0].setName('renamed')
+        # fire the picking ray straight down at the robot's core
+        env.camera.setPos(500, 200, 1000)
+        env.camera.lookAt(500, 200, 0)
+        env.pickerRay.setFromLens(env.camNode, 0, 0)
+        env.myTraverser.traverse(env.robotNode)
+        env.myHandler.sortEntries()
+        assert env.myHandler.getNumEntries() > 0
+        assert env.pickedIds(env.myHandler.getEntry(0).getIntoNodePath()) == (123, 'Core')
+        # every component's picking box gives the robot ID and its component ID
+        boxes = env.bodies[123][0].findAllMatches('**/+CollisionNode')
+        assert sorted(env.pickedIds(box)[1] for box in boxes) == sorted(part[0] for part in template.parts)
+        assert all(env.pickedIds(box)[0] == 123 for box in boxes)
+        robot_id, comp_id = next(env.pickedIds(box) for box in boxes if env.pickedIds(box)[1] != 'Core')
+        env.selectRobot(robot_id, comp_id)
+        assert env.selected_id == 123 and env.selected_comp.getTag('robot') == comp_id
+        assert env.sel_textNode.getText() == 'Selected Robot: 123\nSelected Component: {}'.format(comp_id)
+
 ###########################################################################################################################################################################
 
 